@@ -0,0 +1,47 @@
+"""create verse table
+
+Revision ID: 3f6c2a9d41b7
+Revises: 9d50950acced
+Create Date: 2024-08-04 18:12:27.418305
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f6c2a9d41b7"
+down_revision: Union[str, None] = "9d50950acced"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "verse",
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("chapter_num", sa.Integer(), nullable=False),
+        sa.Column("verse_num", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("num_words", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["book_id"], ["book.book_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("book_id", "chapter_num", "verse_num"),
+    )
+    # books added before this migration, the default group_concat_max_len (1024) would truncate long verses
+    op.execute("SET SESSION group_concat_max_len = 1000000")
+    op.execute(
+        """
+        INSERT INTO verse (book_id, chapter_num, verse_num, text, num_words)
+        SELECT word_appearance.book_id, word_appearance.chapter_num, word_appearance.verse_num,
+               GROUP_CONCAT(word.value ORDER BY word_appearance.word_position SEPARATOR ' '),
+               COUNT(*)
+        FROM word_appearance JOIN word ON word.word_id = word_appearance.word_id
+        GROUP BY word_appearance.book_id, word_appearance.chapter_num, word_appearance.verse_num
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("verse")
@@ -0,0 +1,51 @@
+"""create book_stats table
+
+Revision ID: a84e1f07c95d
+Revises: 3f6c2a9d41b7
+Create Date: 2024-08-11 21:40:03.672914
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a84e1f07c95d"
+down_revision: Union[str, None] = "3f6c2a9d41b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "book_stats",
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("num_chapters", sa.Integer(), nullable=False),
+        sa.Column("num_verses", sa.Integer(), nullable=False),
+        sa.Column("num_words", sa.Integer(), nullable=False),
+        sa.Column("num_unique_words", sa.Integer(), nullable=False),
+        sa.Column("num_letters", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["book_id"], ["book.book_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("book_id"),
+    )
+    # books added before this migration
+    op.execute(
+        """
+        INSERT INTO book_stats (book_id, num_chapters, num_verses, num_words, num_unique_words, num_letters)
+        SELECT book.book_id, book.num_chapters,
+               (SELECT COUNT(*) FROM verse WHERE verse.book_id = book.book_id),
+               (SELECT COUNT(*) FROM word_appearance WHERE word_appearance.book_id = book.book_id),
+               (SELECT COUNT(DISTINCT word_appearance.word_id) FROM word_appearance
+                WHERE word_appearance.book_id = book.book_id),
+               (SELECT COALESCE(SUM(word.length), 0) FROM word_appearance
+                JOIN word ON word.word_id = word_appearance.word_id
+                WHERE word_appearance.book_id = book.book_id)
+        FROM book
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("book_stats")
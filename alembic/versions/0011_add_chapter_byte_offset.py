@@ -0,0 +1,55 @@
+"""add chapter byte_offset
+
+Revision ID: 5be3c1d27a90
+Revises: a84e1f07c95d
+Create Date: 2024-08-18 16:05:41.208337
+
+"""
+import os
+import re
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5be3c1d27a90"
+down_revision: Union[str, None] = "a84e1f07c95d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same as server.logic.tokenizer.CHAPTER_HEADER_PATTERN at the time of this migration
+CHAPTER_HEADER_PATTERN = re.compile(rb"^\d?[a-zA-Z]+\.[0-9]+")
+
+
+def upgrade() -> None:
+    op.add_column("chapter", sa.Column("byte_offset", sa.BigInteger(), nullable=True))
+
+    # books added before this migration, the offsets of books whose raw file is missing are left unknown
+    connection = op.get_bind()
+    books = connection.execute(sa.text("SELECT book_id, file_path FROM book")).all()
+    for book_id, file_path in books:
+        if not os.path.exists(file_path):
+            continue
+        chapter_offsets = []
+        offset = 0
+        with open(file_path, "rb") as raw_file:
+            for raw_line in raw_file:
+                if CHAPTER_HEADER_PATTERN.match(raw_line.strip()):
+                    chapter_offsets.append(offset)
+                offset += len(raw_line)
+        connection.execute(
+            sa.text(
+                "UPDATE chapter SET byte_offset = :byte_offset "
+                "WHERE book_id = :book_id AND num_chapter = :num_chapter"
+            ),
+            [
+                {"byte_offset": byte_offset, "book_id": book_id, "num_chapter": chapter_num}
+                for chapter_num, byte_offset in enumerate(chapter_offsets, start=1)
+            ],
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("chapter", "byte_offset")
@@ -0,0 +1,68 @@
+"""add verse byte_offset and byte_length
+
+Revision ID: c0d94e7b3a18
+Revises: 5be3c1d27a90
+Create Date: 2024-08-19 20:31:09.544810
+
+"""
+import os
+import re
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c0d94e7b3a18"
+down_revision: Union[str, None] = "5be3c1d27a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same as the patterns of server.logic.tokenizer at the time of this migration
+CHAPTER_HEADER_PATTERN = re.compile(rb"^\d?[a-zA-Z]+\.[0-9]+")
+VERSE_LINE_PATTERN = re.compile(rb"\[(\d+)\] (.+)")
+
+
+def upgrade() -> None:
+    op.add_column("verse", sa.Column("byte_offset", sa.BigInteger(), nullable=True))
+    op.add_column("verse", sa.Column("byte_length", sa.Integer(), nullable=True))
+
+    # books added before this migration, the ranges of books whose raw file is missing are left unknown
+    connection = op.get_bind()
+    books = connection.execute(sa.text("SELECT book_id, file_path FROM book")).all()
+    for book_id, file_path in books:
+        if not os.path.exists(file_path):
+            continue
+        verse_ranges = []
+        chapter_num = 0
+        offset = 0
+        with open(file_path, "rb") as raw_file:
+            for raw_line in raw_file:
+                line = raw_line.strip()
+                if CHAPTER_HEADER_PATTERN.match(line):
+                    chapter_num += 1
+                elif line and (verse_line := VERSE_LINE_PATTERN.match(line)):
+                    verse_ranges.append(
+                        {
+                            "book_id": book_id,
+                            "chapter_num": chapter_num,
+                            "verse_num": int(verse_line.group(1)),
+                            "byte_offset": offset + len(raw_line) - len(raw_line.lstrip()),
+                            "byte_length": len(line),
+                        }
+                    )
+                offset += len(raw_line)
+        if verse_ranges:
+            connection.execute(
+                sa.text(
+                    "UPDATE verse SET byte_offset = :byte_offset, byte_length = :byte_length "
+                    "WHERE book_id = :book_id AND chapter_num = :chapter_num AND verse_num = :verse_num"
+                ),
+                verse_ranges,
+            )
+
+
+def downgrade() -> None:
+    op.drop_column("verse", "byte_length")
+    op.drop_column("verse", "byte_offset")
@@ -0,0 +1,44 @@
+"""create word_frequency table
+
+Revision ID: 7e21b9f4c6d3
+Revises: c0d94e7b3a18
+Create Date: 2024-08-25 11:47:26.019384
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7e21b9f4c6d3"
+down_revision: Union[str, None] = "c0d94e7b3a18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "word_frequency",
+        sa.Column("word_id", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["word_id"], ["word.word_id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["book_id"], ["book.book_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("word_id", "book_id"),
+    )
+    op.create_index("ix_word_frequency_book_id_word_id", "word_frequency", ["book_id", "word_id"])
+    # books added before this migration
+    op.execute(
+        """
+        INSERT INTO word_frequency (word_id, book_id, count)
+        SELECT word_id, book_id, COUNT(*) FROM word_appearance
+        GROUP BY word_id, book_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_word_frequency_book_id_word_id", table_name="word_frequency")
+    op.drop_table("word_frequency")
@@ -0,0 +1,46 @@
+"""add word_appearance covering indexes
+
+Revision ID: 2d8f6a0b5e47
+Revises: 7e21b9f4c6d3
+Create Date: 2024-08-31 14:22:58.731065
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2d8f6a0b5e47"
+down_revision: Union[str, None] = "7e21b9f4c6d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the words of a verse (context, verse / chapter filters): book, chapter, verse, position
+    op.create_unique_constraint(
+        "uq_word_appearance_position",
+        "word_appearance",
+        ["book_id", "chapter_num", "verse_num", "word_position", "word_id"],
+    )
+    # the appearances of a word, in the order they're paginated
+    op.create_index(
+        "ix_word_appearance_word_position",
+        "word_appearance",
+        ["word_id", "book_id", "chapter_num", "verse_num", "word_position"],
+    )
+    # the new indexes start with the foreign keys' columns, so the old ones can be dropped
+    op.drop_index("idx_word_appearance_word_id", table_name="word_appearance")
+    op.drop_index("idx_word_appearance_book_id", table_name="word_appearance")
+    # the unique constraint of 0005 has the same columns, it was created unnamed so MySQL named it after book_id
+    op.drop_constraint("book_id", "word_appearance", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint(
+        "book_id", "word_appearance", ["book_id", "word_id", "verse_num", "chapter_num", "word_position"]
+    )
+    op.create_index("idx_word_appearance_book_id", "word_appearance", ["book_id"])
+    op.create_index("idx_word_appearance_word_id", "word_appearance", ["word_id"])
+    op.drop_index("ix_word_appearance_word_position", table_name="word_appearance")
+    op.drop_constraint("uq_word_appearance_position", "word_appearance", type_="unique")
@@ -0,0 +1,48 @@
+"""compact word_appearance
+
+Revision ID: 9a4c7e13f2b6
+Revises: 2d8f6a0b5e47
+Create Date: 2024-09-07 10:18:44.096721
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4c7e13f2b6"
+down_revision: Union[str, None] = "2d8f6a0b5e47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a single ALTER, so the (big) table is rebuilt once.
+    # the rows are clustered by (book, chapter, verse, position) instead of the synthetic index,
+    # which makes the unique constraint of these columns (and word_id) redundant
+    op.execute(
+        """
+        ALTER TABLE word_appearance
+            DROP COLUMN `index`,
+            MODIFY chapter_num SMALLINT NOT NULL,
+            MODIFY verse_num SMALLINT NOT NULL,
+            MODIFY word_position SMALLINT NOT NULL,
+            ADD PRIMARY KEY (book_id, chapter_num, verse_num, word_position),
+            DROP INDEX uq_word_appearance_position
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE word_appearance
+            DROP PRIMARY KEY,
+            ADD COLUMN `index` INTEGER NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST,
+            MODIFY chapter_num INTEGER NOT NULL,
+            MODIFY verse_num INTEGER NOT NULL,
+            MODIFY word_position INTEGER NOT NULL,
+            ADD CONSTRAINT uq_word_appearance_position
+                UNIQUE (book_id, chapter_num, verse_num, word_position, word_id)
+        """
+    )
@@ -0,0 +1,26 @@
+"""add book is_deleted
+
+Revision ID: 4f0b8d2e6c19
+Revises: 9a4c7e13f2b6
+Create Date: 2024-09-08 10:21:54.731602
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4f0b8d2e6c19"
+down_revision: Union[str, None] = "9a4c7e13f2b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("book", sa.Column("is_deleted", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column("book", "is_deleted")
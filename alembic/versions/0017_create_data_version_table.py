@@ -0,0 +1,32 @@
+"""create data_version table
+
+Revision ID: 6c3e91d05a7f
+Revises: 4f0b8d2e6c19
+Create Date: 2024-09-10 09:12:37.508214
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6c3e91d05a7f"
+down_revision: Union[str, None] = "4f0b8d2e6c19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    data_version = op.create_table(
+        "data_version",
+        sa.Column("name", sa.String(length=32), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.bulk_insert(data_version, [{"name": "corpus", "version": 0}, {"name": "groups", "version": 0}])
+
+
+def downgrade() -> None:
+    op.drop_table("data_version")
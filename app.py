@@ -2,14 +2,26 @@ from flask_cors import CORS
 
 from server.api import blueprint
 from server.app_instance import flask_app
+from server.cli import bulk_load_command, check_query_plans_command
 from server.db_instance import db
+from server.db_model.dialect import enable_sqlite_pragmas
+from server.logic.word_index import word_index
 
 db.init_app(flask_app)
 flask_app.app_context().push()
+if db.engine.dialect.name == "sqlite":
+    enable_sqlite_pragmas(db.engine, flask_app.config["SQLITE_PRAGMAS"])
+    # the migrations are written for MySQL, a SQLite db is created from the models
+    db.create_all()
 flask_app.register_blueprint(blueprint)
+flask_app.cli.add_command(bulk_load_command)
+flask_app.cli.add_command(check_query_plans_command)
 
 CORS(flask_app)
 
+if flask_app.config["WORD_INDEX_ENABLED"]:
+    word_index.load()
+
 
 if __name__ == "__main__":
     flask_app.run(host="0.0.0.0", port=4200, debug=flask_app.debug)
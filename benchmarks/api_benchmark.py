@@ -0,0 +1,246 @@
+"""
+End to end benchmark of the api over a synthetic corpus (see benchmarks/corpus_generator.py), against the
+configured db: times the ingestion of the corpus, then the requests of the word list, word appearances,
+phrase lookup, text context, group index and statistics, and deletes the synthetic books at the end.
+To compare two commits, run it on both:
+
+python -m benchmarks.api_benchmark --scale 10 --output before.json
+git checkout <other commit>
+python -m benchmarks.api_benchmark --scale 10 --baseline before.json
+"""
+import argparse
+import io
+import json
+import statistics
+import subprocess
+import time
+from collections import Counter
+from time import perf_counter
+from typing import Any, Callable
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import TestResponse
+
+from app import flask_app
+from benchmarks.corpus_generator import generate_corpus
+from consts import ROOT_PATH
+from server.db_instance import db
+from server.logic.structures import RawBook
+from server.logic.tokenizer import tokenize_verse_line
+from server.service.books_services import add_book, add_books, delete_book, get_book_deletion
+from server.service.cache_invalidation import word_appearances_count_cache, words_count_cache
+from server.utils.http_cache import response_cache
+
+BENCHMARK_GROUP_NAME = "benchmark"
+# number of the corpus' most frequent words put in the benchmark group
+NUM_GROUP_WORDS = 5
+PAGE_SIZE = 20
+
+
+def _get_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_PATH, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ingest_corpus(books: dict[str, str]) -> dict[str, float]:
+    """
+    Add the first book alone (the upload path), and the rest at once (the bulk load path)
+    """
+    (first_name, first_text), *rest = books.items()
+    start_time = perf_counter()
+    success, res = add_book(first_name, FileStorage(stream=io.BytesIO(first_text.encode())), "synthetic")
+    single_seconds = perf_counter() - start_time
+    if not success:
+        raise RuntimeError(f"failed to add {first_name}: {res}")
+
+    bulk_seconds = 0.0
+    if rest:
+        start_time = perf_counter()
+        success, results = add_books([RawBook(name, "synthetic", text.encode()) for name, text in rest])
+        bulk_seconds = perf_counter() - start_time
+        if not success or isinstance(results, str):
+            raise RuntimeError(f"failed to add books: {results}")
+        if failures := [result for result in results if not result["success"]]:
+            raise RuntimeError(f"failed to add books: {failures}")
+
+    num_words = sum(len(words) for words in _get_verse_words(books[first_name]))
+    total_words = sum(len(words) for text in books.values() for words in _get_verse_words(text))
+    return {
+        "single_book_seconds": single_seconds,
+        "single_book_words_per_second": num_words / single_seconds,
+        "bulk_seconds": bulk_seconds,
+        "bulk_words_per_second": (total_words - num_words) / bulk_seconds if bulk_seconds else 0.0,
+    }
+
+
+def _get_verse_words(book_text: str) -> list[list[str]]:
+    return [verse[1] for line in book_text.splitlines() if (verse := tokenize_verse_line(line)) is not None]
+
+
+def delete_corpus(book_names: list[str]) -> None:
+    job_ids = []
+    for book_name in book_names:
+        success, res = delete_book(book_name)
+        if success and isinstance(res, dict):
+            job_ids.append(res["jobId"])
+    for job_id in job_ids:
+        while (job := get_book_deletion(job_id)) is not None and job.status in ("pending", "running"):
+            time.sleep(0.1)
+
+
+def _check(response: TestResponse) -> TestResponse:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.path} failed with {response.status_code}: {response.text}")
+    return response
+
+
+def get_operations(books: dict[str, str]) -> dict[str, Callable[[], Any]]:
+    """
+    The requests to time, with arguments taken from the generated corpus
+    """
+    client = flask_app.test_client()
+    word_counts = Counter(
+        word for text in books.values() for words in _get_verse_words(text) for word in words
+    )
+    ranked_words = [word for word, _ in word_counts.most_common()]
+    frequent_word, median_word = ranked_words[0], ranked_words[len(ranked_words) // 2]
+    book_name = next(iter(books))
+    phrase = " ".join(_get_verse_words(books[book_name])[0][:3])
+
+    _check(client.post("/api/add_group", json={"groupName": BENCHMARK_GROUP_NAME}))
+    _check(
+        client.post(
+            "/api/groups/add_words",
+            json={
+                "groupName": BENCHMARK_GROUP_NAME,
+                "words": ranked_words[len(ranked_words) // 2 :][:NUM_GROUP_WORDS],
+            },
+        )
+    )
+    first_page = _check(
+        client.post(f"/api/word/{frequent_word}", json={"filters": {}, "pageIndex": 0, "pageSize": PAGE_SIZE})
+    )
+    cursor = first_page.json["nextCursor"]
+
+    def words_page(filters: dict, page_index: int = 0) -> Callable[[], Any]:
+        return lambda: _check(
+            client.post(
+                "/api/words/", json={"filters": filters, "pageIndex": page_index, "pageSize": PAGE_SIZE}
+            )
+        )
+
+    def appearances_page(word: str, **body: Any) -> Callable[[], Any]:
+        return lambda: _check(
+            client.post(
+                f"/api/word/{word}", json={"filters": {}, "pageIndex": 0, "pageSize": PAGE_SIZE, **body}
+            )
+        )
+
+    return {
+        "word_list_page": words_page({}),
+        "word_list_deep_page": words_page({}, page_index=100),
+        "word_list_page_of_book": words_page({"book": book_name}),
+        "word_list_page_of_chapter": words_page({"book": book_name, "chapter": "1"}),
+        "word_list_prefix": words_page({"wordStartsWith": frequent_word[:2]}),
+        "word_completions": lambda: _check(client.get(f"/api/words/completions?prefix={frequent_word[:2]}")),
+        "appearances_first_page": appearances_page(frequent_word),
+        "appearances_deep_page": appearances_page(frequent_word, pageIndex=100),
+        "appearances_cursor_page": appearances_page(frequent_word, cursor=cursor),
+        "appearances_of_median_word": appearances_page(median_word),
+        "phrase_reference": lambda: _check(client.get(f"/api/phrase/{phrase}/reference")),
+        "text_context": lambda: _check(client.get(f"/api/text_context/book/{book_name}/chapter/1/verse/2")),
+        "group_index": lambda: _check(
+            client.get(f"/api/group/{BENCHMARK_GROUP_NAME}/word_appearances_index")
+        ),
+        "books_stats": lambda: _check(client.get("/api/books/stats")),
+        "book_stats": lambda: _check(client.get(f"/api/books/{book_name}/stats")),
+        "general_stats": lambda: _check(client.get("/api/general_stats")),
+    }
+
+
+def _clear_result_caches() -> None:
+    # every run computes its result, the lookups of ids stay cached as they are in a running server
+    response_cache.clear()
+    words_count_cache.clear()
+    word_appearances_count_cache.clear()
+
+
+def time_operations(operations: dict[str, Callable[[], Any]], repeat: int) -> dict[str, dict[str, float]]:
+    latencies = {}
+    for name, operation in operations.items():
+        # untimed, it loads what a running server has loaded already (e.g. the vocabulary after the ingestion)
+        operation()
+        run_times = []
+        for _ in range(repeat):
+            _clear_result_caches()
+            start_time = perf_counter()
+            operation()
+            run_times.append((perf_counter() - start_time) * 1000)
+        latencies[name] = {"median_ms": statistics.median(run_times), "max_ms": max(run_times)}
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scale", type=float, default=10, help="size of the corpus relative to the sample books"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs of every request")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic books in the db")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="json file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    books = generate_corpus(args.scale, args.seed)
+    with flask_app.app_context():
+        dialect = db.engine.dialect.name
+        print(f"adding {len(books)} synthetic books to {db.engine.url.render_as_string(hide_password=True)}")
+        try:
+            ingest = ingest_corpus(books)
+            operation_latencies = time_operations(get_operations(books), args.repeat)
+        finally:
+            flask_app.test_client().delete(f"/api/group-to-delete/{BENCHMARK_GROUP_NAME}")
+            if not args.keep:
+                delete_corpus(list(books))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+    for key, value in ingest.items():
+        line = f"{key:>30}: {value:,.2f}"
+        if baseline and baseline["ingest"].get(key):
+            line += f" ({value / baseline['ingest'][key]:.2f}x the baseline)"
+        print(line)
+    for name, latency in operation_latencies.items():
+        line = f"{name:>30}: median {latency['median_ms']:.2f} ms, max {latency['max_ms']:.2f} ms"
+        if baseline and name in baseline["operations"]:
+            baseline_median = baseline["operations"][name]["median_ms"]
+            line += f" ({latency['median_ms'] / baseline_median:.2f}x the baseline)"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "commit": _get_commit(),
+                    "dialect": dialect,
+                    "scale": args.scale,
+                    "seed": args.seed,
+                    "num_books": len(books),
+                    "ingest": ingest,
+                    "operations": operation_latencies,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Generator of synthetic books in the format of the sample books ("Abc.1" chapter headers, "[1] text" verses),
+with the words drawn from the word frequencies of the sample books and some made up words, so the vocabulary
+keeps growing with the corpus as a real one does.
+
+python -m benchmarks.corpus_generator --scale 10 --output-dir /tmp/synthetic_corpus
+"""
+import argparse
+import os
+import random
+from collections import Counter
+from dataclasses import dataclass
+from itertools import accumulate
+
+from benchmarks.parser_benchmark import load_sample_lines
+from server.logic.tokenizer import is_chapter_header, tokenize_verse_line
+
+# share of the words of a generated book that are made up words of its own
+NEW_WORDS_RATE = 0.02
+# number of made up words every generated book adds to the vocabulary
+NEW_WORDS_PER_BOOK = 300
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+@dataclass
+class SampleCorpusProfile:
+    """
+    The shape of the sample books that the generated books follow
+    """
+
+    num_books: int
+    num_words: int
+    word_counts: Counter[str]
+    verse_lengths: list[int]
+    verses_per_chapter: list[int]
+
+    @property
+    def words_per_book(self) -> int:
+        return self.num_words // self.num_books
+
+
+def load_sample_profile() -> SampleCorpusProfile:
+    word_counts: Counter[str] = Counter()
+    verse_lengths: list[int] = []
+    verses_per_chapter: list[int] = []
+    num_books = 0
+    for line in load_sample_lines():
+        if is_chapter_header(line):
+            # a book starts over from its first chapter
+            if line.endswith(".1"):
+                num_books += 1
+            verses_per_chapter.append(0)
+            continue
+        verse = tokenize_verse_line(line)
+        if verse is None or not verse[1]:
+            continue
+        word_counts.update(verse[1])
+        verse_lengths.append(len(verse[1]))
+        verses_per_chapter[-1] += 1
+    return SampleCorpusProfile(
+        num_books=num_books,
+        num_words=sum(verse_lengths),
+        word_counts=word_counts,
+        verse_lengths=verse_lengths,
+        verses_per_chapter=[num_verses for num_verses in verses_per_chapter if num_verses],
+    )
+
+
+def _make_up_word(rng: random.Random) -> str:
+    return "".join(rng.choice(_LETTERS) for _ in range(rng.randint(4, 10)))
+
+
+def generate_book_text(
+    profile: SampleCorpusProfile, abbreviation: str, num_words: int, rng: random.Random
+) -> str:
+    """
+    Generate the raw text of a book of about `num_words` words, `abbreviation` must be letters only
+    """
+    words = list(profile.word_counts)
+    # computed once rather than by every rng.choices call
+    cum_weights = list(accumulate(profile.word_counts.values()))
+    new_words = [_make_up_word(rng) for _ in range(NEW_WORDS_PER_BOOK)]
+    lines = []
+    chapter_num = 0
+    words_left = num_words
+    while words_left > 0:
+        chapter_num += 1
+        lines.append(f"{abbreviation}.{chapter_num}")
+        for verse_num in range(1, rng.choice(profile.verses_per_chapter) + 1):
+            verse_length = rng.choice(profile.verse_lengths)
+            verse_words = rng.choices(words, cum_weights=cum_weights, k=verse_length)
+            for i in range(verse_length):
+                if rng.random() < NEW_WORDS_RATE:
+                    verse_words[i] = rng.choice(new_words)
+            verse_words[0] = verse_words[0].capitalize()
+            lines.append(f"[{verse_num}] {' '.join(verse_words)}.")
+            words_left -= verse_length
+            if words_left <= 0:
+                break
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(scale: float, seed: int = 0) -> dict[str, str]:
+    """
+    Generate books of the size of an average sample book, `scale` times as many words as the sample books.
+    Returns the text of every book by its name
+    """
+    profile = load_sample_profile()
+    rng = random.Random(seed)
+    num_books = max(1, round(profile.num_books * scale))
+    books = {}
+    for book_index in range(num_books):
+        # letters only, so the chapter headers look like the ones of the sample books
+        abbreviation = "Syn" + "".join(_LETTERS[int(digit)] for digit in str(book_index))
+        books[f"synthetic{abbreviation[3:]}"] = generate_book_text(
+            profile, abbreviation, profile.words_per_book, rng
+        )
+    return books
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scale", type=float, default=10, help="size of the corpus relative to the sample books"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", required=True, help="directory to write the books to")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    books = generate_corpus(args.scale, args.seed)
+    for name, book_text in books.items():
+        with open(os.path.join(args.output_dir, f"{name}.txt"), "w") as file:
+            file.write(book_text)
+    print(f"wrote {len(books)} books to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
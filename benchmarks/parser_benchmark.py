@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the verse parser over the sample books.
+
+python -m benchmarks.parser_benchmark --repeat 5
+"""
+import argparse
+import os
+import re
+from time import perf_counter
+from typing import Callable
+
+from consts import ROOT_PATH
+from server.logic.tokenizer import is_chapter_header, tokenize_verse_line
+
+SAMPLE_BOOKS_DIRS = [
+    os.path.join(ROOT_PATH, "tests", "resources", "Torah"),
+    os.path.join(ROOT_PATH, "tests", "resources", "Neviim"),
+]
+
+
+def _regex_tokenize_line(line: str) -> list[str]:
+    """The per-line regex implementation the tokenizer replaced, kept as the benchmark baseline"""
+    if re.match(r"^\d?[a-zA-Z]+\.[0-9]+", line):
+        return []
+    match = re.match(r"\[(\d+)\] (.+)", line)
+    if not match:
+        raise ValueError(f"Invalid verse line format: {line}")
+    verse_text = re.sub(r"[^\w\s']", " ", match.group(2))
+    return [word.lower() for word in verse_text.split()]
+
+
+def _tokenizer_tokenize_line(line: str) -> list[str]:
+    if is_chapter_header(line):
+        return []
+    verse = tokenize_verse_line(line)
+    if verse is None:
+        raise ValueError(f"Invalid verse line format: {line}")
+    return verse[1]
+
+
+def load_sample_lines() -> list[str]:
+    lines = []
+    for books_dir in SAMPLE_BOOKS_DIRS:
+        for file_name in sorted(os.listdir(books_dir)):
+            with open(os.path.join(books_dir, file_name), "r") as file:
+                lines.extend(line.strip() for line in file if line.strip())
+    return lines
+
+
+def run(tokenize_line: Callable[[str], list[str]], lines: list[str], repeat: int) -> tuple[float, int]:
+    num_tokens = 0
+    start_time = perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            num_tokens += len(tokenize_line(line))
+    return perf_counter() - start_time, num_tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="number of passes over the sample books")
+    args = parser.parse_args()
+
+    lines = load_sample_lines()
+    print(f"{len(lines)} lines, {args.repeat} passes")
+    for name, tokenize_line in [("regex", _regex_tokenize_line), ("tokenizer", _tokenizer_tokenize_line)]:
+        run_time, num_tokens = run(tokenize_line, lines, args.repeat)
+        num_lines = len(lines) * args.repeat
+        print(
+            f"{name:>10}: {run_time:.3f} seconds, {num_lines / run_time:,.0f} lines/sec, "
+            f"{num_tokens / run_time:,.0f} tokens/sec"
+        )
+
+
+if __name__ == "__main__":
+    main()
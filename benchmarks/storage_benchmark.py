@@ -0,0 +1,130 @@
+"""
+Benchmark of the word_appearance storage: table size, buffer pool footprint (MySQL) and the latency of the
+hot WordAppearanceModel queries, against the books loaded to the configured db.
+To compare two layouts, run it before and after the migration:
+
+python -m benchmarks.storage_benchmark --output before.json
+alembic upgrade head
+python -m benchmarks.storage_benchmark --baseline before.json
+"""
+import argparse
+import json
+import statistics
+from time import perf_counter
+
+from sqlalchemy import bindparam, text
+
+from app import flask_app
+from server.db_instance import db
+from server.db_model.query_plans import LARGE_TABLES, get_hot_queries
+
+
+def get_table_sizes() -> dict[str, dict[str, float]]:
+    if db.engine.dialect.name != "mysql":
+        return {}
+    rows = db.session.execute(
+        text(
+            """
+            SELECT table_name AS name, table_rows, data_length, index_length FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name IN :tables
+            """
+        ).bindparams(bindparam("tables", value=list(LARGE_TABLES), expanding=True)),
+    ).mappings()
+    return {
+        row["name"]: {
+            "rows": row["table_rows"],
+            "data_mb": row["data_length"] / 2**20,
+            "index_mb": row["index_length"] / 2**20,
+            "bytes_per_row": (row["data_length"] + row["index_length"]) / max(row["table_rows"], 1),
+        }
+        for row in rows
+    }
+
+
+def get_buffer_pool_footprint() -> dict[str, float]:
+    """
+    MB of the buffer pool held by the pages of each table, this scans the buffer pool so it's slow on big pools
+    """
+    if db.engine.dialect.name != "mysql":
+        return {}
+    rows = db.session.execute(
+        text(
+            """
+            SELECT table_name AS name, SUM(data_size) AS data_size FROM information_schema.innodb_buffer_page
+            WHERE table_name IS NOT NULL GROUP BY table_name
+            """
+        )
+    ).mappings()
+    return {
+        table: float(row["data_size"]) / 2**20
+        for row in rows
+        for table in LARGE_TABLES
+        # the name is quoted with the schema, e.g. `bible-concord`.`word_appearance`
+        if row["name"].endswith(f"`{table}`")
+    }
+
+
+def get_query_latencies(repeat: int) -> dict[str, dict[str, float]]:
+    latencies = {}
+    for name, query in get_hot_queries().items():
+        run_times = []
+        for _ in range(repeat):
+            start_time = perf_counter()
+            query.all()
+            run_times.append((perf_counter() - start_time) * 1000)
+        latencies[name] = {"median_ms": statistics.median(run_times), "max_ms": max(run_times)}
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="number of runs of every query")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="json file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    with flask_app.app_context():
+        table_sizes = get_table_sizes()
+        buffer_pool_mb = get_buffer_pool_footprint()
+        query_latencies = get_query_latencies(args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+    for table, sizes in table_sizes.items():
+        print(f"{table:>16}: " + ", ".join(f"{key} {value:,.1f}" for key, value in sizes.items()))
+    for table, size_mb in buffer_pool_mb.items():
+        print(f"{table:>16}: {size_mb:,.1f} MB in the buffer pool")
+    for name, latency in query_latencies.items():
+        line = f"{name:>34}: median {latency['median_ms']:.2f} ms, max {latency['max_ms']:.2f} ms"
+        if baseline and name in baseline["query_latencies"]:
+            baseline_median = baseline["query_latencies"][name]["median_ms"]
+            line += f" ({latency['median_ms'] / baseline_median:.2f}x the baseline)"
+        print(line)
+    if baseline:
+        for table, sizes in table_sizes.items():
+            if table in baseline["table_sizes"]:
+                baseline_sizes = baseline["table_sizes"][table]
+                print(
+                    f"{table:>16}: {sizes['bytes_per_row']:.1f} bytes per row"
+                    f" (baseline {baseline_sizes['bytes_per_row']:.1f})"
+                )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "table_sizes": table_sizes,
+                    "buffer_pool_mb": buffer_pool_mb,
+                    "query_latencies": query_latencies,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
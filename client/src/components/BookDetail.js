@@ -10,16 +10,24 @@ const BookDetail = () => {
     const [bookContent, setBookContent] = useState('');
 
     useEffect(() => {
+        let cancelled = false;
+        // the whole book in a single request, the server sends the raw file of the book as is
         const fetchBookContent = async () => {
             try {
+                setBookContent('');
                 const content = await getBookContent(name);
-                setBookContent(content);
+                if (!cancelled) {
+                    setBookContent(content);
+                }
             } catch (error) {
                 console.error('Error fetching book content:', error);
             }
         };
 
         fetchBookContent();
+        return () => {
+            cancelled = true;
+        };
     }, [name]);
 
 
@@ -1,6 +1,6 @@
 import React, {useState, useEffect} from 'react';
 import {useNavigate, useParams} from 'react-router-dom';
-import {addWordToGroup, filterWords, parseErrorResponse} from '../../services/api';
+import {addWordToGroup, addWordsToGroup, filterWords, parseErrorResponse} from '../../services/api';
 import Pagination from '../search/Pagination';
 import WordFilters from '../search/WordFilters';
 import {FaArrowLeft} from 'react-icons/fa';
@@ -17,6 +17,7 @@ const AddFromWordList = () => {
     const [isFreeSearch, setIsFreeSearch] = useState(false);
     const [message, setMessage] = useState('');
     const [messageType, setMessageType] = useState(''); // 'success' or 'error'
+    const [selectedWords, setSelectedWords] = useState([]);
 
     const pageSize = 13;
 
@@ -46,6 +47,35 @@ const AddFromWordList = () => {
         }
     };
 
+    const handleSelectWord = (word) => {
+        setSelectedWords(prevSelectedWords => prevSelectedWords.includes(word)
+            ? prevSelectedWords.filter(selectedWord => selectedWord !== word)
+            : [...prevSelectedWords, word]);
+    };
+
+    const handleSelectPage = () => {
+        setSelectedWords(prevSelectedWords => [
+            ...prevSelectedWords,
+            ...words.map(wordRec => wordRec.word).filter(word => !prevSelectedWords.includes(word)),
+        ]);
+    };
+
+    const handleAddSelectedWords = async () => {
+        try {
+            // all the selected words are added in a single request
+            const results = await addWordsToGroup(groupName, selectedWords);
+            const failed = results.filter(result => !result.success);
+            const numAdded = results.length - failed.length;
+            setMessage(`${numAdded} words added successfully to ${groupName}!`
+                + (failed.length ? ` ${failed.map(result => result.message).join(', ')}` : ''));
+            setMessageType(failed.length ? 'error' : 'success');
+            setSelectedWords([]);
+        } catch (error) {
+            setMessage(`Failed to add the selected words to ${groupName}. ${parseErrorResponse(error)}`);
+            setMessageType('error');
+        }
+    };
+
     const handleFiltersChanged = (newFilters) => {
         setFilters(newFilters);
         setPageIndex(0);
@@ -72,10 +102,21 @@ const AddFromWordList = () => {
                 onFreeSearchChange={handleFreeSearchChange}
             />
             <div className="word-list">
+                <button onClick={handleSelectPage}>Select Page</button>
+                <button onClick={handleAddSelectedWords} disabled={selectedWords.length === 0}>
+                    Add Selected Words ({selectedWords.length})
+                </button>
                 <table>
                     <tbody>
                     {words.map((wordRec, index) => (
                         <tr key={index} className={index % 2 === 0 ? 'even-row' : 'odd-row'}>
+                            <td>
+                                <input
+                                    type="checkbox"
+                                    checked={selectedWords.includes(wordRec.word)}
+                                    onChange={() => handleSelectWord(wordRec.word)}
+                                />
+                            </td>
                             <td>{wordRec.word}</td>
                             <td>
                                 <button onClick={() => handleAddWord(wordRec.word)}>Add Word</button>
@@ -17,6 +17,7 @@ const WordAppearances = () => {
     const [appearances, setAppearances] = useState([]);
     const [pageIndex, setPageIndex] = useState(0);
     const [totalPages, setTotalPages] = useState(0);
+    const [nextCursor, setNextCursor] = useState(null);
     const [filters, setFilters] = useState(initialFilters);
     const [totalAppearances, setTotalAppearances] = useState(0);
     const [isFreeSearch, setIsFreeSearch] = useState(initialFreeSearch);
@@ -25,9 +26,10 @@ const WordAppearances = () => {
 
     const pageSize = 14;
 
-    const fetchAppearances = async (filters, pageIndex) => {
-        const response = await getWordAppearances(word, filters, pageIndex, pageSize);
+    const fetchAppearances = async (filters, pageIndex, cursor = null) => {
+        const response = await getWordAppearances(word, filters, pageIndex, pageSize, cursor);
         setAppearances(response.wordAppearances);
+        setNextCursor(response.nextCursor);
         setTotalPages(Math.ceil(response.total / pageSize));
         setTotalAppearances(response.total);
     };
@@ -37,8 +39,10 @@ const WordAppearances = () => {
     }, [filters]);
 
     const handlePageChange = (newPageIndex) => {
+        // seek from the last appearance of the current page when moving forward, it's cheaper than an offset
+        const cursor = newPageIndex === pageIndex + 1 ? nextCursor : null;
         setPageIndex(newPageIndex);
-        fetchAppearances(filters, newPageIndex);
+        fetchAppearances(filters, newPageIndex, cursor);
     };
 
     const handleFiltersChanged = (newFilters) => {
@@ -1,9 +1,10 @@
-import React, {useState, useEffect, useCallback} from 'react';
+import React, {useState, useEffect, useCallback, useRef} from 'react';
 import {
     getBooksNames,
     getNumChaptersInBook,
     getNumVersesInChapter,
-    getNumWordsInVerse
+    getNumWordsInVerse,
+    getWordCompletions
 } from '../../services/api';
 
 const WordFilters = ({
@@ -22,6 +23,9 @@ const WordFilters = ({
     const [indexesInVerse, setIndexesInVerse] = useState([]);
     const [selectedIndexInVerse, setSelectedIndexInVerse] = useState(initialFilters.wordPosition || '');
     const [wordStartsWith, setWord] = useState('');
+    const [completions, setCompletions] = useState([]);
+    // the value the completions are wanted for, a response for an older value is dropped
+    const completionsPrefix = useRef('');
 
     useEffect(() => {
         fetchBooks();
@@ -152,9 +156,26 @@ const WordFilters = ({
         []
     );
 
+    const debouncedFetchCompletions = useCallback(
+        debounce(async (prefix) => {
+            const prefixCompletions = await getWordCompletions(prefix);
+            // the responses may arrive out of order, e.g. a slow one for "ab" after the one for "abc"
+            if (completionsPrefix.current === prefix) {
+                setCompletions(prefixCompletions);
+            }
+        }, 150),
+        []
+    );
+
     const handleWordChange = (e) => {
         const wordValue = e.target.value;
         setWord(wordValue);
+        completionsPrefix.current = wordValue;
+        if (wordValue) {
+            debouncedFetchCompletions(wordValue);
+        } else {
+            setCompletions([]);
+        }
 
         debouncedOnFilterChange({
             book: selectedBook,
@@ -170,6 +191,8 @@ const WordFilters = ({
         setSelectedChapter('');
         setSelectedVerse('');
         setWord('');
+        completionsPrefix.current = '';
+        setCompletions([]);
         setSelectedIndexInVerse('');
         setChapters([]);
         setVerses([]);
@@ -251,7 +274,14 @@ const WordFilters = ({
             )}
             {filterByWord && (<label>Word:</label>)}
             {filterByWord && (
-                <input style={{width: '80px'}} type="text" value={wordStartsWith} onChange={handleWordChange}/>)}
+                <input style={{width: '80px'}} type="text" value={wordStartsWith} onChange={handleWordChange}
+                       list="word-completions"/>)}
+            {filterByWord && (
+                <datalist id="word-completions">
+                    {completions.map((completion) => (
+                        <option key={completion.word} value={completion.word}>{completion.count}</option>
+                    ))}
+                </datalist>)}
             <button onClick={handleReset}>Reset</button>
             <input
                 type="checkbox"
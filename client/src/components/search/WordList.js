@@ -12,6 +12,7 @@ const WordList = () => {
     const [words, setWords] = useState([]);
     const [pageIndex, setPageIndex] = useState(0);
     const [totalPages, setTotalPages] = useState(0);
+    const [nextCursor, setNextCursor] = useState(null);
     const [filters, setFilters] = useState({
         book: '',
         chapter: '',
@@ -24,12 +25,13 @@ const WordList = () => {
 
     const pageSize = 14;
 
-    const fetchWords = async (filters, pageIndex) => {
+    const fetchWords = async (filters, pageIndex, cursor = null) => {
         const userFilters = groupName ?
             {...filters, groupName: groupName} :
             filters
-        const filteredWords = await filterWords(userFilters, pageIndex, pageSize);
+        const filteredWords = await filterWords(userFilters, pageIndex, pageSize, cursor);
         setWords(filteredWords.words);
+        setNextCursor(filteredWords.nextCursor);
         setTotalPages(Math.ceil(filteredWords.total / pageSize));
     };
 
@@ -38,8 +40,10 @@ const WordList = () => {
     }, [filters]);
 
     const handlePageChange = (newPageIndex) => {
+        // seek from the last word of the current page when moving forward, it's cheaper than an offset
+        const cursor = newPageIndex === pageIndex + 1 ? nextCursor : null;
         setPageIndex(newPageIndex);
-        fetchWords(filters, newPageIndex);
+        fetchWords(filters, newPageIndex, cursor);
     };
 
     const handleViewAppearances = (word) => {
@@ -12,9 +12,14 @@ export const getBooks = async () => {
     }
 };
 
-export const getBookContent = async (bookName) => {
+export const getBookContent = async (bookName, chapterNum = null) => {
     try {
-        const response = await axios.get(`${API_BASE_URL}/book_content/${bookName}`);
+        const params = chapterNum === null ? {} : {chapter: chapterNum};
+        const response = await axios.get(`${API_BASE_URL}/book_content/${bookName}`, {
+            params,
+            // keep the text as is, even if it happens to look like JSON
+            responseType: 'text',
+        });
         return response.data;
     } catch (error) {
         console.error('Error fetching book content:', error);
@@ -77,12 +82,13 @@ export const getNumWordsInVerse = async (bookName, chapterNum, verseNum) => {
     }
 };
 
-export const filterWords = async (filters, pageIndex = 0, pageSize = 14) => {
+export const filterWords = async (filters, pageIndex = 0, pageSize = 14, cursor = null) => {
     try {
         const response = await axios.post(`${API_BASE_URL}/words/`, {
             filters,
             pageIndex,
             pageSize,
+            cursor,
         });
         return response.data;
     } catch (error) {
@@ -91,12 +97,23 @@ export const filterWords = async (filters, pageIndex = 0, pageSize = 14) => {
     }
 };
 
-export const getWordAppearances = async (word, filters, pageIndex, pageSize = 15) => {
+export const getWordCompletions = async (prefix, limit = 10) => {
+    try {
+        const response = await axios.get(`${API_BASE_URL}/words/completions`, {params: {prefix, limit}});
+        return response.data.completions;
+    } catch (error) {
+        console.error('Error fetching word completions:', error);
+        throw error;
+    }
+};
+
+export const getWordAppearances = async (word, filters, pageIndex, pageSize = 15, cursor = null) => {
     try {
         const response = await axios.post(`${API_BASE_URL}/word/${word}`, {
             filters,
             pageIndex,
             pageSize,
+            cursor,
         });
         return response.data;
     } catch (error) {
@@ -175,6 +192,16 @@ export const addWordToGroup = async (groupName, word) => {
     }
 };
 
+export const addWordsToGroup = async (groupName, words) => {
+    try {
+        const response = await axios.post(`${API_BASE_URL}/groups/add_words`, {groupName, words});
+        return response.data.words;
+    } catch (error) {
+        console.error('Error in addWordsToGroup:', error);
+        throw error;
+    }
+};
+
 
 export const parseErrorResponse = (error) => {
     if (error.response?.data) {
@@ -1,31 +1,105 @@
 import json
+import os
 from decimal import Decimal
 from http import HTTPStatus
+from typing import Iterable, Iterator
 
-from flask import Blueprint, Response, request
+from flask import Blueprint, Response, current_app, request, send_file, stream_with_context
 
 from server.db_model.model.book import BookModel
 from server.db_model.model.group import GroupModel
 from server.db_model.model.phrase import PhraseModel
 from server.db_model.model.word_appearance import WordAppearanceModel
+from server.logic.structures import RawBook
 from server.service.books_services import (
     add_book,
-    get_book_content,
+    add_books,
+    delete_book,
+    get_book_content_path,
+    get_book_deletion,
     get_book_names,
     get_books,
+    get_chapter_content,
     get_num_chapters_in_book,
 )
+from server.service.cache_invalidation import corpus_version, groups_version, sync_data_versions
 from server.service.chapters_services import get_num_verses_in_chapter
-from server.service.group_services import add_group, add_word_to_group, get_groups, get_words_in_group
-from server.service.phrase_services import add_phrase, get_phrase_references, get_phrases
+from server.service.group_services import (
+    add_group,
+    add_word_to_group,
+    add_words_to_group,
+    delete_group,
+    get_groups,
+    get_words_in_group,
+)
+from server.service.phrase_services import (
+    add_phrase,
+    get_phrase_references,
+    get_phrases,
+    iter_phrase_references,
+)
 from server.service.verses_services import get_num_words_in_verse
-from server.service.words_services import get_word_text_context
-from server.utils.timer import Timer
+from server.service.words_services import (
+    count_filtered_words,
+    count_word_appearances,
+    get_filtered_words,
+    get_word_appearances,
+    get_word_completions,
+    get_word_text_context,
+)
+from server.utils.cache import get_caches_stats
+from server.utils.cursor import decode_cursor, encode_cursor
+from server.utils.http_cache import cached_response
+from server.utils.metrics import render_metrics
+from server.utils.query_profiler import profile_blueprint_requests
+from server.utils.request_metrics import instrument_blueprint
 
 blueprint = Blueprint(
     "bible_concord_api",
     __name__,
 )
+# every request is measured, see /metrics
+instrument_blueprint(blueprint)
+profile_blueprint_requests(blueprint)
+
+# the endpoints that read neither the books nor the groups, they don't sync the data versions
+UNVERSIONED_ENDPOINTS = {
+    f"{blueprint.name}.{view_name}"
+    for view_name in ("ping", "get_metrics_api", "get_cache_stats_api", "get_book_deletion_api")
+}
+
+
+@blueprint.before_app_request
+def _sync_data_versions() -> None:
+    # the books and groups may have been changed by another process, see cache_invalidation.py
+    if request.endpoint not in UNVERSIONED_ENDPOINTS:
+        sync_data_versions(min_interval=current_app.config["DATA_VERSION_SYNC_INTERVAL"])
+
+
+# number of rows written to a streamed response at a time
+STREAM_CHUNK_ROWS = 500
+
+
+def _is_stream_requested() -> bool:
+    return request.args.get("stream", "").lower() in ("1", "true")
+
+
+def _ndjson_response(rows: Iterable[dict]) -> Response:
+    """
+    Stream the rows as newline delimited JSON, one row per line, while they're still being read
+    """
+
+    def generate() -> Iterator[str]:
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row))
+            if len(lines) == STREAM_CHUNK_ROWS:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    return Response(stream_with_context(generate()), status=HTTPStatus.OK, mimetype="application/x-ndjson")
 
 
 @blueprint.route("/ping", methods=["GET"])
@@ -58,7 +132,41 @@ def add_book_api() -> Response:
     )
 
 
+@blueprint.route("/api/add_books", methods=["POST"])
+def add_books_api() -> Response:
+    """
+    curl --location 'http://localhost:4200/api/add_books' -F 'textFiles=@"/path/to/genesis.txt"' -F 'textFiles=@"/path/to/exodus.txt"' -F "division=Torah"
+    """
+    text_files = request.files.getlist("textFiles")
+    if not text_files:
+        return Response("No file part", status=HTTPStatus.BAD_REQUEST)
+    if any(not text_file.filename for text_file in text_files):
+        return Response("Every file should have a file name", status=HTTPStatus.BAD_REQUEST)
+    if "division" not in request.form:
+        return Response("Request form should contain 'division'", status=HTTPStatus.BAD_REQUEST)
+
+    # each book is named after its file, e.g. genesis.txt -> genesis
+    raw_books = [
+        RawBook(
+            name=os.path.splitext(str(text_file.filename))[0],
+            division=request.form["division"],
+            raw_text=text_file.read(),
+        )
+        for text_file in text_files
+    ]
+    success, res = add_books(raw_books)
+    if success is False:
+        return Response(res, status=HTTPStatus.BAD_REQUEST)
+
+    return Response(
+        json.dumps({"books": res}),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
+
+
 @blueprint.route("/api/books", methods=["GET"])
+@cached_response(corpus_version)
 def get_books_api() -> Response:
     """
     curl 'http://localhost:4200/api/books'
@@ -79,19 +187,31 @@ def get_books_api() -> Response:
 def get_book_content_api(book_name: str) -> Response:
     """
     curl 'http://localhost:4200/api/book_content/Genesis'
+    curl 'http://localhost:4200/api/book_content/Genesis?chapter=3'
+    curl -H 'Range: bytes=0-1023' 'http://localhost:4200/api/book_content/Genesis'
+    Both the whole book and a single chapter support conditional and range requests
     """
-    success, res = get_book_content(book_name)
+    chapter = request.args.get("chapter")
+    if chapter is None:
+        success, res = get_book_content_path(book_name)
+        if success is False:
+            return Response(res, status=HTTPStatus.BAD_REQUEST)
+        # the file is sent as is, by the server's sendfile when it supports it
+        return send_file(res, mimetype="text/plain", conditional=True)
+
+    if not chapter.isdigit():
+        return Response("'chapter' should be a chapter number", status=HTTPStatus.BAD_REQUEST)
+    success, chapter_content = get_chapter_content(book_name, int(chapter))
     if success is False:
-        return Response(res, status=HTTPStatus.BAD_REQUEST)
+        return Response(chapter_content, status=HTTPStatus.BAD_REQUEST)
 
-    return Response(
-        res,
-        status=HTTPStatus.OK,
-        mimetype="text/html",
-    )
+    response = Response(chapter_content, status=HTTPStatus.OK, mimetype="text/plain")
+    response.add_etag()
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(chapter_content))
 
 
 @blueprint.route("/api/book_names", methods=["GET"])
+@cached_response(corpus_version)
 def get_book_names_api() -> Response:
     """
     curl 'http://localhost:4200/api/books'
@@ -149,46 +269,115 @@ def get_num_words_in_verse_api(book_name: str, chapter_num: int, verse_num: int)
 
 @blueprint.route("/api/words/", methods=["POST"])
 def filter_words_api() -> Response:
-    user_filters = request.json["filters"]
-    page_index = request.json["pageIndex"]
+    """
+    Pass the "nextCursor" of a page as "cursor" to get the page after it, otherwise "pageIndex" is used.
+    Pass "includeTotal": false to skip counting the total, see /api/words/count
+    """
+    filters = _get_words_filters()
+    page_index = request.json.get("pageIndex", 0)
     page_size = request.json["pageSize"]
-    keys = ["wordStartsWith", "book", "chapter", "verse", "wordPosition", "groupName"]
-    filters = {key: user_filters[key] for key in keys if user_filters.get(key)}
+    include_total = request.json.get("includeTotal", True)
+    after_word = None
+    if cursor := request.json.get("cursor"):
+        try:
+            (after_word,) = decode_cursor(cursor, [str])
+        except ValueError as e:
+            return Response(str(e), status=HTTPStatus.BAD_REQUEST)
+
+    filtered_words, total = get_filtered_words(filters, page_index, page_size, after_word, include_total)
+    next_cursor = encode_cursor([filtered_words[-1]["word"]]) if len(filtered_words) == page_size else None
+    return Response(
+        json.dumps({"words": filtered_words, "total": total, "nextCursor": next_cursor}),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
 
-    filtered_words, total = WordAppearanceModel.get_filtered_words_paginate(filters, page_index, page_size)
+
+@blueprint.route("/api/words/count", methods=["POST"])
+def count_filtered_words_api() -> Response:
+    return Response(
+        json.dumps({"total": count_filtered_words(_get_words_filters())}),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
+
+
+@blueprint.route("/api/words/completions", methods=["GET"])
+def get_word_completions_api() -> Response:
+    """
+    curl 'http://localhost:4200/api/words/completions?prefix=ab&limit=5'
+    The most frequent words that start with the prefix, answered from memory, for autocomplete
+    """
+    prefix = request.args.get("prefix", "")
+    limit = request.args.get("limit", "")
+    if limit and not limit.isdigit():
+        return Response("'limit' should be a number", status=HTTPStatus.BAD_REQUEST)
+    completions = get_word_completions(prefix, int(limit)) if limit else get_word_completions(prefix)
     return Response(
-        json.dumps({"words": filtered_words, "total": total}),
+        json.dumps({"completions": completions}),
         status=HTTPStatus.OK,
         mimetype="application/json",
     )
 
 
+def _get_words_filters() -> dict:
+    user_filters = request.json["filters"]
+    keys = ["wordStartsWith", "book", "chapter", "verse", "wordPosition", "groupName"]
+    return {key: user_filters[key] for key in keys if user_filters.get(key)}
+
+
 @blueprint.route("/api/word/<word>", methods=["POST"])
 def get_word_appearances_api(word: str) -> Response:
-    user_filters = request.json["filters"]
-    page_index = request.json["pageIndex"]
+    """
+    Pass the "nextCursor" of a page as "cursor" to get the page after it, otherwise "pageIndex" is used.
+    Pass "includeTotal": false to skip counting the total, see /api/word/<word>/count
+    """
+    filters = _get_word_appearances_filters()
+    page_index = request.json.get("pageIndex", 0)
     page_size = request.json["pageSize"]
-    keys = ["book", "chapter", "verse", "wordPosition"]
-    filters = {key: user_filters[key] for key in keys if user_filters.get(key)}
+    include_total = request.json.get("includeTotal", True)
+    after = None
+    if cursor := request.json.get("cursor"):
+        try:
+            after = tuple(decode_cursor(cursor, [str, int, int, int]))
+        except ValueError as e:
+            return Response(str(e), status=HTTPStatus.BAD_REQUEST)
+
+    word_appearances, total = get_word_appearances(
+        word.lower(), filters, page_index, page_size, after, include_total
+    )
+    next_cursor = None
+    if len(word_appearances) == page_size:
+        last = word_appearances[-1]
+        next_cursor = encode_cursor([last["book"], last["chapter"], last["verse"], last["word_position"]])
+    return Response(
+        json.dumps({"wordAppearances": word_appearances, "total": total, "nextCursor": next_cursor}),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
 
-    with Timer("get_word_appearances_paginate", log_params={"word": word, "filters": filters}):
-        word_appearances, total = WordAppearanceModel.get_word_appearances_paginate(
-            word.lower(), filters, page_index, page_size
-        )
+
+@blueprint.route("/api/word/<word>/count", methods=["POST"])
+def count_word_appearances_api(word: str) -> Response:
     return Response(
-        json.dumps({"wordAppearances": word_appearances, "total": total}),
+        json.dumps({"total": count_word_appearances(word.lower(), _get_word_appearances_filters())}),
         status=HTTPStatus.OK,
         mimetype="application/json",
     )
 
 
+def _get_word_appearances_filters() -> dict:
+    user_filters = request.json["filters"]
+    keys = ["book", "chapter", "verse", "wordPosition"]
+    return {key: user_filters[key] for key in keys if user_filters.get(key)}
+
+
 @blueprint.route(
     "/api/text_context/book/<book>/chapter/<int:chapter>/verse/<int:verse>",
     methods=["GET"],
 )
 def get_word_text_context_api(book: str, chapter: int, verse: int) -> Response:
-    with Timer("get_word_text_context", log_params={"book": book, "chapter": chapter, "verse": verse}):
-        success, text = get_word_text_context(book, chapter, verse)
+    success, text = get_word_text_context(book, chapter, verse)
     if success is False:
         return Response(text, status=HTTPStatus.BAD_REQUEST)
     return Response(
@@ -215,6 +404,7 @@ def add_group_api() -> Response:
 
 
 @blueprint.route("/api/groups", methods=["GET"])
+@cached_response(groups_version)
 def get_groups_api() -> Response:
     success, res = get_groups()
     if success is False:
@@ -228,6 +418,7 @@ def get_groups_api() -> Response:
 
 
 @blueprint.route("/api/group/<group_name>/words", methods=["GET"])
+@cached_response(groups_version)
 def get_words_in_group_api(group_name: str) -> Response:
     group_name = group_name.lower()
     success, res = get_words_in_group(group_name)
@@ -258,11 +449,39 @@ def add_word_to_group_api() -> Response:
     )
 
 
+@blueprint.route("/api/groups/add_words", methods=["POST"])
+def add_words_to_group_api() -> Response:
+    """
+    curl --location 'http://localhost:4200/api/groups/add_words' --header 'Content-Type: application/json' --data '{"groupName": "colors", "words": ["red", "green"]}'
+    """
+    if "groupName" not in request.json or "words" not in request.json:
+        return Response("Request should contain 'groupName' and 'words'", status=HTTPStatus.BAD_REQUEST)
+    words = request.json["words"]
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        return Response("'words' should be a list of words", status=HTTPStatus.BAD_REQUEST)
+    group_name = request.json["groupName"].lower()
+    success, res = add_words_to_group(group_name, words)
+    if success is False:
+        return Response(res, status=HTTPStatus.BAD_REQUEST)
+
+    return Response(
+        json.dumps({"words": res}),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
+
+
 @blueprint.route("/api/group/<group_name>/word_appearances_index", methods=["GET"])
+@cached_response(corpus_version, groups_version)
 def get_group_word_appearances_index_api(group_name: str) -> Response:
+    """
+    curl 'http://localhost:4200/api/group/colors/word_appearances_index?stream=1'
+    with stream=1 the appearances are streamed as newline delimited JSON
+    """
     group_name = group_name.lower()
-    with Timer("get_group_word_appearances_index", log_params={"group_name": group_name}):
-        res = WordAppearanceModel.get_group_word_appearances_index(group_name)
+    if _is_stream_requested():
+        return _ndjson_response(WordAppearanceModel.iter_group_word_appearances_index(group_name))
+    res = WordAppearanceModel.get_group_word_appearances_index(group_name)
 
     return Response(
         json.dumps(res),
@@ -290,8 +509,7 @@ def add_phrase_api() -> Response:
         return Response("Request should contain 'phraseText'", status=HTTPStatus.BAD_REQUEST)
     # todo: rename phraseText -> phraseText
     phrase_text = request.json["phraseText"].lower()
-    with Timer("add_phrase", log_params={"phrase_text": phrase_text}):
-        success, res = add_phrase(phrase_text)
+    success, res = add_phrase(phrase_text)
     if success is False:
         return Response(res, status=HTTPStatus.BAD_REQUEST)
 
@@ -304,9 +522,14 @@ def add_phrase_api() -> Response:
 
 @blueprint.route("/api/phrase/<phrase_text>/reference", methods=["GET"])
 def get_phrase_reference_api(phrase_text: str) -> Response:
+    """
+    curl 'http://localhost:4200/api/phrase/in%20the%20beginning/reference?stream=1'
+    with stream=1 the references are streamed as newline delimited JSON
+    """
     phrase_text = phrase_text.lower()
-    with Timer("get_phrase_references", log_params={"phrase_text": phrase_text}):
-        res = get_phrase_references(phrase_text)
+    if _is_stream_requested():
+        return _ndjson_response(iter_phrase_references(phrase_text))
+    res = get_phrase_references(phrase_text)
 
     return Response(
         json.dumps(res),
@@ -317,18 +540,34 @@ def get_phrase_reference_api(phrase_text: str) -> Response:
 
 @blueprint.route("/api/book-to-delete/<book_name>", methods=["DELETE"])
 def delete_book_api(book_name: str) -> Response:
-    with Timer("delete_book_by_title", log_params={"book_name": book_name}):
-        BookModel.delete_book_by_title(book_name)
+    # the book is removed from every read right away, its data is deleted in the background
+    success, res = delete_book(book_name)
+    if success is False:
+        return Response(res, status=HTTPStatus.BAD_REQUEST)
     return Response(
-        "ok",
+        json.dumps(res),
+        status=HTTPStatus.ACCEPTED,
+        mimetype="application/json",
+    )
+
+
+@blueprint.route("/api/book_deletions/<job_id>", methods=["GET"])
+def get_book_deletion_api(job_id: str) -> Response:
+    job = get_book_deletion(job_id)
+    if job is None:
+        return Response(f"book deletion {job_id} doesn't exists", status=HTTPStatus.NOT_FOUND)
+    return Response(
+        json.dumps(job.to_dict()),
         status=HTTPStatus.OK,
-        mimetype="text/html",
+        mimetype="application/json",
     )
 
 
 @blueprint.route("/api/group-to-delete/<group_name>", methods=["DELETE"])
 def delete_group_api(group_name: str) -> Response:
-    GroupModel.delete_group_by_name(group_name)
+    success, res = delete_group(group_name)
+    if success is False:
+        return Response(res, status=HTTPStatus.BAD_REQUEST)
     return Response(
         "ok",
         status=HTTPStatus.OK,
@@ -346,11 +585,30 @@ def delete_phrase_api(phrase_text: str) -> Response:
     )
 
 
+@blueprint.route("/api/cache_stats", methods=["GET"])
+def get_cache_stats_api() -> Response:
+    return Response(
+        json.dumps(get_caches_stats()),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
+
+
+@blueprint.route("/metrics", methods=["GET"])
+def get_metrics_api() -> Response:
+    """
+    Latency histograms of the requests, SQL statements and timed operations, in the Prometheus text format
+    """
+    return Response(
+        render_metrics(), status=HTTPStatus.OK, content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @blueprint.route("/api/general_stats", methods=["GET"])
 def get_general_stats_api() -> Response:
-    book_length = len(BookModel.get_all_books())
-    group_length = len(GroupModel.get_all_groups_names())
-    phrase_length = len(PhraseModel.get_all_phrases())
+    book_length = BookModel.count_books()
+    group_length = GroupModel.count_groups()
+    phrase_length = PhraseModel.count_phrases()
 
     statistics = {
         "Total Number of Books": book_length,
@@ -367,6 +625,7 @@ def get_general_stats_api() -> Response:
 
 @blueprint.route("/api/books/<book_name>/stats", methods=["GET"])
 @blueprint.route("/api/books/stats", methods=["GET"])
+@cached_response(corpus_version)
 def get_book_stats_api(book_name: str | None = "") -> Response:
     if book_name == "":
         book_name = None
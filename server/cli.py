@@ -0,0 +1,73 @@
+import json
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from server.db_model.query_plans import find_full_scans, get_hot_queries
+from server.logic.structures import RawBook
+from server.service.books_services import add_books
+
+
+@click.command("bulk-load")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--division", help="Division of all the books, defaults to the name of each book's directory")
+@with_appcontext
+def bulk_load_command(paths: tuple[str, ...], division: str | None) -> None:
+    """
+    Add all the books in the given .txt files and directories, each book is named after its file.
+
+    flask --app app bulk-load tests/resources/Torah tests/resources/Neviim
+    """
+    file_paths: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths.extend(
+                os.path.join(path, file_name)
+                for file_name in sorted(os.listdir(path))
+                if file_name.endswith(".txt")
+            )
+        else:
+            file_paths.append(path)
+
+    raw_books = []
+    for file_path in file_paths:
+        with open(file_path, "rb") as file:
+            raw_books.append(
+                RawBook(
+                    name=os.path.splitext(os.path.basename(file_path))[0],
+                    division=division or os.path.basename(os.path.dirname(os.path.abspath(file_path))),
+                    raw_text=file.read(),
+                )
+            )
+
+    success, res = add_books(raw_books)
+    if success is False:
+        raise click.ClickException(str(res))
+    click.echo(json.dumps(res, indent=2))
+
+
+@click.command("check-query-plans")
+@with_appcontext
+def check_query_plans_command() -> None:
+    """
+    EXPLAIN the hot word_appearance queries against the loaded books, and fail if any of them reads
+    a whole large table, e.g. after an index was dropped or a query was changed.
+
+    flask --app app check-query-plans
+    """
+    try:
+        queries = get_hot_queries()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    num_failed = 0
+    for name, query in queries.items():
+        full_scans = find_full_scans(query)
+        if full_scans:
+            num_failed += 1
+            click.echo(f"FULL SCAN {name}: {'; '.join(full_scans)}")
+        else:
+            click.echo(f"ok        {name}")
+    if num_failed:
+        raise click.ClickException(f"{num_failed} of {len(queries)} queries read a whole table")
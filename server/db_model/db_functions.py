@@ -1,76 +1,520 @@
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Collection, Iterator, Sequence
+
+from sqlalchemy import Engine, insert
+
 from server.db_instance import db
+from server.db_model.dialect import insert_ignore
+from server.db_model.lookup_caches import deleted_book_ids_cache
 from server.db_model.model.book import BookModel
+from server.db_model.model.book_stats import BookStatsModel
 from server.db_model.model.chapter import ChapterModel
-from server.db_model.model.word import WordModel
+from server.db_model.model.verse import VerseModel
+from server.db_model.model.word import WORD_LOOKUP_CHUNK_SIZE, WordModel
 from server.db_model.model.word_appearance import WordAppearanceModel
-from server.logic.structures import BibleBook
+from server.db_model.model.word_frequency import WordFrequencyModel
+from server.db_model.model.word_in_group import WordInGroupModel
+from server.logic.structures import BibleBook, BookIngestSummary, VerseRecord
+from server.utils.timer import Timer
 
+# number of word_appearance rows sent to the db in a single executemany,
+# this is also the number of parsed words held in memory at any time during ingestion
+WORD_APPEARANCE_INSERT_CHUNK_SIZE = 5000
 
-# tod: add lock?..
-def insert_book_data_to_tables(book: BibleBook) -> None:
-    session = db.session
 
+class _WordDeletionGuard:
+    """
+    Lets any number of ingestions run together, or a single deletion of unused words alone:
+    the words an ingestion merged (and committed) must not be deleted before the rows that use them are written.
+    It's always taken before a transaction is opened, so no thread waits for it while holding db locks.
+    It guards the ingestions of this process only, in other processes the foreign keys make an ingestion
+    whose words were deleted meanwhile fail rather than write rows of missing words.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._num_ingestions = 0
+        self._is_deleting = False
+
+    @contextmanager
+    def ingestion(self) -> Iterator[None]:
+        with self._condition:
+            self._condition.wait_for(lambda: not self._is_deleting)
+            self._num_ingestions += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._num_ingestions -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def word_deletion(self) -> Iterator[None]:
+        with self._condition:
+            self._condition.wait_for(lambda: not self._is_deleting and not self._num_ingestions)
+            self._is_deleting = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._is_deleting = False
+                self._condition.notify_all()
+
+
+_word_deletion_guard = _WordDeletionGuard()
+
+# the books that this process is adding, they're hidden (marked as deleted) until all their rows are written
+_loading_book_ids: set[int] = set()
+
+
+def is_book_loading(book_id: int) -> bool:
+    return book_id in _loading_book_ids
+
+
+def merge_vocabulary(words: Collection[str]) -> dict[str, int]:
+    """
+    Make sure all the given words exist in the word table, and map each of them to its word_id.
+    The words are merged in a short transaction of their own, which is committed before this returns,
+    so the session must not hold uncommitted changes.
+    """
+    session = db.session
     try:
-        # Create new book
-        new_book = BookModel(
-            title=book.name,
-            division=book.division,
-            file_path=book.raw_text_path,
-            file_size=book.file_size,
-            num_chapters=book.num_chapters,
-        )
-        session.add(new_book)
-        session.flush()  # Ensures new_book.book_id is available
-        # Create new chapters
-        new_chapters = [
-            ChapterModel(
-                book_id=new_book.book_id, num_chapter=chapter.chapter_num, num_verses=chapter.num_verses
+        word_ids = WordModel.get_word_ids(words)
+        missing_words = [word for word in words if word not in word_ids]
+        if missing_words:
+            session.execute(
+                insert_ignore(WordModel.__table__),
+                [{"value": word, "length": len(word)} for word in missing_words],
             )
-            for chapter in book.chapters
-        ]
+            # the words that INSERT IGNORE skipped were committed by other transactions,
+            # possibly after the snapshot of this one was taken by the first read
+            word_ids.update(WordModel.get_word_ids(missing_words, locking_read=True))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return word_ids
 
-        session.add_all(new_chapters)
 
-        # Create new words
-        unique_words = list(
-            set(word for chapter in book.chapters for verse in chapter.verses for word in verse.words)
-        )
-        existing_words_model = WordModel.get_existing_words(unique_words)
-        existing_words = {word.value for word in existing_words_model}
+def _insert_hidden_book_row(
+    book: BibleBook, num_chapters: int, on_book_hidden: Callable[[], None] | None
+) -> int:
+    """
+    Insert and commit the row of a new book, marked as deleted: every read ignores the book,
+    as it does a book that is being deleted, while the rest of its rows are written in transactions of their own.
+    Once they all are, the book is revealed by clearing is_deleted.
+    """
+    new_book = BookModel(
+        title=book.name,
+        division=book.division,
+        file_path=book.raw_text_path,
+        file_size=book.file_size,
+        num_chapters=num_chapters,
+        is_deleted=True,
+    )
+    db.session.add(new_book)
+    db.session.commit()
+    _loading_book_ids.add(new_book.book_id)
+    # the ids of the deleted books are cached, the new book must be one of them before any of its rows is written
+    deleted_book_ids_cache.clear()
+    if on_book_hidden is not None:
+        on_book_hidden()
+    return new_book.book_id
 
-        new_words = [
-            WordModel(value=word, length=len(word)) for word in unique_words if word not in existing_words
-        ]
-        session.add_all(new_words)
-        session.flush()  # Ensures new_words.word_id are available
-
-        all_book_unique_words = existing_words_model + new_words
-
-        def get_word_id(word_value: str) -> int:
-            return next(word.word_id for word in all_book_unique_words if word.value == word_value)
-
-        new_word_appearances = []
-        for chapter in book.chapters:
-            for verse in chapter.verses:
-                # Create new word appearances
-                for index, word_str in enumerate(verse.words, start=1):
-                    new_word_appearances.append(
-                        WordAppearanceModel(
-                            book_id=new_book.book_id,
-                            word_id=get_word_id(word_str),
-                            verse_num=verse.verse_num,
-                            chapter_num=chapter.chapter_num,
-                            word_position=index,
+
+def _insert_chapters(book_id: int, last_verse_per_chapter: dict[int, VerseRecord]) -> None:
+    db.session.execute(
+        insert(ChapterModel),
+        [
+            {
+                "book_id": book_id,
+                "num_chapter": chapter_num,
+                "num_verses": last_verse.verse_num,
+                "byte_offset": last_verse.chapter_offset,
+            }
+            for chapter_num, last_verse in last_verse_per_chapter.items()
+        ],
+    )
+
+
+def _insert_book_stats(summary: BookIngestSummary) -> None:
+    db.session.execute(
+        insert(BookStatsModel),
+        [
+            {
+                "book_id": summary.book_id,
+                "num_chapters": summary.num_chapters,
+                "num_verses": summary.num_verses,
+                "num_words": summary.num_words,
+                "num_unique_words": summary.num_unique_words,
+                "num_letters": summary.num_letters,
+            }
+        ],
+    )
+
+
+def _insert_word_frequencies(book_id: int, word_counts: Counter[str], word_ids: dict[str, int]) -> None:
+    db.session.execute(
+        insert(WordFrequencyModel),
+        [
+            {"word_id": word_ids[word], "book_id": book_id, "count": count}
+            for word, count in word_counts.items()
+        ],
+    )
+
+
+def _iter_verse_chunks(verses: Iterator[VerseRecord]) -> Iterator[list[VerseRecord]]:
+    """
+    Group the verses to chunks of at least WORD_APPEARANCE_INSERT_CHUNK_SIZE words (except for the last one)
+    """
+    chunk: list[VerseRecord] = []
+    num_words = 0
+    for verse in verses:
+        chunk.append(verse)
+        num_words += len(verse.words)
+        if num_words >= WORD_APPEARANCE_INSERT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+            num_words = 0
+    if chunk:
+        yield chunk
+
+
+def _word_appearance_rows(book_id: int, verses: list[VerseRecord], word_ids: dict[str, int]) -> list[dict]:
+    return [
+        {
+            "book_id": book_id,
+            "word_id": word_ids[word_str],
+            "chapter_num": verse.chapter_num,
+            "verse_num": verse.verse_num,
+            "word_position": index,
+        }
+        for verse in verses
+        for index, word_str in enumerate(verse.words, start=1)
+    ]
+
+
+def _verse_rows(book_id: int, verses: list[VerseRecord]) -> list[dict]:
+    return [
+        {
+            "book_id": book_id,
+            "chapter_num": verse.chapter_num,
+            "verse_num": verse.verse_num,
+            "text": " ".join(verse.words),
+            "num_words": len(verse.words),
+            "byte_offset": verse.byte_offset,
+            "byte_length": verse.byte_length,
+        }
+        for verse in verses
+    ]
+
+
+def _insert_verses_chunk(
+    book_id: int,
+    verses: list[VerseRecord],
+    word_ids: dict[str, int],
+    phase_times: dict[str, float],
+) -> None:
+    """
+    Insert the verses and their word appearances in a transaction of their own,
+    adding the words that are missing from `word_ids` to the word table first.
+    """
+    start_time = perf_counter()
+    missing_words = {word for verse in verses for word in verse.words if word not in word_ids}
+    if missing_words:
+        word_ids.update(merge_vocabulary(missing_words))
+    vocabulary_time = perf_counter()
+    db.session.execute(
+        WordAppearanceModel.__table__.insert(), _word_appearance_rows(book_id, verses, word_ids)
+    )
+    db.session.execute(VerseModel.__table__.insert(), _verse_rows(book_id, verses))
+    db.session.commit()
+    phase_times["insert_book_vocabulary_upsert"] += vocabulary_time - start_time
+    phase_times["insert_book_word_appearances"] += perf_counter() - vocabulary_time
+
+
+def _delete_failed_book(book_id: int, book_name: str) -> None:
+    try:
+        _delete_book_rows(book_id)
+    except Exception as e:
+        # the book stays hidden, deleting it again removes what is left of it
+        print(f"An error occurred while deleting the failed book {book_name}: {e}")
+
+
+def _delete_words_of_failed_books(word_ids: Collection[int]) -> None:
+    """
+    merge_vocabulary commits the words on their own, so the words of a failed book that no other book uses
+    are left behind by _delete_failed_book. It's called once the ingestion is over, as delete_unused_words waits
+    for the running ingestions of this process
+    """
+    try:
+        delete_unused_words(sorted(word_ids))
+    except Exception as e:
+        print(f"An error occurred while deleting the words of the failed books: {e}")
+
+
+def insert_book_data_to_tables(
+    book: BibleBook, on_book_hidden: Callable[[], None] | None = None
+) -> BookIngestSummary:
+    """
+    Insert a book to the db, it's hidden from reads until all of it is written (see _insert_hidden_book_row).
+    `book.verses` is consumed once, in chunks of WORD_APPEARANCE_INSERT_CHUNK_SIZE words,
+    so a lazily parsed book is never fully held in memory, and every chunk is committed on its own
+    so no transaction holds its locks for the whole book.
+    A book that failed to be written is deleted.
+    `on_book_hidden` is called once the hidden book row is committed, before any other row of the book is written,
+    e.g. to let the other processes know about the hidden book.
+    """
+    session = db.session
+    phase_times = {
+        "parse_book": 0.0,
+        "insert_book_vocabulary_upsert": 0.0,
+        "insert_book_word_appearances": 0.0,
+    }
+    last_verse_per_chapter: dict[int, VerseRecord] = {}
+    word_counts: Counter[str] = Counter()
+    num_verses = num_words = num_letters = 0
+
+    def read_verses() -> Iterator[VerseRecord]:
+        nonlocal num_verses, num_words, num_letters
+        verses = iter(book.verses)
+        while True:
+            start_time = perf_counter()
+            verse = next(verses, None)
+            phase_times["parse_book"] += perf_counter() - start_time
+            if verse is None:
+                return
+            last_verse_per_chapter[verse.chapter_num] = verse
+            num_verses += 1
+            num_words += len(verse.words)
+            num_letters += sum(len(word) for word in verse.words)
+            word_counts.update(verse.words)
+            yield verse
+
+    book_id = None
+    word_ids: dict[str, int] = {}
+    try:
+        with _word_deletion_guard.ingestion():
+            try:
+                start_time = perf_counter()
+                # Create new book, num_chapters is known only after all verses were read
+                book_id = _insert_hidden_book_row(book, num_chapters=0, on_book_hidden=on_book_hidden)
+
+                for chunk in _iter_verse_chunks(read_verses()):
+                    _insert_verses_chunk(book_id, chunk, word_ids, phase_times)
+
+                _insert_chapters(book_id, last_verse_per_chapter)
+                _insert_word_frequencies(book_id, word_counts, word_ids)
+                summary = BookIngestSummary(
+                    book_id=book_id,
+                    num_chapters=len(last_verse_per_chapter),
+                    num_verses=num_verses,
+                    num_words=num_words,
+                    # word_ids holds exactly the words of this book
+                    num_unique_words=len(word_ids),
+                    num_letters=num_letters,
+                    run_time=0.0,
+                )
+                _insert_book_stats(summary)
+                # reveal the book together with its last rows
+                session.query(BookModel).filter_by(book_id=book_id).update(
+                    {"num_chapters": len(last_verse_per_chapter), "is_deleted": False}
+                )
+                session.commit()
+                # it may have been cached as deleted, and then its rows (e.g. for the word index) are ignored
+                deleted_book_ids_cache.clear()
+
+                summary.run_time = perf_counter() - start_time
+                for phase, run_time in phase_times.items():
+                    Timer(phase, log_params={"book_name": book.name}).log_run_time(run_time)
+                print("Data inserted successfully.")
+                return summary
+            except Exception as e:
+                session.rollback()  # Rollback the transaction on error
+                print(f"An error occurred: {e}")
+                if book_id is not None:
+                    _delete_failed_book(book_id, book.name)
+                raise e
+            finally:
+                if book_id is not None:
+                    _loading_book_ids.discard(book_id)
+                session.close()
+    except Exception:
+        if word_ids:
+            _delete_words_of_failed_books(word_ids.values())
+        raise
+
+
+def _insert_verse_rows(engine: Engine, word_appearance_rows: list[dict], verse_rows: list[dict]) -> None:
+    # runs in a worker thread, so it uses its own connection and transaction rather than the scoped session
+    with engine.begin() as connection:
+        connection.execute(WordAppearanceModel.__table__.insert(), word_appearance_rows)
+        connection.execute(VerseModel.__table__.insert(), verse_rows)
+
+
+def insert_parsed_books_to_tables(
+    books: list[BibleBook], num_workers: int, on_book_hidden: Callable[[], None] | None = None
+) -> list[BookIngestSummary | Exception]:
+    """
+    Insert already parsed books (`book.verses` is a list), returns a summary or the raised error for each book.
+    The vocabulary of all the books is merged once up front, then the word appearances of every book
+    (and verses) are written in parallel chunks by `num_workers` threads.
+    Every book is hidden from reads until all of its chunks are written (see _insert_hidden_book_row),
+    and a book that failed to be written is deleted once none of its chunks is being written anymore.
+    `on_book_hidden` is called as in insert_book_data_to_tables.
+    """
+    session = db.session
+    engine = db.engine
+
+    results: list[BookIngestSummary | Exception] = []
+    failed_word_ids: set[int] = set()
+    with _word_deletion_guard.ingestion():
+        with Timer("insert_books_vocabulary_upsert", log_params={"num_books": len(books)}):
+            vocabulary = {word for book in books for verse in book.verses for word in verse.words}
+            word_ids = merge_vocabulary(vocabulary)
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for book in books:
+                start_time = perf_counter()
+                book_id = None
+                futures: list[Future] = []
+                try:
+                    verses = list(book.verses)
+                    last_verse_per_chapter = {verse.chapter_num: verse for verse in verses}
+                    word_counts = Counter(word for verse in verses for word in verse.words)
+                    book_id = _insert_hidden_book_row(
+                        book, num_chapters=len(last_verse_per_chapter), on_book_hidden=on_book_hidden
+                    )
+                    _insert_chapters(book_id, last_verse_per_chapter)
+                    summary = BookIngestSummary(
+                        book_id=book_id,
+                        num_chapters=len(last_verse_per_chapter),
+                        num_verses=len(verses),
+                        num_words=sum(word_counts.values()),
+                        num_unique_words=len(word_counts),
+                        num_letters=sum(len(word) * count for word, count in word_counts.items()),
+                        run_time=0.0,
+                    )
+                    _insert_book_stats(summary)
+                    _insert_word_frequencies(book_id, word_counts, word_ids)
+                    session.commit()
+
+                    for chunk in _iter_verse_chunks(iter(verses)):
+                        futures.append(
+                            executor.submit(
+                                _insert_verse_rows,
+                                engine,
+                                _word_appearance_rows(book_id, chunk, word_ids),
+                                _verse_rows(book_id, chunk),
+                            )
                         )
+                    for future in futures:
+                        future.result()
+
+                    session.query(BookModel).filter_by(book_id=book_id).update({"is_deleted": False})
+                    session.commit()
+                    deleted_book_ids_cache.clear()
+                    summary.run_time = perf_counter() - start_time
+                    print(
+                        f"inserted book {book.name}: {summary.num_words} words in {round(summary.run_time, 3)} seconds"
+                        f" ({round(summary.num_words / summary.run_time)} words/second)"
                     )
-        session.add_all(new_word_appearances)
+                    results.append(summary)
+                except Exception as e:
+                    print(f"An error occurred while inserting book {book.name}: {e}")
+                    session.rollback()
+                    # the chunks that are still being written would outlive the deletion of the book's rows
+                    wait(futures)
+                    if book_id is not None:
+                        _delete_failed_book(book_id, book.name)
+                    failed_word_ids.update(word_ids[word] for verse in book.verses for word in verse.words)
+                    results.append(e)
+                finally:
+                    if book_id is not None:
+                        _loading_book_ids.discard(book_id)
+    session.close()
+    if failed_word_ids:
+        _delete_words_of_failed_books(failed_word_ids)
+    return results
 
-        # Commit the transaction
+
+def delete_book_data_from_tables(
+    book_id: int,
+    on_chapter_deleted: Callable[[int], None] | None = None,
+    before_book_row_deleted: Callable[[], None] | None = None,
+) -> int:
+    """
+    Delete a book in small transactions: its word appearances and verses are deleted chapter by chapter,
+    so the tables are never locked for the whole book, then the rest of its rows.
+    The words that were left unused by any book or group are deleted too, returns their number.
+    `on_chapter_deleted` is called with the number of every chapter once it's deleted.
+    `before_book_row_deleted` is called while the book row still holds the title, e.g. to delete the raw file
+    before a new book of the same title can be added.
+    """
+    word_ids = _delete_book_rows(book_id, on_chapter_deleted, before_book_row_deleted)
+    return delete_unused_words(word_ids)
+
+
+def _delete_book_rows(
+    book_id: int,
+    on_chapter_deleted: Callable[[int], None] | None = None,
+    before_book_row_deleted: Callable[[], None] | None = None,
+) -> list[int]:
+    """
+    Delete all the rows of a book, returns the ids of its words
+    """
+    session = db.session
+    try:
+        word_ids = [
+            row.word_id
+            for row in session.query(WordFrequencyModel.word_id).filter(WordFrequencyModel.book_id == book_id)
+        ]
+        chapter_nums = [
+            row.num_chapter
+            for row in session.query(ChapterModel.num_chapter)
+            .filter(ChapterModel.book_id == book_id)
+            .order_by(ChapterModel.num_chapter)
+        ]
+        for chapter_num in chapter_nums:
+            for model in (WordAppearanceModel, VerseModel):
+                session.query(model).filter(
+                    model.book_id == book_id, model.chapter_num == chapter_num
+                ).delete(synchronize_session=False)
+            session.commit()
+            if on_chapter_deleted is not None:
+                on_chapter_deleted(chapter_num)
+
+        if before_book_row_deleted is not None:
+            before_book_row_deleted()
+        # whatever is left of a book whose chapters were cut short by a failed ingestion
+        for model in (WordAppearanceModel, VerseModel, WordFrequencyModel, ChapterModel, BookStatsModel):
+            session.query(model).filter(model.book_id == book_id).delete(synchronize_session=False)
+        session.query(BookModel).filter(BookModel.book_id == book_id).delete(synchronize_session=False)
         session.commit()
-        print("Data inserted successfully.")
-    except Exception as e:
-        session.rollback()  # Rollback the transaction on error
-        print(f"An error occurred: {e}")
-        raise e
-    finally:
-        session.close()
+        return word_ids
+    except Exception:
+        session.rollback()
+        raise
+
+
+def delete_unused_words(word_ids: Sequence[int]) -> int:
+    """
+    Delete the given words that no book nor group uses anymore, returns the number of deleted words.
+    It waits for the running ingestions of this process, see _WordDeletionGuard
+    """
+    session = db.session
+    num_deleted = 0
+    with _word_deletion_guard.word_deletion():
+        for start in range(0, len(word_ids), WORD_LOOKUP_CHUNK_SIZE):
+            chunk = word_ids[start : start + WORD_LOOKUP_CHUNK_SIZE]
+            query = session.query(WordModel).filter(WordModel.word_id.in_(chunk))
+            for model in (WordFrequencyModel, WordAppearanceModel, WordInGroupModel):
+                used = session.query(model.word_id).filter(model.word_id == WordModel.word_id)
+                query = query.filter(~used.exists())
+            num_deleted += query.delete(synchronize_session=False)
+            session.commit()
+    return num_deleted
@@ -0,0 +1,46 @@
+"""
+The SQL that differs between the supported backends, MySQL and SQLite, so the models build the same queries
+(and get the same results) on both
+"""
+import sqlite3
+from typing import Any
+
+from sqlalchemy import BigInteger, ColumnElement, Engine, String, Table, cast, event, func
+from sqlalchemy.sql.dml import Insert
+
+
+def insert_ignore(table: Table) -> Insert:
+    """
+    An INSERT that skips the rows that would duplicate a unique key
+    """
+    return table.insert().prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+
+
+def case_insensitive_string(length: int) -> String:
+    """
+    A VARCHAR that's compared (=, IN, ORDER BY, unique keys) regardless of case, as it is on MySQL under the
+    db's default utf8 collation. SQLite compares strings byte by byte unless the column is NOCASE, which folds
+    the ASCII letters only (the words of other scripts are lowercased by the tokenizer anyway)
+    """
+    return String(length).with_variant(String(length, collation="NOCASE"), "sqlite")
+
+
+def integer_sum(column: Any) -> ColumnElement[int]:
+    """
+    SUM of an integer column, which is a DECIMAL on MySQL (and an integer on SQLite), as an integer on both
+    """
+    return cast(func.sum(column), BigInteger)
+
+
+def enable_sqlite_pragmas(engine: Engine, pragmas: dict[str, str | int]) -> None:
+    """
+    Set the pragmas on every new connection of a SQLite engine, they're per connection
+    (except for journal_mode, which is kept in the db file)
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: sqlite3.Connection, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
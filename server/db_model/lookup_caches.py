@@ -0,0 +1,10 @@
+from server.utils.cache import LRUCache
+
+# small, hot and read mostly lookups of names to ids, they're cleared by server/service/cache_invalidation.py
+book_id_cache = LRUCache("book_id", max_size=1024)
+word_id_cache = LRUCache("word_id", max_size=65536)
+group_id_cache = LRUCache("group_id", max_size=1024)
+group_word_ids_cache = LRUCache("group_word_ids", max_size=256)
+num_verses_cache = LRUCache("num_verses", max_size=16384)
+# holds a single entry, the ids of the books that are being deleted
+deleted_book_ids_cache = LRUCache("deleted_book_ids", max_size=1)
@@ -1,47 +1,95 @@
 from datetime import datetime
 from typing import Self
 
-from sqlalchemy import DateTime, UniqueConstraint, func
+from sqlalchemy import Column, DateTime, UniqueConstraint, false, func
+from sqlalchemy.orm import Query
 
 from server.db_instance import db
+from server.db_model.dialect import case_insensitive_string
+from server.db_model.lookup_caches import book_id_cache, deleted_book_ids_cache
 
 
 class BookModel(db.Model):
     __tablename__ = "book"
 
     book_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    title = db.Column(db.String(32), nullable=False, unique=True)
-    division = db.Column(db.String(32), nullable=False)
+    title = db.Column(case_insensitive_string(32), nullable=False, unique=True)
+    division = db.Column(case_insensitive_string(32), nullable=False)
     file_path = db.Column(db.String(128), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
     num_chapters = db.Column(db.Integer, nullable=False)
     insert_date = db.Column(DateTime(), nullable=False, default=datetime.utcnow)
+    # set when the book starts being deleted, its rows are then removed in the background
+    # and every read ignores the book from this moment. A book that is being added is hidden the same way
+    # until all its rows are written
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False, server_default=false())
 
     __table_args__ = (UniqueConstraint("title"),)
 
+    @classmethod
+    def _live_books(cls, *entities: Column) -> Query:
+        return db.session.query(*(entities or [BookModel])).filter(BookModel.is_deleted.is_(False))
+
     @classmethod
     def does_book_exist(cls, title: str) -> bool:
+        # a book that is being deleted still holds its title (and its file path)
         return db.session.query(BookModel.book_id).filter_by(title=title.lower()).scalar() is not None
 
     @classmethod
     def get_all_books(cls) -> list[Self]:
-        return db.session.query(BookModel).all()
+        return cls._live_books().all()
+
+    @classmethod
+    def count_books(cls) -> int:
+        return cls._live_books(func.count(BookModel.book_id)).scalar()
 
     @classmethod
     def get_all_book_names(cls) -> list[str]:
-        return [row.title for row in db.session.query(BookModel.title).all()]
+        return [row.title for row in cls._live_books(BookModel.title).all()]
+
+    @classmethod
+    def get_book_titles(cls) -> dict[int, str]:
+        return {row.book_id: row.title for row in cls._live_books(BookModel.book_id, BookModel.title).all()}
 
     @classmethod
-    def get_book(cls, title: str) -> Self | None:
-        return db.session.query(BookModel).filter_by(title=title.lower()).one_or_none()
+    def get_book(cls, title: str, include_deleted: bool = False) -> Self | None:
+        query = db.session.query(BookModel) if include_deleted else cls._live_books()
+        return query.filter_by(title=title.lower()).one_or_none()
 
     @classmethod
     def get_book_id(cls, title: str) -> int | None:
-        return db.session.query(BookModel.book_id).filter_by(title=title.lower()).scalar()
+        title = title.lower()
+        return book_id_cache.get_or_compute(
+            title, lambda: cls._live_books(BookModel.book_id).filter_by(title=title).scalar()
+        )
 
     @classmethod
     def get_book_file_path(cls, title: str) -> str | None:
-        return db.session.query(BookModel.file_path).filter_by(title=title.lower()).scalar()
+        return cls._live_books(BookModel.file_path).filter_by(title=title.lower()).scalar()
+
+    @classmethod
+    def get_deleted_book_ids(cls) -> list[int]:
+        # the books that are being deleted or added
+        return deleted_book_ids_cache.get_or_compute(
+            None,
+            lambda: [row.book_id for row in db.session.query(BookModel.book_id).filter(BookModel.is_deleted)],
+        )
+
+    @classmethod
+    def exclude_deleted_books(cls, query: Query, book_id_column: Column) -> Query:
+        """
+        Filter out the rows of the books that are being deleted, from a query that isn't joined with book.
+        There are usually none, and then the query is left as is.
+        """
+        deleted_book_ids = cls.get_deleted_book_ids()
+        if deleted_book_ids:
+            query = query.filter(book_id_column.not_in(deleted_book_ids))
+        return query
+
+    @classmethod
+    def mark_book_deleted(cls, book_id: int) -> None:
+        db.session.query(BookModel).filter_by(book_id=book_id).update({"is_deleted": True})
+        db.session.commit()
 
     @classmethod
     def delete_book_by_title(cls, title: str) -> None:
@@ -50,88 +98,24 @@ class BookModel(db.Model):
 
     @classmethod
     def get_book_statistics(cls, book_name: str | None) -> dict:
-        from server.db_model.model.chapter import ChapterModel
+        from server.db_model.model.book_stats import BookStatsModel
         from server.db_model.model.word import WordModel
-        from server.db_model.model.word_appearance import WordAppearanceModel
 
-        book_id: str | None = None
         book = BookModel.get_book(book_name) if book_name else None
-        # Number of Chapters
-        if book:
-            num_chapters = book.num_chapters
-            book_id = book.book_id
+        book_stats = BookStatsModel.get_book_stats(book.book_id) if book else None
+        if book_stats:
+            num_chapters = book_stats.num_chapters
+            num_verses = book_stats.num_verses
+            num_words = book_stats.num_words
+            unique_words_count = book_stats.num_unique_words
+            total_letters = book_stats.num_letters
         else:
-            num_chapters = db.session.query(func.sum(BookModel.num_chapters)).scalar()
-
-        # Total Number of Verses
-        verse_query = db.session.query(func.sum(ChapterModel.num_verses))
-        if book_id:
-            verse_query = verse_query.filter(ChapterModel.book_id == book_id)
-        num_verses = verse_query.scalar()
-
-        # Total Number of Words
-        word_query = db.session.query(func.count(WordAppearanceModel.index))
-        if book_id:
-            word_query = word_query.filter(WordAppearanceModel.book_id == book_id)
-        num_words = word_query.scalar()
-
-        # Unique Words Count
-        unique_word_query = db.session.query(func.count(func.distinct(WordAppearanceModel.word_id)))
-        if book_id:
-            unique_word_query = unique_word_query.filter(WordAppearanceModel.book_id == book_id)
-        unique_words_count = unique_word_query.scalar()
-
-        # Total Number of Letters
-        letter_query = db.session.query(func.sum(WordModel.length)).join(
-            WordAppearanceModel, WordModel.word_id == WordAppearanceModel.word_id
-        )
-        if book_id:
-            letter_query = letter_query.filter(WordAppearanceModel.book_id == book_id)
-        total_letters = letter_query.scalar()
-
-        # Average Number of Verses per Chapter
-        avg_verses_per_chapter_query = db.session.query(func.avg(ChapterModel.num_verses))
-        if book_id:
-            avg_verses_per_chapter_query = avg_verses_per_chapter_query.filter(
-                ChapterModel.book_id == book_id
-            )
-        avg_verses_per_chapter = avg_verses_per_chapter_query.scalar()
-
-        # Average Number of Words per Verse
-        word_count_subquery = db.session.query(
-            WordAppearanceModel.book_id,
-            WordAppearanceModel.chapter_num,
-            WordAppearanceModel.verse_num,
-            func.count(WordAppearanceModel.word_id).label("word_count"),
-        )
-
-        if book_id is not None:
-            word_count_subquery = word_count_subquery.filter(WordAppearanceModel.book_id == book_id)
-
-        word_count_subquery = word_count_subquery.group_by(
-            WordAppearanceModel.book_id, WordAppearanceModel.chapter_num, WordAppearanceModel.verse_num
-        ).subquery()
-
-        avg_words_per_verse_query = db.session.query(func.avg(word_count_subquery.c.word_count)).scalar()
-
-        # Average Number of Letters per Verse
-        letter_count_subquery = db.session.query(
-            WordAppearanceModel.book_id,
-            WordAppearanceModel.chapter_num,
-            WordAppearanceModel.verse_num,
-            func.sum(WordModel.length).label("letter_count"),
-        ).join(WordModel, WordModel.word_id == WordAppearanceModel.word_id)
-
-        if book_id is not None:
-            letter_count_subquery = letter_count_subquery.filter(WordAppearanceModel.book_id == book_id)
-
-        letter_count_subquery = letter_count_subquery.group_by(
-            WordAppearanceModel.book_id, WordAppearanceModel.chapter_num, WordAppearanceModel.verse_num
-        ).subquery()
-
-        avg_letters_per_verse_query = db.session.query(
-            func.avg(letter_count_subquery.c.letter_count)
-        ).scalar()
+            corpus_totals = BookStatsModel.get_corpus_totals()
+            num_chapters = corpus_totals["num_chapters"]
+            num_verses = corpus_totals["num_verses"]
+            num_words = corpus_totals["num_words"]
+            unique_words_count = WordModel.count_words_in_use()
+            total_letters = corpus_totals["num_letters"]
 
         return {
             "numChapters": num_chapters,
@@ -139,7 +123,7 @@ class BookModel(db.Model):
             "totalWords": num_words,
             "totalUniqueWords": unique_words_count,
             "totalLetters": total_letters,
-            "avgVersesPerChapter": int(avg_verses_per_chapter),
-            "avgWordsPerVerse": int(avg_words_per_verse_query),
-            "avgLettersPerVerse": int(avg_letters_per_verse_query),
+            "avgVersesPerChapter": num_verses // num_chapters if num_chapters else 0,
+            "avgWordsPerVerse": num_words // num_verses if num_verses else 0,
+            "avgLettersPerVerse": total_letters // num_verses if num_verses else 0,
         }
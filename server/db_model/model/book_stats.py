@@ -0,0 +1,47 @@
+from typing import Self
+
+from sqlalchemy import func
+
+from server.db_instance import db
+from server.db_model.dialect import integer_sum
+from server.db_model.model.book import BookModel
+
+
+class BookStatsModel(db.Model):
+    """
+    Per book counts, written together with the book's word appearances.
+    The corpus only changes when a book is added or deleted, so the statistics are never aggregated
+    over word_appearance at query time.
+    """
+
+    __tablename__ = "book_stats"
+
+    book_id = db.Column(db.Integer, db.ForeignKey("book.book_id", ondelete="CASCADE"), primary_key=True)
+    num_chapters = db.Column(db.Integer, nullable=False)
+    num_verses = db.Column(db.Integer, nullable=False)
+    num_words = db.Column(db.Integer, nullable=False)
+    num_unique_words = db.Column(db.Integer, nullable=False)
+    num_letters = db.Column(db.Integer, nullable=False)
+
+    @classmethod
+    def get_book_stats(cls, book_id: int) -> Self | None:
+        return db.session.get(BookStatsModel, book_id)
+
+    @classmethod
+    def get_corpus_totals(cls) -> dict[str, int]:
+        """
+        Sum the stats of all the books (unique words can't be summed, see WordModel.count_words_in_use)
+        """
+        query = db.session.query(
+            func.coalesce(integer_sum(BookStatsModel.num_chapters), 0).label("num_chapters"),
+            func.coalesce(integer_sum(BookStatsModel.num_verses), 0).label("num_verses"),
+            func.coalesce(integer_sum(BookStatsModel.num_words), 0).label("num_words"),
+            func.coalesce(integer_sum(BookStatsModel.num_letters), 0).label("num_letters"),
+        )
+        row = BookModel.exclude_deleted_books(query, BookStatsModel.book_id).one()
+        return {
+            "num_chapters": row.num_chapters,
+            "num_verses": row.num_verses,
+            "num_words": row.num_words,
+            "num_letters": row.num_letters,
+        }
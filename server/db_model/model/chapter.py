@@ -1,6 +1,7 @@
 from sqlalchemy import UniqueConstraint
 
 from server.db_instance import db
+from server.db_model.lookup_caches import num_verses_cache
 
 
 class ChapterModel(db.Model):
@@ -9,11 +10,19 @@ class ChapterModel(db.Model):
     book_id = db.Column(db.Integer, db.ForeignKey("book.book_id", ondelete="CASCADE"), primary_key=True)
     num_chapter = db.Column(db.Integer, primary_key=True)
     num_verses = db.Column(db.Integer, nullable=False)
+    # where the chapter header starts in the raw text of the book, unknown for books whose file was missing
+    byte_offset = db.Column(db.BigInteger, nullable=True)
 
     __table_args__ = (UniqueConstraint("book_id", "num_chapter"),)
 
     @classmethod
     def get_num_verses(cls, book_id: int, chapter_number: int) -> int | None:
+        return num_verses_cache.get_or_compute(
+            (book_id, int(chapter_number)), lambda: cls._query_num_verses(book_id, chapter_number)
+        )
+
+    @classmethod
+    def _query_num_verses(cls, book_id: int, chapter_number: int) -> int:
         # Query the chapter by book_id and chapter number
         chapter = (
             db.session.query(ChapterModel)
@@ -24,3 +33,22 @@ class ChapterModel(db.Model):
             return -2
 
         return chapter.num_verses
+
+    @classmethod
+    def get_byte_range(cls, book_id: int, chapter_number: int) -> tuple[int | None, int | None] | None:
+        """
+        Get the (start, end) byte offsets of the chapter in the raw text of the book,
+        end is None for the last chapter, which runs to the end of the file.
+        Returns None if the book has no such chapter.
+        """
+        offsets = dict(
+            db.session.query(ChapterModel.num_chapter, ChapterModel.byte_offset)
+            .filter(
+                ChapterModel.book_id == book_id,
+                ChapterModel.num_chapter.in_([chapter_number, chapter_number + 1]),
+            )
+            .all()
+        )
+        if chapter_number not in offsets:
+            return None
+        return offsets[chapter_number], offsets.get(chapter_number + 1)
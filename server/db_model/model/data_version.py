@@ -0,0 +1,40 @@
+from server.db_instance import db
+from server.db_model.dialect import insert_ignore
+
+# the versioned data
+CORPUS_VERSION = "corpus"
+GROUPS_VERSION = "groups"
+
+
+class DataVersionModel(db.Model):
+    """
+    The version of some data (the books, the groups), bumped whenever it changes.
+    It's kept in the db rather than in memory, so every process (the server's workers, the bulk-load command)
+    sees the changes made by the others, see server/service/cache_invalidation.py
+    """
+
+    __tablename__ = "data_version"
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+    @classmethod
+    def get_versions(cls) -> dict[str, int]:
+        return {row.name: row.version for row in db.session.query(cls.name, cls.version)}
+
+    @classmethod
+    def bump(cls, name: str) -> int:
+        """
+        Increment the version in a transaction of its own, returns the new version
+        """
+        session = db.session
+        try:
+            # a db created from the models (rather than by the migrations) starts without the rows
+            session.execute(insert_ignore(cls.__table__), [{"name": name, "version": 0}])
+            session.query(cls).filter_by(name=name).update({"version": cls.version + 1})
+            version = session.query(cls.version).filter_by(name=name).scalar()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return version
@@ -1,13 +1,15 @@
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, func
 
 from server.db_instance import db
+from server.db_model.dialect import case_insensitive_string
+from server.db_model.lookup_caches import group_id_cache
 
 
 class GroupModel(db.Model):
     __tablename__ = "group"
 
     group_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String(50), nullable=False, unique=True)
+    name = db.Column(case_insensitive_string(50), nullable=False, unique=True)
 
     __table_args__ = (UniqueConstraint("name", name="uq_group_name"),)
 
@@ -19,9 +21,16 @@ class GroupModel(db.Model):
     def get_all_groups_names(cls) -> list[str]:
         return [row.name for row in db.session.query(GroupModel.name).all()]
 
+    @classmethod
+    def count_groups(cls) -> int:
+        return db.session.query(func.count(GroupModel.group_id)).scalar()
+
     @classmethod
     def get_group_id(cls, group_name: str) -> int | None:
-        return db.session.query(GroupModel.group_id).filter_by(name=group_name.lower()).scalar()
+        group_name = group_name.lower()
+        return group_id_cache.get_or_compute(
+            group_name, lambda: db.session.query(GroupModel.group_id).filter_by(name=group_name).scalar()
+        )
 
     @classmethod
     def insert_group(cls, group_name: str) -> None:
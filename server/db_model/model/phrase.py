@@ -1,13 +1,14 @@
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, func
 
 from server.db_instance import db
+from server.db_model.dialect import case_insensitive_string
 
 
 class PhraseModel(db.Model):
     __tablename__ = "phrase"
 
     phrase_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    phrase_text = db.Column(db.String(100), nullable=False, unique=True)
+    phrase_text = db.Column(case_insensitive_string(100), nullable=False, unique=True)
 
     __table_args__ = (UniqueConstraint("phrase_text", name="uq_group_name"),)
 
@@ -19,6 +20,10 @@ class PhraseModel(db.Model):
     def get_all_phrases(cls) -> list[str]:
         return [row.phrase_text for row in db.session.query(PhraseModel.phrase_text).all()]
 
+    @classmethod
+    def count_phrases(cls) -> int:
+        return db.session.query(func.count(PhraseModel.phrase_id)).scalar()
+
     @classmethod
     def insert_phrase(cls, phrase_text: str) -> None:
         session = db.session
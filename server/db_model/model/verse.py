@@ -0,0 +1,58 @@
+from server.db_instance import db
+
+
+class VerseModel(db.Model):
+    """
+    The text of every verse, as the space separated words of its word appearances.
+    Verses never change after a book is added, so the text is stored once at ingestion
+    instead of being concatenated from word_appearance on every read.
+    """
+
+    __tablename__ = "verse"
+
+    book_id = db.Column(db.Integer, db.ForeignKey("book.book_id", ondelete="CASCADE"), primary_key=True)
+    chapter_num = db.Column(db.Integer, primary_key=True)
+    verse_num = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.Text, nullable=False)
+    num_words = db.Column(db.Integer, nullable=False)
+    # where the original line of the verse is in the raw text of the book, unknown for books whose file was missing
+    byte_offset = db.Column(db.BigInteger, nullable=True)
+    byte_length = db.Column(db.Integer, nullable=True)
+
+    @classmethod
+    def get_verses_text(
+        cls, book_id: int, chapter_num: int, start_verse: int, end_verse: int
+    ) -> list[tuple[int, str]]:
+        """
+        Get (verse_num, text) of the verses in the range [start_verse, end_verse] of the chapter
+        """
+        rows = (
+            db.session.query(VerseModel.verse_num, VerseModel.text)
+            .filter(
+                VerseModel.book_id == book_id,
+                VerseModel.chapter_num == chapter_num,
+                VerseModel.verse_num.between(start_verse, end_verse),
+            )
+            .order_by(VerseModel.verse_num)
+            .all()
+        )
+        return [(row.verse_num, row.text) for row in rows]
+
+    @classmethod
+    def get_verses_byte_ranges(
+        cls, book_id: int, chapter_num: int, start_verse: int, end_verse: int
+    ) -> list[tuple[int, int | None, int | None]]:
+        """
+        Get (verse_num, byte_offset, byte_length) of the verses in the range [start_verse, end_verse] of the chapter
+        """
+        rows = (
+            db.session.query(VerseModel.verse_num, VerseModel.byte_offset, VerseModel.byte_length)
+            .filter(
+                VerseModel.book_id == book_id,
+                VerseModel.chapter_num == chapter_num,
+                VerseModel.verse_num.between(start_verse, end_verse),
+            )
+            .order_by(VerseModel.verse_num)
+            .all()
+        )
+        return [(row.verse_num, row.byte_offset, row.byte_length) for row in rows]
@@ -1,13 +1,20 @@
-from typing import Self
+from typing import Iterable, Self
+
+from sqlalchemy import func
 
 from server.db_instance import db
+from server.db_model.dialect import case_insensitive_string
+from server.db_model.lookup_caches import word_id_cache
+
+# max number of values sent in a single `IN (...)` clause
+WORD_LOOKUP_CHUNK_SIZE = 1000
 
 
 class WordModel(db.Model):
     __tablename__ = "word"
 
     word_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    value = db.Column(db.String(50), nullable=False, unique=True)
+    value = db.Column(case_insensitive_string(50), nullable=False, unique=True)
     length = db.Column(db.Integer, nullable=False)
 
     @classmethod
@@ -18,5 +25,38 @@ class WordModel(db.Model):
         return query.all()
 
     @classmethod
-    def get_word_id(cls, value: str) -> int:
-        return db.session.query(WordModel.word_id).filter_by(value=value.lower()).scalar()
+    def get_word_ids(cls, words: Iterable[str], locking_read: bool = False) -> dict[str, int]:
+        """
+        Map each of the given words that exists in the word table to its word_id.
+        A `locking_read` sees the rows other transactions committed after the snapshot of this one was taken
+        """
+        words = list(words)
+        word_ids: dict[str, int] = {}
+        for start in range(0, len(words), WORD_LOOKUP_CHUNK_SIZE):
+            chunk = words[start : start + WORD_LOOKUP_CHUNK_SIZE]
+            rows = db.session.query(WordModel.value, WordModel.word_id).filter(WordModel.value.in_(chunk))
+            if locking_read:
+                rows = rows.with_for_update(read=True)
+            word_ids.update({row.value: row.word_id for row in rows})
+        return word_ids
+
+    @classmethod
+    def count_words_in_use(cls) -> int:
+        """
+        Count the words that appear in any book, a word may outlive the books it appeared in
+        """
+        from server.db_model.model.book import BookModel
+        from server.db_model.model.word_frequency import WordFrequencyModel
+
+        appears = db.session.query(WordFrequencyModel.word_id).filter(
+            WordFrequencyModel.word_id == WordModel.word_id
+        )
+        appears = BookModel.exclude_deleted_books(appears, WordFrequencyModel.book_id)
+        return db.session.query(func.count(WordModel.word_id)).filter(appears.exists()).scalar()
+
+    @classmethod
+    def get_word_id(cls, value: str) -> int | None:
+        value = value.lower()
+        return word_id_cache.get_or_compute(
+            value, lambda: db.session.query(WordModel.word_id).filter_by(value=value).scalar()
+        )
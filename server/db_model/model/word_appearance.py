@@ -1,13 +1,23 @@
-from typing import Tuple, TypedDict
+from typing import Collection, Iterator, Tuple, TypedDict
 
-from sqlalchemy import UniqueConstraint, and_, func, literal_column
+from sqlalchemy import and_, func, tuple_
+from sqlalchemy.orm import Query
 
 from server.db_instance import db
+from server.db_model.dialect import integer_sum
 from server.db_model.model.book import BookModel
 from server.db_model.model.chapter import ChapterModel
+from server.db_model.model.verse import VerseModel
 from server.db_model.model.word import WordModel
+from server.db_model.model.word_frequency import WordFrequencyModel
 from server.utils.timer import Timer
 
+# filters on the position of a word within a book, that only word_appearance can answer
+_APPEARANCE_FILTERS = ("chapter", "verse", "wordPosition")
+
+# rows fetched at a time when streaming a group's appearances, each carrying its verse text
+GROUP_INDEX_BATCH_SIZE = 1000
+
 
 class WordAppearance(TypedDict):
     book: str
@@ -19,14 +29,24 @@ class WordAppearance(TypedDict):
 class WordAppearanceModel(db.Model):
     __tablename__ = "word_appearance"
 
-    index = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    book_id = db.Column(db.Integer, db.ForeignKey("book.book_id", ondelete="CASCADE"), nullable=False)
+    # a position in a verse holds a single word, so it's the natural key, and the rows are clustered by it
+    book_id = db.Column(db.Integer, db.ForeignKey("book.book_id", ondelete="CASCADE"), primary_key=True)
+    chapter_num = db.Column(db.SmallInteger, primary_key=True)
+    verse_num = db.Column(db.SmallInteger, primary_key=True)
+    word_position = db.Column(db.SmallInteger, primary_key=True)
     word_id = db.Column(db.Integer, db.ForeignKey("word.word_id", ondelete="CASCADE"), nullable=False)
-    verse_num = db.Column(db.Integer, nullable=False)
-    chapter_num = db.Column(db.Integer, nullable=False)
-    word_position = db.Column(db.Integer, nullable=False)
 
-    __table_args__ = (UniqueConstraint("book_id", "word_id", "verse_num", "chapter_num", "word_position"),)
+    __table_args__ = (
+        # covers the appearances of a word in the order they're read, together with the primary key
+        db.Index(
+            "ix_word_appearance_word_position",
+            "word_id",
+            "book_id",
+            "chapter_num",
+            "verse_num",
+            "word_position",
+        ),
+    )
 
     @classmethod
     def get_num_words(cls, book_name: str, chapter_num: int, verse_num: int) -> int | None:
@@ -36,25 +56,78 @@ class WordAppearanceModel(db.Model):
             return -1
 
         # Count the words in the specified verse
-        word_count = (
-            db.session.query(func.count(WordAppearanceModel.index))
-            .filter_by(book_id=book_id, chapter_num=chapter_num, verse_num=verse_num)
-            .scalar()
-            or 0
-        )
+        word_count = cls._num_words_query(book_id, chapter_num, verse_num).scalar() or 0
         return word_count
 
     @classmethod
-    def get_filtered_words_paginate(
-        cls, filters: dict, page_index: int, page_size: int
-    ) -> Tuple[list[dict], int]:
+    def _num_words_query(cls, book_id: int, chapter_num: int, verse_num: int) -> Query:
+        return db.session.query(func.count(WordAppearanceModel.word_id)).filter_by(
+            book_id=book_id, chapter_num=chapter_num, verse_num=verse_num
+        )
+
+    @classmethod
+    def iter_postings(
+        cls, book_id: int | None = None, word_id: int | None = None, book_ids: Collection[int] | None = None
+    ) -> Iterator[Tuple[int, int, int, int, int]]:
+        """
+        Stream (word_id, book_id, chapter_num, verse_num, word_position) of all the word appearances,
+        or of a single book's / word's, in no particular order
+        """
+        query = cls._postings_query(book_id, word_id, book_ids)
+        for row in query.yield_per(10000):
+            yield row.word_id, row.book_id, row.chapter_num, row.verse_num, row.word_position
+
+    @classmethod
+    def _postings_query(
+        cls, book_id: int | None = None, word_id: int | None = None, book_ids: Collection[int] | None = None
+    ) -> Query:
+        query = db.session.query(
+            WordAppearanceModel.word_id,
+            WordAppearanceModel.book_id,
+            WordAppearanceModel.chapter_num,
+            WordAppearanceModel.verse_num,
+            WordAppearanceModel.word_position,
+        )
+        if book_id is not None:
+            query = query.filter(WordAppearanceModel.book_id == book_id)
+        if word_id is not None:
+            query = query.filter(WordAppearanceModel.word_id == word_id)
+        if book_ids is not None:
+            query = query.filter(WordAppearanceModel.book_id.in_(book_ids))
+        return BookModel.exclude_deleted_books(query, WordAppearanceModel.book_id)
+
+    @classmethod
+    def count_word_appearances(cls, word_ids: Collection[int]) -> dict[int, int]:
+        rows = cls._count_word_appearances_query(word_ids)
+        return {row.word_id: row.count for row in rows}
+
+    @classmethod
+    def _count_word_appearances_query(cls, word_ids: Collection[int]) -> Query:
+        query = db.session.query(
+            WordAppearanceModel.word_id, func.count(WordAppearanceModel.word_id).label("count")
+        ).filter(WordAppearanceModel.word_id.in_(word_ids))
+        return BookModel.exclude_deleted_books(query, WordAppearanceModel.book_id).group_by(
+            WordAppearanceModel.word_id
+        )
+
+    @staticmethod
+    def _get_word_counts_table(filters: dict) -> type["WordAppearanceModel"] | type[WordFrequencyModel]:
+        # word_frequency holds the count of every word in every book, so word_appearance is needed
+        # only to filter by a position within the books
+        if any(filters.get(key) for key in _APPEARANCE_FILTERS):
+            return WordAppearanceModel
+        return WordFrequencyModel
+
+    @classmethod
+    def _filtered_words_query(cls, filters: dict) -> Query:
         from server.db_model.model.word_in_group import WordInGroupModel
 
+        counts_table = cls._get_word_counts_table(filters)
         query = WordModel.query
         # Apply filters if they are provided
         if book_name := filters.get("book"):
             book_id = BookModel.get_book_id(book_name.lower())
-            query = query.filter(WordAppearanceModel.book_id == book_id)
+            query = query.filter(counts_table.book_id == book_id)
 
         if chapter := filters.get("chapter"):
             query = query.filter(WordAppearanceModel.chapter_num == int(chapter))
@@ -71,36 +144,64 @@ class WordAppearanceModel(db.Model):
         if group_name := filters.get("groupName"):
             word_ids_in_group = WordInGroupModel.get_words_ids_in_group(group_name)
             query = query.filter(WordModel.word_id.in_(word_ids_in_group))
+        return query
 
+    @classmethod
+    def get_filtered_words_page(
+        cls, filters: dict, page_index: int, page_size: int, after_word: str | None = None
+    ) -> list[dict]:
+        """
+        Get a page of the filtered words and their counts, ordered by word.
+        If `after_word` is given, the page starts right after it (keyset pagination) and page_index is ignored.
+        """
+        paginated_query = cls._filtered_words_page_query(filters, page_index, page_size, after_word)
+        with Timer("get_filtered_words_paginate_query", log_params={"filters": filters}):
+            paginated_results = paginated_query.all()
+        return [{"word": result[0], "count": result[1]} for result in paginated_results]
+
+    @classmethod
+    def _filtered_words_page_query(
+        cls, filters: dict, page_index: int, page_size: int, after_word: str | None = None
+    ) -> Query:
+        counts_table = cls._get_word_counts_table(filters)
+        if counts_table is WordFrequencyModel:
+            word_count = integer_sum(WordFrequencyModel.count)
+        else:
+            word_count = func.count(WordAppearanceModel.word_id)
+        paginated_query = cls._filtered_words_query(filters).join(
+            counts_table, counts_table.word_id == WordModel.word_id
+        )
         paginated_query = (
-            query.join(WordAppearanceModel, WordAppearanceModel.word_id == WordModel.word_id)
-            .with_entities(WordModel.value, func.count(WordAppearanceModel.word_id).label("word_count"))
+            BookModel.exclude_deleted_books(paginated_query, counts_table.book_id)
+            .with_entities(WordModel.value, word_count.label("word_count"))
             .group_by(WordModel.value)
             .order_by(WordModel.value)
-            .offset(page_index * page_size)
-            .limit(page_size)
         )
-        # count query needs to join with WordAppearanceModel only if any of the filters on WordAppearance are present
-        keys = ["book", "chapter", "verse", "wordPosition"]
-        if any(key in filters for key in keys):
-            query = query.join(WordAppearanceModel, WordAppearanceModel.word_id == WordModel.word_id)
+        if after_word is not None:
+            paginated_query = paginated_query.filter(WordModel.value > after_word).limit(page_size)
+        else:
+            paginated_query = paginated_query.offset(page_index * page_size).limit(page_size)
+        return paginated_query
+
+    @classmethod
+    def count_filtered_words(cls, filters: dict) -> int:
         with Timer("get_filtered_words_count_query", log_params={"filters": filters}):
-            total_count = query.with_entities(WordModel.value).distinct().count()
-        with Timer("get_filtered_words_paginate_query", log_params={"filters": filters}):
-            paginated_results = paginated_query.all()
-        word_values = [{"word": result[0], "count": result[1]} for result in paginated_results]
-        return word_values, total_count
+            return cls._count_filtered_words_query(filters).count()
 
     @classmethod
-    def get_word_appearances_paginate(
-        cls, word: str, filters: dict, page_index: int, page_size: int
-    ) -> Tuple[list[WordAppearance], int]:
-        word_id = db.session.query(WordModel.word_id).filter(func.lower(WordModel.value) == word).scalar()
-        # If the word is not found, return empty list and count 0
-        if word_id is None:
-            return [], 0
+    def _count_filtered_words_query(cls, filters: dict) -> Query:
+        query = cls._filtered_words_query(filters)
+        # count query needs to join with the counts only if any of the filters on the books are present,
+        # or if some books are being deleted and their words must not be counted
+        keys = ["book", *_APPEARANCE_FILTERS]
+        if any(key in filters for key in keys) or BookModel.get_deleted_book_ids():
+            counts_table = cls._get_word_counts_table(filters)
+            query = query.join(counts_table, counts_table.word_id == WordModel.word_id)
+            query = BookModel.exclude_deleted_books(query, counts_table.book_id)
+        return query.with_entities(WordModel.value).distinct()
 
-        # Build the query to find word appearances
+    @classmethod
+    def _word_appearances_query(cls, word_id: int, filters: dict) -> Query:
         query = (
             db.session.query(
                 WordAppearanceModel.book_id,
@@ -110,7 +211,7 @@ class WordAppearanceModel(db.Model):
                 BookModel.title,
             )
             .join(BookModel, WordAppearanceModel.book_id == BookModel.book_id)
-            .filter(WordAppearanceModel.word_id == word_id)
+            .filter(WordAppearanceModel.word_id == word_id, BookModel.is_deleted.is_(False))
         )
 
         # Apply filters if they are provided
@@ -125,36 +226,69 @@ class WordAppearanceModel(db.Model):
 
         if word_position := filters.get("wordPosition"):
             query = query.filter(WordAppearanceModel.word_position == int(word_position))
+        return query
 
-        paginated_results = (
-            query.order_by(
-                BookModel.title,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-                WordAppearanceModel.word_position,
-            )
-            .offset(page_index * page_size)
-            .limit(page_size)
-            .all()
-        )
+    @classmethod
+    def get_word_appearances_page(
+        cls,
+        word: str,
+        filters: dict,
+        page_index: int,
+        page_size: int,
+        after: Tuple[str, int, int, int] | None = None,
+    ) -> list[WordAppearance]:
+        """
+        Get a page of the word's appearances, ordered by book title, chapter, verse and word position.
+        If `after` (a book title, chapter, verse and word position) is given, the page starts right after it
+        (keyset pagination) and page_index is ignored.
+        """
+        word_id = WordModel.get_word_id(word)
+        # If the word is not found, return empty list
+        if word_id is None:
+            return []
 
-        total_count = query.count()
-        appearances = [
+        paginated_query = cls._word_appearances_page_query(word_id, filters, page_index, page_size, after)
+        return [
             WordAppearance(
                 book=result.title,
                 chapter=result.chapter_num,
                 verse=result.verse_num,
                 word_position=result.word_position,
             )
-            for result in paginated_results
+            for result in paginated_query.all()
         ]
 
-        return appearances, total_count
+    @classmethod
+    def _word_appearances_page_query(
+        cls,
+        word_id: int,
+        filters: dict,
+        page_index: int,
+        page_size: int,
+        after: Tuple[str, int, int, int] | None = None,
+    ) -> Query:
+        sort_key = (
+            BookModel.title,
+            WordAppearanceModel.chapter_num,
+            WordAppearanceModel.verse_num,
+            WordAppearanceModel.word_position,
+        )
+        paginated_query = cls._word_appearances_query(word_id, filters).order_by(*sort_key)
+        if after is not None:
+            paginated_query = paginated_query.filter(tuple_(*sort_key) > tuple_(*after))
+        else:
+            paginated_query = paginated_query.offset(page_index * page_size)
+        return paginated_query.limit(page_size)
+
+    @classmethod
+    def count_filtered_word_appearances(cls, word: str, filters: dict) -> int:
+        word_id = WordModel.get_word_id(word)
+        if word_id is None:
+            return 0
+        return cls._word_appearances_query(word_id, filters).count()
 
     @staticmethod
     def construct_context(book_id: int, chapter_num: int, verse_num: int) -> str:
-        session = db.session
-
         verse_num = int(verse_num)
         # Get the range of verses in the chapter
         num_verses_in_chapter = ChapterModel.get_num_verses(book_id, chapter_num)
@@ -162,35 +296,11 @@ class WordAppearanceModel(db.Model):
         start_verse = max(1, verse_num - 2)
         end_verse = min(num_verses_in_chapter, verse_num + 2)
 
-        # https://groups.google.com/g/sqlalchemy/c/LKScX7jmrR4?pli=1
-        concatenated_words = func.group_concat(
-            literal_column("`word`.`value` ORDER BY `word_appearance`.`word_position` SEPARATOR ' '")
-        ).label("concatenated_words")
-
-        ref_query = (
-            session.query(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-                concatenated_words,
-            )
-            .join(WordModel, WordAppearanceModel.word_id == WordModel.word_id)
-            .filter(
-                WordAppearanceModel.book_id == book_id,
-                WordAppearanceModel.chapter_num == chapter_num,
-                WordAppearanceModel.verse_num.between(start_verse, end_verse),
-            )
-            .group_by(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-            )
-            .order_by(WordAppearanceModel.verse_num)
-        )
-
         results = [
-            {"verse_num": row.verse_num, "words": row.concatenated_words.split(" ")}
-            for row in ref_query.all()
+            {"verse_num": context_verse_num, "words": text.split(" ")}
+            for context_verse_num, text in VerseModel.get_verses_text(
+                book_id, chapter_num, start_verse, end_verse
+            )
         ]
 
         # Construct the entire text with each verse on a new line
@@ -204,154 +314,54 @@ class WordAppearanceModel(db.Model):
 
         return entire_text
 
-    @classmethod
-    def find_all_references_of_phrase(cls, phrase_text: str) -> list[WordAppearance]:
-        phrase_list = phrase_text.split()
-        phrase_joined = " ".join(phrase_list)
-
-        session = db.session
-
-        # https://groups.google.com/g/sqlalchemy/c/LKScX7jmrR4?pli=1
-        concatenated_words = func.group_concat(
-            literal_column("`word`.`value` ORDER BY `word_appearance`.`word_position` SEPARATOR ' '")
-        ).label("concatenated_words")
-
-        word_positions = func.group_concat(
-            WordAppearanceModel.word_position.op("ORDER BY")(WordAppearanceModel.word_position)
-        ).label("word_positions")
-
-        ref_query = (
-            session.query(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-                BookModel.title,
-                concatenated_words,
-                word_positions,
-            )
-            .join(WordModel, WordAppearanceModel.word_id == WordModel.word_id)
-            .join(BookModel, WordAppearanceModel.book_id == BookModel.book_id)
-            .filter(WordModel.value.in_(phrase_list))
-            .group_by(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-            )
-            .having(
-                concatenated_words.like(f"%{phrase_joined}%"),
-            )
-        )
-
-        result = ref_query.all()
-
-        all_references = []
-
-        for row in result:
-            concatenated_words = row.concatenated_words.split(" ")
-            word_positions = [int(pos) for pos in row.word_positions.split(",")]
-
-            starting_word_positions = cls.get_consecutive_positions(
-                phrase_list, concatenated_words, word_positions
-            )
-
-            # Check if the result is a tuple (indicating a match)
-            if starting_word_positions:
-                # Extract the starting word position from the result
-                references = [
-                    WordAppearance(
-                        book=row.title,
-                        chapter=row.chapter_num,
-                        verse=row.verse_num,
-                        word_position=starting_pos,
-                    )
-                    for starting_pos in starting_word_positions
-                ]
-                all_references.extend(references)
-        return all_references
+    @staticmethod
+    def get_group_word_appearances_index(group_name: str) -> list[dict]:
+        return list(WordAppearanceModel.iter_group_word_appearances_index(group_name))
 
     @staticmethod
-    def get_consecutive_positions(
-        words_in_phrase: list[str], concatenated_words: list[str], word_positions: list[int]
-    ) -> list[int]:
+    def iter_group_word_appearances_index(
+        group_name: str, batch_size: int = GROUP_INDEX_BATCH_SIZE
+    ) -> Iterator[dict]:
         """
-        Get the starting positions of the phrase in the concatenated words where the positions are consecutive
-        Example:
-        >>>> get_consecutive_positions(["a", "b",], ["a", "b", "c", "a", "b"], [1, 2, 3, 4, 5)
-        [1, 4]
+        Yield the appearances of the group's words with their verse text, fetching them from a server side
+        cursor in batches, so they're never all held in memory
         """
-        phrase_length = len(words_in_phrase)
-        match_start_positions = []
-        # Iterate through potential starting points in concatenated_words
-        for i in range(len(concatenated_words) - phrase_length + 1):
-            # Check if the words match and positions are consecutive
-            if concatenated_words[i : i + phrase_length] == words_in_phrase and all(
-                word_positions[i + j] + 1 == word_positions[i + j + 1] for j in range(phrase_length - 1)
-            ):
-                match_start_positions.append(word_positions[i])
-        return match_start_positions
-
-    @staticmethod
-    def get_group_word_appearances_index(group_name: str) -> list[dict]:
         from server.db_model.model.word_in_group import WordInGroupModel
 
         word_ids_in_group = WordInGroupModel.get_words_ids_in_group(group_name)
-        # Subquery to get all matching word_ids, verse_num, and chapter_num
-        subquery = (
-            db.session.query(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.verse_num,
-                WordAppearanceModel.chapter_num,
-            )
-            .filter(WordAppearanceModel.word_id.in_(word_ids_in_group))
-            .distinct()
-            .subquery()
-        )
-
-        # Sub query, for all verses that contain any of the group's words, get the full verse text
-        text_query = (
-            db.session.query(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-                func.group_concat(
-                    literal_column("`word`.`value` ORDER BY `word_appearance`.`word_position` SEPARATOR ' '")
-                ).label("verse_text"),
-            )
-            .join(WordModel, WordAppearanceModel.word_id == WordModel.word_id)
-            .join(
-                subquery,
-                and_(
-                    WordAppearanceModel.book_id == subquery.c.book_id,
-                    WordAppearanceModel.verse_num == subquery.c.verse_num,
-                    WordAppearanceModel.chapter_num == subquery.c.chapter_num,
-                ),
-            )
-            .group_by(
-                WordAppearanceModel.book_id,
-                WordAppearanceModel.chapter_num,
-                WordAppearanceModel.verse_num,
-            )
-            .subquery()
+        query = WordAppearanceModel._group_word_appearances_index_query(word_ids_in_group).yield_per(
+            batch_size
         )
+        for result in query:
+            yield {
+                "word": result.word,
+                "book": result.book,
+                "chapter": result.chapter_num,
+                "verse": result.verse_num,
+                "word_position": result.word_index,
+                "verse_text": result.verse_text,
+            }
 
+    @staticmethod
+    def _group_word_appearances_index_query(word_ids: Collection[int]) -> Query:
         # Main query to get all the word appearances in the group
-        query = (
+        return (
             db.session.query(
                 WordModel.value.label("word"),
                 BookModel.title.label("book"),
                 WordAppearanceModel.chapter_num,
                 WordAppearanceModel.verse_num,
                 WordAppearanceModel.word_position.label("word_index"),
-                text_query.c.verse_text.label("verse_text"),
+                VerseModel.text.label("verse_text"),
             )
             .join(WordModel, WordAppearanceModel.word_id == WordModel.word_id)
             .join(BookModel, WordAppearanceModel.book_id == BookModel.book_id)
             .join(
-                text_query,
+                VerseModel,
                 and_(
-                    WordAppearanceModel.book_id == text_query.c.book_id,
-                    WordAppearanceModel.verse_num == text_query.c.verse_num,
-                    WordAppearanceModel.chapter_num == text_query.c.chapter_num,
+                    WordAppearanceModel.book_id == VerseModel.book_id,
+                    WordAppearanceModel.chapter_num == VerseModel.chapter_num,
+                    WordAppearanceModel.verse_num == VerseModel.verse_num,
                 ),
             )
             .order_by(
@@ -362,19 +372,6 @@ class WordAppearanceModel(db.Model):
                 WordAppearanceModel.word_position,
                 WordAppearanceModel.word_position,
             )
-            .filter(WordAppearanceModel.word_id.in_(word_ids_in_group))
+            .filter(WordAppearanceModel.word_id.in_(word_ids), BookModel.is_deleted.is_(False))
             .distinct()
         )
-
-        res = [
-            {
-                "word": result.word,
-                "book": result.book,
-                "chapter": result.chapter_num,
-                "verse": result.verse_num,
-                "word_position": result.word_index,
-                "verse_text": result.verse_text,
-            }
-            for result in query
-        ]
-        return res
@@ -0,0 +1,32 @@
+from typing import Tuple
+
+from server.db_instance import db
+from server.db_model.dialect import integer_sum
+from server.db_model.model.book import BookModel
+from server.db_model.model.word import WordModel
+
+
+class WordFrequencyModel(db.Model):
+    """
+    The number of appearances of every word in every book, written together with the book's word appearances.
+    Word list queries without chapter / verse / position filters count from it rather than from word_appearance.
+    """
+
+    __tablename__ = "word_frequency"
+
+    word_id = db.Column(db.Integer, db.ForeignKey("word.word_id", ondelete="CASCADE"), primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey("book.book_id", ondelete="CASCADE"), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.Index("ix_word_frequency_book_id_word_id", "book_id", "word_id"),)
+
+    @classmethod
+    def get_corpus_frequencies(cls) -> list[Tuple[str, int]]:
+        """
+        Get every word in use with its number of appearances in all the books
+        """
+        query = db.session.query(WordModel.value, integer_sum(WordFrequencyModel.count)).join(
+            WordFrequencyModel, WordFrequencyModel.word_id == WordModel.word_id
+        )
+        query = BookModel.exclude_deleted_books(query, WordFrequencyModel.book_id)
+        return [(value, count) for value, count in query.group_by(WordModel.value)]
@@ -1,6 +1,10 @@
+from typing import Collection
+
 from sqlalchemy import UniqueConstraint
 
 from server.db_instance import db
+from server.db_model.dialect import insert_ignore
+from server.db_model.lookup_caches import group_word_ids_cache
 from server.db_model.model.group import GroupModel
 from server.db_model.model.word import WordModel
 
@@ -32,6 +36,10 @@ class WordInGroupModel(db.Model):
     @classmethod
     def get_words_ids_in_group(cls, group_name: str) -> list[int]:
         group_id = GroupModel.get_group_id(group_name)
+        return group_word_ids_cache.get_or_compute(group_id, lambda: cls._query_words_ids_in_group(group_id))
+
+    @classmethod
+    def _query_words_ids_in_group(cls, group_id: int | None) -> list[int]:
         words = db.session.query(WordInGroupModel.word_id).filter(WordInGroupModel.group_id == group_id).all()
         return [word.word_id for word in words]
 
@@ -52,3 +60,16 @@ class WordInGroupModel(db.Model):
         db.session.add(WordInGroupModel(group_id=group_id, word_id=word_id))
         db.session.commit()
         print("Data inserted successfully into word_in_group table.")
+
+    @classmethod
+    def insert_words_to_group(cls, group_id: int, word_ids: Collection[int]) -> None:
+        """
+        Insert the words to the group in a single statement, skipping words that are already in it
+        """
+        if not word_ids:
+            return
+        db.session.execute(
+            insert_ignore(WordInGroupModel.__table__),
+            [{"group_id": group_id, "word_id": word_id} for word_id in word_ids],
+        )
+        db.session.commit()
@@ -0,0 +1,80 @@
+import re
+
+from sqlalchemy.orm import Query
+
+from server.db_instance import db
+from server.db_model.model.book import BookModel
+from server.db_model.model.word_appearance import WordAppearanceModel
+from server.db_model.model.word_frequency import WordFrequencyModel
+
+# tables that are too big for a request to read as a whole
+LARGE_TABLES = ("word_appearance", "verse", "word_frequency")
+
+# MySQL access types that read the whole table / index
+_MYSQL_FULL_SCAN_TYPES = ("ALL", "index")
+# SQLite reports a lookup by index as SEARCH, and reading the whole table (or a whole index of it) as SCAN
+_SQLITE_FULL_SCAN_PATTERN = re.compile(rf"^SCAN ({'|'.join(LARGE_TABLES)})\b")
+
+
+def get_hot_queries() -> dict[str, Query]:
+    """
+    The queries of WordAppearanceModel that are run by requests, with arguments taken from the loaded books.
+    The unfiltered word list isn't here, it counts the whole corpus by design.
+    """
+    sample = BookModel.exclude_deleted_books(
+        db.session.query(WordFrequencyModel.word_id, WordFrequencyModel.book_id), WordFrequencyModel.book_id
+    ).first()
+    if sample is None:
+        raise ValueError("No books are loaded, the query plans depend on the data")
+    word_id, book_id = sample
+    title = BookModel.get_book_titles()[book_id]
+    verse_filters = {"book": title, "chapter": "1", "verse": "1"}
+
+    return {
+        "num_words_in_verse": WordAppearanceModel._num_words_query(book_id, 1, 1),
+        "postings_of_book": WordAppearanceModel._postings_query(book_id=book_id),
+        "postings_of_word": WordAppearanceModel._postings_query(word_id=word_id),
+        "postings_of_word_in_books": WordAppearanceModel._postings_query(word_id=word_id, book_ids=[book_id]),
+        "count_word_appearances": WordAppearanceModel._count_word_appearances_query([word_id]),
+        "words_page_of_book": WordAppearanceModel._filtered_words_page_query({"book": title}, 0, 20),
+        "words_page_of_chapter": WordAppearanceModel._filtered_words_page_query(
+            {"book": title, "chapter": "1"}, 0, 20
+        ),
+        "words_page_of_verse": WordAppearanceModel._filtered_words_page_query(verse_filters, 0, 20),
+        "words_page_of_position": WordAppearanceModel._filtered_words_page_query(
+            {**verse_filters, "wordPosition": "1"}, 0, 20
+        ),
+        "words_count_of_book": WordAppearanceModel._count_filtered_words_query({"book": title}),
+        "words_count_of_verse": WordAppearanceModel._count_filtered_words_query(verse_filters),
+        "word_appearances_page": WordAppearanceModel._word_appearances_page_query(word_id, {}, 0, 20),
+        "word_appearances_page_after": WordAppearanceModel._word_appearances_page_query(
+            word_id, {}, 0, 20, after=(title, 1, 1, 1)
+        ),
+        "word_appearances_page_of_chapter": WordAppearanceModel._word_appearances_page_query(
+            word_id, {"book": title, "chapter": "1"}, 0, 20
+        ),
+        "word_appearances_count": WordAppearanceModel._word_appearances_query(word_id, {}),
+        "group_word_appearances_index": WordAppearanceModel._group_word_appearances_index_query([word_id]),
+    }
+
+
+def find_full_scans(query: Query) -> list[str]:
+    """
+    EXPLAIN the query, and describe every step of its plan that reads a whole large table
+    """
+    engine = db.engine
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").mappings().all()
+            return [step["detail"] for step in plan if _SQLITE_FULL_SCAN_PATTERN.match(step["detail"])]
+
+        if engine.dialect.paramstyle in ("format", "pyformat"):
+            # the driver would read the % of LIKE patterns as placeholders
+            sql = sql.replace("%", "%%")
+        plan = connection.exec_driver_sql(f"EXPLAIN {sql}").mappings().all()
+        return [
+            f"{step['table']}: type {step['type']}, key {step['key']}"
+            for step in plan
+            if step["table"] in LARGE_TABLES and step["type"] in _MYSQL_FULL_SCAN_TYPES
+        ]
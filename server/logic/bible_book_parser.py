@@ -1,50 +1,99 @@
-import re
+from typing import IO, Iterable, Iterator
 
-from server.logic.structures import Chapter, Verse
+from server.logic.structures import Chapter, Verse, VerseRecord
+from server.logic.tokenizer import is_chapter_header, tokenize_verse_line
 
+# number of bytes read from a stream at a time
+RAW_READ_SIZE = 1 << 16
 
-def parse_text_to_book_chapters(book_text: str) -> list[Chapter]:
-    lines = book_text.splitlines()
+
+def iter_raw_lines(stream: IO[bytes], raw_copy: IO[bytes] | None = None) -> Iterator[bytes]:
+    """
+    Read a binary text stream line by line, without reading it to memory as a whole.
+    The lines are split as bytes.splitlines(keepends=True) splits a whole text (at \\n, \\r\\n and a lone \\r),
+    so the byte offsets of a book are the same whichever way it was read.
+    Every raw chunk is also written to `raw_copy` (if given) as it's read.
+    """
+    # the start of a line that may go on in the next chunk
+    parts: list[bytes] = []
+    while chunk := stream.read(RAW_READ_SIZE):
+        if raw_copy is not None:
+            raw_copy.write(chunk)
+        parts.append(chunk)
+        if b"\n" not in chunk and b"\r" not in chunk:
+            continue
+        lines = b"".join(parts).splitlines(keepends=True)
+        # the last line may be cut short, even if it ends with a \r (the \n of a \r\n may be in the next chunk)
+        parts = [lines.pop()]
+        yield from lines
+    if parts:
+        yield b"".join(parts)
+
+
+def iter_book_verses(raw_lines: Iterable[bytes]) -> Iterator[VerseRecord]:
+    """
+    Parse the utf-8 lines of a book lazily, yielding a record for every verse as soon as it's read.
+    The lines must keep their line endings, as the byte offsets of the records are counted from them.
+    Raises ValueError when the text is malformed, possibly after some verses were already yielded.
+    """
     chapter_number = 0
-    book_chapters: list[Chapter] = []
-    for line in lines:
-        line = line.strip()
+    chapter_offset = 0
+    num_verses_in_chapter = 0
+    line_offset = 0
+    for raw_line in raw_lines:
+        offset = line_offset
+        line_offset += len(raw_line)
+        decoded_line = raw_line.decode("utf-8")
+        line = decoded_line.strip()
         # skip empty lines
         if not line:
             continue
 
         # Check if the line is the start of a new chapter
-        if re.match(r"^\d?[a-zA-Z]+\.[0-9]+", line):
-            if len(book_chapters) > 0 and book_chapters[-1].num_verses == 0:
+        if is_chapter_header(line):
+            if chapter_number > 0 and num_verses_in_chapter == 0:
                 raise ValueError(f"Chapter {chapter_number} has no verses")
             chapter_number += 1
-            book_chapters.append(Chapter(chapter_num=chapter_number, num_verses=0, verses=[]))
+            chapter_offset = offset
+            num_verses_in_chapter = 0
         else:
-            # Extract verse number and text
-            match = re.match(r"\[(\d+)\] (.+)", line)
-            if not match:
+            # Extract verse number and words
+            verse = tokenize_verse_line(line)
+            if verse is None:
                 raise ValueError(f"Invalid verse line format: {line}")
+            if chapter_number == 0:
+                raise ValueError(f"Verse line appears before the first chapter: {line}")
 
-            verse_number = int(match.group(1))
-            verse_text = match.group(2)
-
-            # Remove punctuation from the verse text
-            verse_text = re.sub(r"[^\w\s']", " ", verse_text)
-
-            # Split the verse text into words
-            words = [word.lower() for word in verse_text.split()]
-
-            book_chapters[chapter_number - 1].num_verses = verse_number
-            book_chapters[chapter_number - 1].verses.append(
-                Verse(
-                    verse_num=verse_number,
-                    num_words=len(words),
-                    words=words,
-                )
+            verse_number, words = verse
+            num_verses_in_chapter = verse_number
+            # the bytes of the line are stripped as its text is, of any unicode whitespace (e.g. a no-break space)
+            leading_whitespace = decoded_line[: len(decoded_line) - len(decoded_line.lstrip())]
+            yield VerseRecord(
+                chapter_num=chapter_number,
+                verse_num=verse_number,
+                words=words,
+                chapter_offset=chapter_offset,
+                byte_offset=offset + len(leading_whitespace.encode("utf-8")),
+                byte_length=len(line.encode("utf-8")),
             )
 
-    if not book_chapters:
+    if chapter_number == 0:
         raise ValueError("No chapters found in the text")
-    if book_chapters[-1].num_verses == 0:
+    if num_verses_in_chapter == 0:
         raise ValueError(f"Chapter {chapter_number} has no verses")
+
+
+def parse_text_to_book_chapters(book_text: str) -> list[Chapter]:
+    book_chapters: list[Chapter] = []
+    for record in iter_book_verses(book_text.encode("utf-8").splitlines(keepends=True)):
+        if not book_chapters or book_chapters[-1].chapter_num != record.chapter_num:
+            book_chapters.append(Chapter(chapter_num=record.chapter_num, num_verses=0, verses=[]))
+        book_chapters[-1].num_verses = record.verse_num
+        book_chapters[-1].verses.append(
+            Verse(
+                verse_num=record.verse_num,
+                num_words=len(record.words),
+                words=record.words,
+            )
+        )
     return book_chapters
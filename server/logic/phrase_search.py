@@ -0,0 +1,120 @@
+from array import array
+from bisect import bisect_left
+from typing import Collection, Iterator, Protocol, Sequence
+
+from server.db_model.model.book import BookModel
+from server.db_model.model.word import WordModel
+from server.db_model.model.word_appearance import WordAppearance, WordAppearanceModel
+from server.logic.tokenizer import tokenize_verse_text
+from server.logic.word_index import pack_posting, unpack_posting, word_index
+
+
+class PostingsSource(Protocol):
+    def count_appearances(self, word_ids: Collection[int]) -> dict[int, int]:
+        ...
+
+    def get_postings(self, word_id: int, book_ids: Collection[int] | None) -> dict[int, Sequence[int]]:
+        """
+        Map book_id -> sorted packed postings of the word, optionally only in the given books
+        """
+        ...
+
+    def get_book_titles(self) -> dict[int, str]:
+        ...
+
+
+class IndexPostingsSource:
+    def count_appearances(self, word_ids: Collection[int]) -> dict[int, int]:
+        return {word_id: word_index.count_appearances(word_id) for word_id in word_ids}
+
+    def get_postings(self, word_id: int, book_ids: Collection[int] | None) -> dict[int, Sequence[int]]:
+        return dict(word_index.get_postings(word_id))
+
+    def get_book_titles(self) -> dict[int, str]:
+        return word_index.get_book_titles()
+
+
+class DbPostingsSource:
+    def count_appearances(self, word_ids: Collection[int]) -> dict[int, int]:
+        return WordAppearanceModel.count_word_appearances(word_ids)
+
+    def get_postings(self, word_id: int, book_ids: Collection[int] | None) -> dict[int, Sequence[int]]:
+        book_postings: dict[int, list[int]] = {}
+        for _, book_id, chapter_num, verse_num, word_position in WordAppearanceModel.iter_postings(
+            word_id=word_id, book_ids=book_ids
+        ):
+            book_postings.setdefault(book_id, []).append(pack_posting(chapter_num, verse_num, word_position))
+        return {book_id: array("q", sorted(postings)) for book_id, postings in book_postings.items()}
+
+    def get_book_titles(self) -> dict[int, str]:
+        return BookModel.get_book_titles()
+
+
+def _contains(sorted_postings: Sequence[int], posting: int) -> bool:
+    index = bisect_left(sorted_postings, posting)
+    return index < len(sorted_postings) and sorted_postings[index] == posting
+
+
+def find_all_references_of_phrase(phrase_text: str, use_index: bool = False) -> list[WordAppearance]:
+    return list(iter_references_of_phrase(phrase_text, use_index))
+
+
+def iter_references_of_phrase(phrase_text: str, use_index: bool = False) -> Iterator[WordAppearance]:
+    """
+    Yield every place the phrase starts at, ordered by book title, chapter, verse and word position.
+    Starts from the postings of the rarest word of the phrase, shifted to the phrase start,
+    and keeps only the starts where every other word appears at start + its offset in the phrase.
+    The matches are kept packed until they're yielded.
+    `use_index` reads the postings from the in-memory word index, it must be current (see WordIndex.is_current)
+    """
+    words = tokenize_verse_text(phrase_text)
+    if not words:
+        return
+    word_ids = WordModel.get_word_ids(set(words))
+    if len(word_ids) < len(set(words)):
+        return
+
+    source: PostingsSource
+    if use_index:
+        source = IndexPostingsSource()
+    else:
+        source = DbPostingsSource()
+    counts = source.count_appearances(set(word_ids.values()))
+    # (offset in phrase, word_id), rarest word first
+    terms = sorted(enumerate(word_ids[word] for word in words), key=lambda term: counts.get(term[1], 0))
+
+    # book_id -> packed postings of the phrase starts
+    rarest_offset, rarest_word_id = terms[0]
+    candidates: dict[int, list[int]] = {}
+    for book_id, postings in source.get_postings(rarest_word_id, None).items():
+        # the phrase can't start before the first word of the verse
+        starts = [
+            posting - rarest_offset for posting in postings if unpack_posting(posting)[2] > rarest_offset
+        ]
+        if starts:
+            candidates[book_id] = starts
+
+    for offset, word_id in terms[1:]:
+        if not candidates:
+            break
+        term_postings = source.get_postings(word_id, candidates.keys())
+        candidates = {
+            book_id: matching_starts
+            for book_id, starts in candidates.items()
+            if (
+                matching_starts := [
+                    start for start in starts if _contains(term_postings.get(book_id, ()), start + offset)
+                ]
+            )
+        }
+
+    book_titles = source.get_book_titles()
+    # a book that was removed from the index meanwhile has no title anymore
+    book_ids = [book_id for book_id in candidates if book_id in book_titles]
+    # the starts of each book are already sorted, as the postings they were taken from
+    for book_id in sorted(book_ids, key=book_titles.__getitem__):
+        for start in candidates[book_id]:
+            chapter_num, verse_num, word_position = unpack_posting(start)
+            yield WordAppearance(
+                book=book_titles[book_id], chapter=chapter_num, verse=verse_num, word_position=word_position
+            )
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Iterable, NamedTuple
 
 
 @dataclass
@@ -15,11 +16,63 @@ class Chapter:
     verses: list[Verse]
 
 
+class VerseRecord(NamedTuple):
+    chapter_num: int
+    verse_num: int
+    words: list[str]
+    # byte offset of the chapter header in the raw text
+    chapter_offset: int
+    # where the verse line is in the raw text, without its surrounding whitespace
+    byte_offset: int
+    byte_length: int
+
+
 @dataclass
 class BibleBook:
     name: str
     division: str
-    num_chapters: int
-    chapters: list[Chapter]
+    verses: Iterable[VerseRecord]
     raw_text_path: str
     file_size: int
+
+
+@dataclass
+class BookIngestSummary:
+    book_id: int
+    num_chapters: int
+    num_verses: int
+    num_words: int
+    num_unique_words: int
+    num_letters: int
+    run_time: float
+
+
+@dataclass
+class RawBook:
+    name: str
+    division: str
+    raw_text: bytes
+
+
+@dataclass
+class BookDeletionJob:
+    job_id: str
+    book_name: str
+    book_id: int
+    num_chapters: int
+    # pending, running, done or failed
+    status: str = "pending"
+    deleted_chapters: int = 0
+    deleted_words: int = 0
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "jobId": self.job_id,
+            "book": self.book_name,
+            "status": self.status,
+            "numChapters": self.num_chapters,
+            "deletedChapters": self.deleted_chapters,
+            "deletedWords": self.deleted_words,
+            "error": self.error,
+        }
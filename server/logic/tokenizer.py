@@ -0,0 +1,51 @@
+import re
+
+CHAPTER_HEADER_PATTERN = re.compile(r"^\d?[a-zA-Z]+\.[0-9]+")
+VERSE_LINE_PATTERN = re.compile(r"\[(\d+)\] (.+)")
+
+
+class _NormalizationTable(dict):
+    """
+    A str.translate table that maps every character that is not a word character, whitespace or an apostrophe
+    to a space (same as re.sub(r"[^\\w\\s']", " ", text)) and keeps every other character.
+    Characters are added lazily, the first time they're seen.
+    """
+
+    def __missing__(self, ordinal: int) -> str:
+        char = chr(ordinal)
+        if char.isalnum() or char.isspace() or char in "_'":
+            normalized = char
+        else:
+            normalized = " "
+        self[ordinal] = normalized
+        return normalized
+
+
+_NORMALIZATION_TABLE = _NormalizationTable()
+
+
+def is_chapter_header(line: str) -> bool:
+    return CHAPTER_HEADER_PATTERN.match(line) is not None
+
+
+def tokenize_verse_text(verse_text: str) -> list[str]:
+    """
+    Remove punctuation, lower case and split the verse text to words.
+    The text is lower cased as a whole rather than by character, as a character's lower case may depend on
+    its place in the word (a Greek capital sigma ends a word as "ς")
+    Example:
+    >>>> tokenize_verse_text("And God said, Let there be light: and there was light.")
+    ['and', 'god', 'said', 'let', 'there', 'be', 'light', 'and', 'there', 'was', 'light']
+    """
+    return verse_text.translate(_NORMALIZATION_TABLE).lower().split()
+
+
+def tokenize_verse_line(line: str) -> tuple[int, list[str]] | None:
+    """
+    Split a stripped verse line of the form "[<verse number>] <verse text>" to its verse number and words,
+    returns None if the line is not a verse line
+    """
+    match = VERSE_LINE_PATTERN.match(line)
+    if not match:
+        return None
+    return int(match.group(1)), tokenize_verse_text(match.group(2))
@@ -0,0 +1,54 @@
+import threading
+from array import array
+from bisect import bisect_left
+from heapq import nlargest
+
+from server.db_model.model.word_frequency import WordFrequencyModel
+from server.utils.timer import Timer
+
+
+class Vocabulary:
+    """
+    An in-process sorted array of the words in use and their number of appearances in the corpus.
+    The completions of a prefix are a contiguous range of it, found by bisecting, so they're answered
+    without querying the db. Like the word index it reflects the db of this process only.
+    """
+
+    def __init__(self) -> None:
+        # (sorted words, their counts), replaced as a whole so readers never mix two versions
+        self._entries: tuple[list[str], array] = ([], array("q"))
+        self._lock = threading.Lock()
+        # the version of the corpus the vocabulary was loaded at, see refresh
+        self.version: int | None = None
+
+    def refresh(self, version: int) -> None:
+        """
+        Load the vocabulary again if it was loaded at another version of the corpus
+        """
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            with Timer("vocabulary_load"):
+                # sorted here, the collation of the db may order the words differently than bisect expects
+                frequencies = sorted(WordFrequencyModel.get_corpus_frequencies())
+            self._entries = (
+                [word for word, _ in frequencies],
+                array("q", (count for _, count in frequencies)),
+            )
+            self.version = version
+
+    def complete(self, prefix: str, limit: int) -> list[dict]:
+        """
+        Get the `limit` most frequent words that start with `prefix`, ties ordered by word
+        """
+        words, counts = self._entries
+        start = bisect_left(words, prefix)
+        # every word with the prefix sorts before the prefix followed by the largest code point
+        end = bisect_left(words, prefix + "\U0010ffff", lo=start)
+        top = nlargest(limit, range(start, end), key=counts.__getitem__)
+        return [{"word": words[i], "count": counts[i]} for i in top]
+
+
+vocabulary = Vocabulary()
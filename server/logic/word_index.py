@@ -0,0 +1,241 @@
+import threading
+import traceback
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Iterable, Iterator, Tuple
+
+from server.app_instance import flask_app
+from server.db_instance import db
+from server.db_model.model.book import BookModel
+from server.db_model.model.data_version import CORPUS_VERSION, DataVersionModel
+from server.db_model.model.word import WordModel
+from server.db_model.model.word_appearance import WordAppearance, WordAppearanceModel
+from server.utils.timer import Timer
+
+# a posting is packed into a single int64: chapter_num | verse_num | word_position, 21 bits each,
+# so sorting packed postings sorts them by (chapter_num, verse_num, word_position)
+_FIELD_BITS = 21
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+
+
+def pack_posting(chapter_num: int, verse_num: int, word_position: int) -> int:
+    return (chapter_num << (2 * _FIELD_BITS)) | (verse_num << _FIELD_BITS) | word_position
+
+
+def unpack_posting(posting: int) -> Tuple[int, int, int]:
+    return posting >> (2 * _FIELD_BITS), (posting >> _FIELD_BITS) & _FIELD_MASK, posting & _FIELD_MASK
+
+
+class WordIndex:
+    """
+    An in-process inverted index of the word_appearance table.
+    For every word_id it holds a sorted array of packed postings per book_id, which lets word appearance
+    pages and totals be answered by slicing instead of querying the db.
+    It's loaded at startup and updated by the books this process adds and deletes. It's used only while it's
+    current, at the corpus version of the db (see is_current), and loaded again after another process
+    changed the books.
+    """
+
+    def __init__(self) -> None:
+        # word_id -> book_id -> sorted packed postings.
+        # the inner dicts are replaced rather than mutated, so readers never see a half updated word
+        self._postings: dict[int, dict[int, array]] = {}
+        self._book_titles: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.is_loaded = False
+        # the corpus version that the index reflects
+        self.version: int | None = None
+
+    def load(self) -> None:
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        with Timer("word_index_load"):
+            # read before the rows, so a change made while they're read leaves the index behind
+            version = DataVersionModel.get_versions().get(CORPUS_VERSION, 0)
+            self.version = None
+            self._postings = {}
+            self._book_titles = {book.book_id: book.title for book in BookModel.get_all_books()}
+            self._add_postings(WordAppearanceModel.iter_postings())
+            self.version = version
+            self.is_loaded = True
+
+    def is_current(self, version: int) -> bool:
+        """
+        Whether the index is enabled and reflects the given corpus version. If it's behind (another process
+        changed the books) it's loaded again by a background thread, meanwhile the db should be queried
+        """
+        if not self.is_loaded:
+            return False
+        if self.version != version and self._lock.acquire(blocking=False):
+            # the lock is held until the loading thread is done
+            if self.version == version:
+                self._lock.release()
+            else:
+                try:
+                    threading.Thread(target=self._load_in_background, daemon=True).start()
+                except Exception:
+                    self._lock.release()
+                    raise
+        return self.version == version
+
+    def _load_in_background(self) -> None:
+        # runs in its own thread, so it needs its own app context (and db session)
+        try:
+            with flask_app.app_context():
+                self._load()
+        except Exception:
+            print(traceback.format_exc())
+        finally:
+            self._lock.release()
+
+    def follow(self, version: int) -> None:
+        """
+        Move to the version the corpus was bumped to by this process, after the index was updated with the change.
+        A version that skips one (bumped by another process) leaves the index behind, see is_current
+        """
+        if self.version is not None and self.version == version - 1:
+            self.version = version
+
+    def add_book(self, book_id: int) -> None:
+        if not self.is_loaded:
+            return
+        with Timer("word_index_add_book", log_params={"book_id": book_id}), self._lock:
+            book = db.session.get(BookModel, book_id)
+            self._book_titles[book_id] = book.title
+            self._add_postings(WordAppearanceModel.iter_postings(book_id))
+
+    def remove_book(self, book_id: int) -> None:
+        if not self.is_loaded:
+            return
+        with self._lock:
+            for word_id, book_postings in list(self._postings.items()):
+                if book_id in book_postings:
+                    remaining = {key: value for key, value in book_postings.items() if key != book_id}
+                    if remaining:
+                        self._postings[word_id] = remaining
+                    else:
+                        del self._postings[word_id]
+            # last, so a reader that still sees a posting of the book finds its title
+            self._book_titles.pop(book_id, None)
+
+    def _add_postings(self, rows: Iterable[Tuple[int, int, int, int, int]]) -> None:
+        new_postings: dict[int, dict[int, list[int]]] = {}
+        for word_id, book_id, chapter_num, verse_num, word_position in rows:
+            new_postings.setdefault(word_id, {}).setdefault(book_id, []).append(
+                pack_posting(chapter_num, verse_num, word_position)
+            )
+        for word_id, book_postings in new_postings.items():
+            merged = dict(self._postings.get(word_id, {}))
+            merged.update(
+                {book_id: array("q", sorted(postings)) for book_id, postings in book_postings.items()}
+            )
+            self._postings[word_id] = merged
+
+    def get_postings(self, word_id: int) -> dict[int, array]:
+        """
+        Map book_id -> sorted packed postings of the word, the result must not be modified
+        """
+        return self._postings.get(word_id, {})
+
+    def count_appearances(self, word_id: int) -> int:
+        return sum(len(postings) for postings in self._postings.get(word_id, {}).values())
+
+    def get_book_titles(self) -> dict[int, str]:
+        return dict(self._book_titles)
+
+    def _iter_filtered_postings(self, word_id: int, filters: dict) -> Iterator[Tuple[str, array]]:
+        """
+        Yield (book title, matching postings) for every book the word appears in, ordered by title
+        """
+        book_postings = self._postings.get(word_id, {})
+        book_name = filters.get("book", "").lower()
+        chapter = int(filters["chapter"]) if filters.get("chapter") else None
+        verse = int(filters["verse"]) if filters.get("verse") else None
+        word_position = int(filters["wordPosition"]) if filters.get("wordPosition") else None
+
+        # readers don't take the lock, a book may be missing a title while it's added or removed
+        book_titles = self._book_titles
+        books = sorted(
+            (title, book_id) for book_id in book_postings if (title := book_titles.get(book_id)) is not None
+        )
+        for title, book_id in books:
+            if book_name and title != book_name:
+                continue
+            postings = book_postings[book_id]
+            if chapter is not None:
+                start = bisect_left(postings, pack_posting(chapter, 0, 0))
+                end = bisect_left(postings, pack_posting(chapter + 1, 0, 0))
+                postings = postings[start:end]
+            if verse is not None or word_position is not None:
+                postings = array(
+                    "q",
+                    (
+                        posting
+                        for posting in postings
+                        if (verse is None or unpack_posting(posting)[1] == verse)
+                        and (word_position is None or unpack_posting(posting)[2] == word_position)
+                    ),
+                )
+            if postings:
+                yield title, postings
+
+    def count_filtered_word_appearances(self, word: str, filters: dict) -> int:
+        """
+        Same as WordAppearanceModel.count_filtered_word_appearances, without querying word_appearance
+        """
+        word_id = WordModel.get_word_id(word)
+        if word_id is None:
+            return 0
+        return sum(len(postings) for _, postings in self._iter_filtered_postings(word_id, filters))
+
+    def get_word_appearances_page(
+        self,
+        word: str,
+        filters: dict,
+        page_index: int,
+        page_size: int,
+        after: Tuple[str, int, int, int] | None = None,
+    ) -> list[WordAppearance]:
+        """
+        Same as WordAppearanceModel.get_word_appearances_page, without querying word_appearance
+        """
+        word_id = WordModel.get_word_id(word)
+        if word_id is None:
+            return []
+
+        filtered_postings = list(self._iter_filtered_postings(word_id, filters))
+
+        if after is not None:
+            # seek right past the cursor instead of skipping whole pages
+            after_title, *after_posting = after
+            filtered_postings = [
+                (title, postings[bisect_right(postings, pack_posting(*after_posting)) :])
+                if title == after_title
+                else (title, postings)
+                for title, postings in filtered_postings
+                if title >= after_title
+            ]
+
+        appearances: list[WordAppearance] = []
+        to_skip = page_index * page_size if after is None else 0
+        for title, postings in filtered_postings:
+            if to_skip >= len(postings):
+                to_skip -= len(postings)
+                continue
+            for posting in islice(postings, to_skip, to_skip + page_size - len(appearances)):
+                chapter_num, verse_num, word_position = unpack_posting(posting)
+                appearances.append(
+                    WordAppearance(
+                        book=title, chapter=chapter_num, verse=verse_num, word_position=word_position
+                    )
+                )
+            to_skip = 0
+            if len(appearances) == page_size:
+                break
+        return appearances
+
+
+word_index = WordIndex()
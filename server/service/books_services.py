@@ -1,49 +1,289 @@
 import json
+import multiprocessing
 import os
+import threading
 import traceback
-from typing import Tuple
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Tuple
 
 from werkzeug.datastructures import FileStorage
 
 from consts import EXT_DISK_PATH
-from server.db_model.db_functions import insert_book_data_to_tables
+from server.app_instance import flask_app
+from server.db_model.db_functions import (
+    delete_book_data_from_tables,
+    insert_book_data_to_tables,
+    insert_parsed_books_to_tables,
+    is_book_loading,
+)
 from server.db_model.model.book import BookModel
-from server.logic.bible_book_parser import parse_text_to_book_chapters
-from server.logic.structures import BibleBook
+from server.db_model.model.chapter import ChapterModel
+from server.logic.bible_book_parser import iter_book_verses, iter_raw_lines
+from server.logic.structures import BibleBook, BookDeletionJob, RawBook, VerseRecord
+from server.logic.word_index import word_index
+from server.service.cache_invalidation import invalidate_corpus_caches
 from server.utils.timer import Timer
 
+# number of processes parsing books and threads writing word appearances when adding many books at once
+BULK_LOAD_PARSE_WORKERS = os.cpu_count()
+BULK_LOAD_INSERT_WORKERS = 4
+
+# the process pool that parses the books of add_books, it's started by the first call and kept for the next ones
+_parse_executor: ProcessPoolExecutor | None = None
+_parse_executor_lock = threading.Lock()
+
+# the book deletions of this process by job id, they're kept after they end so their result can be read
+_book_deletion_jobs: dict[str, BookDeletionJob] = {}
+_book_deletion_jobs_lock = threading.Lock()
+
 
 def add_book(book_name: str, text_file: FileStorage, division: str) -> Tuple[bool, str]:
+    file_path = None
     try:
         book_name = book_name.lower()
         division = division.lower()
         if BookModel.does_book_exist(book_name):
             return False, f"book {book_name} already exists"
 
-        book_text = text_file.read().decode("utf-8")
-        book_chapters = parse_text_to_book_chapters(book_text)
-        file_path = os.path.join(EXT_DISK_PATH, book_name + ".txt")
-        bible_book = BibleBook(
-            name=book_name,
-            division=division,
-            num_chapters=len(book_chapters),
-            chapters=book_chapters,
-            raw_text_path=file_path,
-            file_size=len(book_text),
-        )
-        num_words = sum(verse.num_words for chapter in bible_book.chapters for verse in chapter.verses)
-        with Timer("add_book", log_params={"book_name": book_name, "num_words": num_words}):
-            insert_book_data_to_tables(bible_book)
-        # Save the raw text to 'file_path'
-        with open(file_path, "w") as file:
-            file.write(book_text)
-
-        return True, f"received book with {bible_book.num_chapters} chapters"
+        file_path = _get_raw_file_path(book_name)
+        # Stream the upload: parse it line by line and save the raw text to 'file_path' on the way
+        with open(file_path, "wb") as raw_file:
+            bible_book = BibleBook(
+                name=book_name,
+                division=division,
+                verses=iter_book_verses(iter_raw_lines(text_file.stream, raw_copy=raw_file)),
+                raw_text_path=file_path,
+                file_size=_get_stream_size(text_file.stream),
+            )
+            with Timer("add_book", log_params={"book_name": book_name}):
+                summary = insert_book_data_to_tables(bible_book, on_book_hidden=invalidate_corpus_caches)
+        word_index.add_book(summary.book_id)
+        invalidate_corpus_caches()
+
+        return True, f"received book with {summary.num_chapters} chapters"
+    except Exception as e:
+        print(traceback.format_exc())
+        if file_path is not None and os.path.exists(file_path):
+            os.remove(file_path)
+        return False, str(e)
+
+
+def _is_valid_book_name(book_name: str) -> bool:
+    # the name is the name of the book's raw file in EXT_DISK_PATH, it must not lead out of it
+    return (
+        bool(book_name) and not book_name.startswith(".") and not any(char in book_name for char in "/\\\0")
+    )
+
+
+def _get_raw_file_path(book_name: str) -> str:
+    """
+    The path the raw text of the book is saved to, raises ValueError if the name isn't a plain file name
+    """
+    file_path = os.path.join(EXT_DISK_PATH, book_name + ".txt")
+    if not _is_valid_book_name(book_name) or os.path.dirname(os.path.realpath(file_path)) != os.path.realpath(
+        EXT_DISK_PATH
+    ):
+        raise ValueError(f"invalid book name {book_name}")
+    return file_path
+
+
+def _parse_raw_book(raw_text: bytes) -> list[VerseRecord] | str:
+    # runs in a worker process, so errors are returned as strings rather than raised
+    try:
+        return list(iter_book_verses(raw_text.splitlines(keepends=True)))
+    except Exception as e:
+        return str(e)
+
+
+def add_books(raw_books: list[RawBook]) -> Tuple[bool, list[dict] | str]:
+    """
+    Add many books at once: the books are parsed in a process pool and then inserted together,
+    see insert_parsed_books_to_tables. Returns the result of every book, in the order they were given.
+    """
+    # the raw files written for books that aren't inserted yet, they're removed if the insertion fails
+    unsettled_file_paths: list[str] = []
+    try:
+        # by the position of the book in `raw_books`, a name may be given more than once
+        results: list[dict] = []
+        books_to_parse: list[RawBook] = []
+        # the position of every book to parse in `results`
+        positions: list[int] = []
+        book_names: set[str] = set()
+        for raw_book in raw_books:
+            book_name = raw_book.name.lower()
+            if not _is_valid_book_name(book_name):
+                results.append(
+                    {"book": book_name, "success": False, "message": f"invalid book name {book_name}"}
+                )
+                continue
+            if BookModel.does_book_exist(book_name) or book_name in book_names:
+                results.append(
+                    {
+                        "book": book_name,
+                        "success": False,
+                        "message": f"book {book_name} already exists",
+                    }
+                )
+                continue
+            book_names.add(book_name)
+            positions.append(len(results))
+            results.append({"book": book_name})
+            books_to_parse.append(
+                RawBook(name=book_name, division=raw_book.division.lower(), raw_text=raw_book.raw_text)
+            )
+
+        with Timer("add_books_parse", log_params={"num_books": len(books_to_parse)}):
+            parsed_books = _parse_raw_books([raw_book.raw_text for raw_book in books_to_parse])
+
+        bible_books = []
+        bible_book_positions = []
+        for position, raw_book, verses in zip(positions, books_to_parse, parsed_books):
+            if isinstance(verses, str):
+                results[position].update({"success": False, "message": verses})
+                continue
+            file_path = _get_raw_file_path(raw_book.name)
+            unsettled_file_paths.append(file_path)
+            with open(file_path, "wb") as file:
+                file.write(raw_book.raw_text)
+            bible_books.append(
+                BibleBook(
+                    name=raw_book.name,
+                    division=raw_book.division,
+                    verses=verses,
+                    raw_text_path=file_path,
+                    file_size=len(raw_book.raw_text),
+                )
+            )
+            bible_book_positions.append(position)
+
+        with Timer("add_books", log_params={"num_books": len(bible_books)}):
+            summaries = insert_parsed_books_to_tables(
+                bible_books, num_workers=BULK_LOAD_INSERT_WORKERS, on_book_hidden=invalidate_corpus_caches
+            )
+        # from here the file of every book is kept or removed by its own result
+        unsettled_file_paths.clear()
+        for position, bible_book, summary in zip(bible_book_positions, bible_books, summaries):
+            if isinstance(summary, Exception):
+                os.remove(bible_book.raw_text_path)
+                results[position].update({"success": False, "message": str(summary)})
+                continue
+            word_index.add_book(summary.book_id)
+            invalidate_corpus_caches()
+            results[position].update(
+                {
+                    "success": True,
+                    "message": f"received book with {summary.num_chapters} chapters",
+                    "numWords": summary.num_words,
+                    "seconds": round(summary.run_time, 3),
+                    "wordsPerSecond": round(summary.num_words / summary.run_time),
+                }
+            )
+        return True, results
+    except Exception as e:
+        print(traceback.format_exc())
+        for file_path in unsettled_file_paths:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return False, str(e)
+
+
+def _parse_raw_books(raw_texts: list[bytes]) -> list[list[VerseRecord] | str]:
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            # the workers are forked from a fresh server process (forkserver) rather than from this one,
+            # which runs request threads and holds open db connections
+            _parse_executor = ProcessPoolExecutor(
+                max_workers=BULK_LOAD_PARSE_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+            )
+        executor = _parse_executor
+    try:
+        return list(executor.map(_parse_raw_book, raw_texts))
+    except BrokenProcessPool:
+        # a worker died, the next call starts a new pool
+        with _parse_executor_lock:
+            if _parse_executor is executor:
+                _parse_executor = None
+        raise
+
+
+def _get_stream_size(stream: IO[bytes]) -> int:
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def delete_book(book_name: str) -> Tuple[bool, dict | str]:
+    """
+    Mark the book as deleted, so it's gone from every read right away, and delete its rows, unused words
+    and raw file in a background job. Returns the job, see get_book_deletion.
+    Deleting a book that is already being deleted returns its running job, or resumes a job that didn't finish
+    (or the remains of a book that failed to be added). A book that is still being added can't be deleted.
+    """
+    try:
+        book = BookModel.get_book(book_name, include_deleted=True)
+        if book is None:
+            return False, f"book {book_name} doesn't exists"
+        if is_book_loading(book.book_id):
+            return False, f"book {book.title} is still being added"
+        with _book_deletion_jobs_lock:
+            for job in _book_deletion_jobs.values():
+                if job.book_id == book.book_id and job.status in ("pending", "running"):
+                    return True, job.to_dict()
+            job = BookDeletionJob(
+                job_id=uuid.uuid4().hex,
+                book_name=book.title,
+                book_id=book.book_id,
+                num_chapters=book.num_chapters,
+            )
+            _book_deletion_jobs[job.job_id] = job
+
+        if not book.is_deleted:
+            BookModel.mark_book_deleted(book.book_id)
+            word_index.remove_book(book.book_id)
+            invalidate_corpus_caches()
+        threading.Thread(target=_run_book_deletion, args=(job, book.file_path), daemon=True).start()
+        return True, job.to_dict()
     except Exception as e:
         print(traceback.format_exc())
         return False, str(e)
 
 
+def _run_book_deletion(job: BookDeletionJob, file_path: str) -> None:
+    # runs in its own thread, so it needs its own app context (and db session)
+    def on_chapter_deleted(chapter_num: int) -> None:
+        job.deleted_chapters += 1
+
+    def delete_raw_file() -> None:
+        # while the book row holds the title, so it's not the file of a new book of the same title
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    with flask_app.app_context():
+        job.status = "running"
+        try:
+            with Timer("delete_book", log_params={"book_name": job.book_name}):
+                job.deleted_words = delete_book_data_from_tables(
+                    job.book_id, on_chapter_deleted, before_book_row_deleted=delete_raw_file
+                )
+            job.status = "done"
+        except Exception as e:
+            print(traceback.format_exc())
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            # the words that were left unused are gone, and so may be the book row
+            invalidate_corpus_caches()
+
+
+def get_book_deletion(job_id: str) -> BookDeletionJob | None:
+    with _book_deletion_jobs_lock:
+        return _book_deletion_jobs.get(job_id)
+
+
 def get_books() -> Tuple[bool, str]:
     # the return string is a JSON string
     try:
@@ -64,13 +304,32 @@ def get_books() -> Tuple[bool, str]:
         return False, str(e)
 
 
-def get_book_content(book_name: str) -> Tuple[bool, str]:
+def get_book_content_path(book_name: str) -> Tuple[bool, str]:
+    # the content itself is sent from the file, without being read here
     try:
         book_file_path = BookModel.get_book_file_path(book_name)
-        with open(book_file_path, "r") as file:
-            return True, file.read()
-    except FileNotFoundError:
-        return False, "The specified book was not found."
+        if book_file_path is None or not os.path.exists(book_file_path):
+            return False, "The specified book was not found."
+        return True, book_file_path
+    except Exception as e:
+        print(traceback.format_exc())
+        return False, str(e)
+
+
+def get_chapter_content(book_name: str, chapter_num: int) -> Tuple[bool, bytes | str]:
+    try:
+        book = BookModel.get_book(book_name)
+        if book is None or not os.path.exists(book.file_path):
+            return False, "The specified book was not found."
+        byte_range = ChapterModel.get_byte_range(book.book_id, chapter_num)
+        if byte_range is None:
+            return False, f"chapter {chapter_num} does not exist in book {book_name}"
+        start, end = byte_range
+        if start is None:
+            return False, f"the position of chapter {chapter_num} in book {book_name} is unknown"
+        with open(book.file_path, "rb") as file:
+            file.seek(start)
+            return True, file.read() if end is None else file.read(end - start)
     except Exception as e:
         print(traceback.format_exc())
         return False, str(e)
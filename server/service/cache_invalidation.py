@@ -0,0 +1,83 @@
+from time import monotonic
+
+from server.db_model.lookup_caches import (
+    book_id_cache,
+    deleted_book_ids_cache,
+    group_id_cache,
+    group_word_ids_cache,
+    num_verses_cache,
+    word_id_cache,
+)
+from server.db_model.model.data_version import CORPUS_VERSION, GROUPS_VERSION, DataVersionModel
+from server.logic.word_index import word_index
+from server.utils.cache import LRUCache, SyncedVersion
+
+# totals of the paginated word list / word appearances, keyed by the normalized filters
+words_count_cache = LRUCache("words_count", max_size=1024)
+word_appearances_count_cache = LRUCache("word_appearances_count", max_size=4096)
+
+# versions of the books and of the groups, HTTP responses derived from them are cached on these.
+# they're kept in the db, so the changes made by other processes are seen too, see sync_data_versions
+corpus_version = SyncedVersion(CORPUS_VERSION)
+groups_version = SyncedVersion(GROUPS_VERSION)
+
+# when the versions were last read from the db (time.monotonic()), see sync_data_versions
+_last_sync_time: float | None = None
+
+
+def _clear_corpus_caches() -> None:
+    words_count_cache.clear()
+    word_appearances_count_cache.clear()
+    book_id_cache.clear()
+    deleted_book_ids_cache.clear()
+    # a deleted book may leave words behind, but an added one may add words that were cached as missing
+    word_id_cache.clear()
+    num_verses_cache.clear()
+
+
+def _clear_group_caches() -> None:
+    # the word list can be filtered by group
+    words_count_cache.clear()
+    group_id_cache.clear()
+    group_word_ids_cache.clear()
+
+
+def invalidate_corpus_caches() -> None:
+    """
+    Should be called whenever a book is added or deleted, once the change is committed
+    (and the word index was updated with it)
+    """
+    _clear_corpus_caches()
+    version = DataVersionModel.bump(CORPUS_VERSION)
+    word_index.follow(version)
+    corpus_version.advance(version)
+
+
+def invalidate_group_caches() -> None:
+    """
+    Should be called whenever a group or its words change, once the change is committed
+    """
+    _clear_group_caches()
+    groups_version.advance(DataVersionModel.bump(GROUPS_VERSION))
+
+
+def sync_data_versions(min_interval: float = 0.0) -> None:
+    """
+    Read the versions from the db, and clear the caches of the data that other processes changed since the last sync.
+    Called at the start of the requests that read the books or groups. The versions are read at most once per
+    `min_interval` seconds, so the changes of another process may be seen that much later
+    (the changes of this process are seen at once)
+    """
+    global _last_sync_time
+    now = monotonic()
+    if _last_sync_time is not None and now - _last_sync_time < min_interval:
+        return
+    _last_sync_time = now
+    versions = DataVersionModel.get_versions()
+    # the caches are cleared before the newer version is seen, so nothing read from them is cached on it
+    if versions.get(CORPUS_VERSION, 0) > corpus_version.value:
+        _clear_corpus_caches()
+        corpus_version.advance(versions[CORPUS_VERSION])
+    if versions.get(GROUPS_VERSION, 0) > groups_version.value:
+        _clear_group_caches()
+        groups_version.advance(versions[GROUPS_VERSION])
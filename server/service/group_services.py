@@ -5,6 +5,7 @@ from typing import Tuple
 from server.db_model.model.group import GroupModel
 from server.db_model.model.word import WordModel
 from server.db_model.model.word_in_group import WordInGroupModel
+from server.service.cache_invalidation import invalidate_group_caches
 
 
 def add_group(group_name: str) -> Tuple[bool, str]:
@@ -13,6 +14,7 @@ def add_group(group_name: str) -> Tuple[bool, str]:
         if GroupModel.does_group_exist(group_name):
             return False, f"group {group_name} already exists"
         GroupModel.insert_group(group_name)
+        invalidate_group_caches()
         return True, f"group {group_name} added successfully"
 
     except Exception as e:
@@ -57,8 +59,73 @@ def add_word_to_group(group_name: str, word_value: str) -> Tuple[bool, str]:
             return False, f"Group '{group_name}' already has word '{word_value}'"
 
         WordInGroupModel.insert_word_to_group(group_id, word_id)
+        invalidate_group_caches()
         return True, f"word {word_value} was added to group {group_name} successfully"
 
     except Exception as e:
         print(traceback.format_exc())
         return False, str(e)
+
+
+def add_words_to_group(group_name: str, word_values: list[str]) -> Tuple[bool, list[dict] | str]:
+    """
+    Add many words to a group at once, with a fixed number of queries. Returns the result of every word.
+    """
+    try:
+        group_id = GroupModel.get_group_id(group_name)
+        if group_id is None:
+            return False, f"group {group_name} doesn't exist"
+
+        word_values = list(dict.fromkeys(word_value.lower() for word_value in word_values))
+        word_ids = WordModel.get_word_ids(word_values)
+        words_in_group = set(WordInGroupModel.get_words_ids_in_group(group_name))
+
+        results = []
+        word_ids_to_add = []
+        for word_value in word_values:
+            word_id = word_ids.get(word_value)
+            if word_id is None:
+                results.append(
+                    {
+                        "word": word_value,
+                        "success": False,
+                        "message": f"word {word_value} doesn't exist in any book",
+                    }
+                )
+            elif word_id in words_in_group:
+                results.append(
+                    {
+                        "word": word_value,
+                        "success": False,
+                        "message": f"Group '{group_name}' already has word '{word_value}'",
+                    }
+                )
+            else:
+                word_ids_to_add.append(word_id)
+                results.append(
+                    {
+                        "word": word_value,
+                        "success": True,
+                        "message": f"word {word_value} was added to group {group_name} successfully",
+                    }
+                )
+
+        if word_ids_to_add:
+            WordInGroupModel.insert_words_to_group(group_id, word_ids_to_add)
+            invalidate_group_caches()
+        return True, results
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return False, str(e)
+
+
+def delete_group(group_name: str) -> Tuple[bool, str]:
+    try:
+        GroupModel.delete_group_by_name(group_name)
+        invalidate_group_caches()
+        return True, "ok"
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return False, str(e)
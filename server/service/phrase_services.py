@@ -1,9 +1,11 @@
 import json
 import traceback
-from typing import Any, Tuple
+from typing import Any, Iterator, Tuple
 
 from server.db_model.model.phrase import PhraseModel
-from server.db_model.model.word_appearance import WordAppearanceModel
+from server.logic.phrase_search import iter_references_of_phrase
+from server.logic.word_index import word_index
+from server.service.cache_invalidation import corpus_version
 
 
 def add_phrase(phrase_text: str) -> Tuple[bool, str]:
@@ -12,8 +14,8 @@ def add_phrase(phrase_text: str) -> Tuple[bool, str]:
         if PhraseModel.does_phrase_exist(phrase_text):
             return False, f"phrase '{phrase_text}' already exists"
 
-        references = WordAppearanceModel.find_all_references_of_phrase(phrase_text)
-        if len(references) == 0:
+        use_index = word_index.is_current(corpus_version.value)
+        if next(iter_references_of_phrase(phrase_text, use_index), None) is None:
             return False, f"phrase '{phrase_text}' wasn't found in the text"
         PhraseModel.insert_phrase(phrase_text)
         return True, f"phrase {phrase_text} added successfully"
@@ -35,15 +37,14 @@ def get_phrases() -> Tuple[bool, str]:
 
 
 def get_phrase_references(phrase_text: str) -> list[dict[str, Any]]:
-    references = WordAppearanceModel.find_all_references_of_phrase(phrase_text)
+    return list(iter_phrase_references(phrase_text))
 
-    phrase_references = [
-        {
+
+def iter_phrase_references(phrase_text: str) -> Iterator[dict[str, Any]]:
+    for reference in iter_references_of_phrase(phrase_text, word_index.is_current(corpus_version.value)):
+        yield {
             "title": reference.get("book"),
             "chapter_num": reference.get("chapter"),
             "verse_num": reference.get("verse"),
             "word_position": reference.get("word_position"),
         }
-        for reference in references
-    ]
-    return phrase_references
@@ -1,16 +1,107 @@
+import os
 import traceback
 from typing import Tuple
 
 from server.db_model.model.book import BookModel
-from server.db_model.model.word_appearance import WordAppearanceModel
+from server.db_model.model.verse import VerseModel
+from server.db_model.model.word_appearance import WordAppearance, WordAppearanceModel
+from server.logic.vocabulary import vocabulary
+from server.logic.word_index import word_index
+from server.service.cache_invalidation import corpus_version, word_appearances_count_cache, words_count_cache
+from server.utils.raw_file import read_byte_ranges
+
+# number of verses shown before and after the verse of a word
+CONTEXT_NUM_VERSES = 2
+
+# number of completions returned for a word prefix, by default and at most
+DEFAULT_NUM_COMPLETIONS = 10
+MAX_NUM_COMPLETIONS = 100
 
 
 def get_word_text_context(book_name: str, chapter: int, verse: int) -> Tuple[bool, str]:
     try:
-        book_id = BookModel.get_book_id(book_name.lower())
-        fetched_context = WordAppearanceModel.construct_context(book_id, chapter, verse)
+        book = BookModel.get_book(book_name)
+        if book is None:
+            return False, f"book {book_name} does not exist"
+        verse = int(verse)
+        # the original lines of the verses, with their punctuation and casing, are read from the raw file
+        byte_ranges = VerseModel.get_verses_byte_ranges(
+            book.book_id, chapter, max(1, verse - CONTEXT_NUM_VERSES), verse + CONTEXT_NUM_VERSES
+        )
+        known_ranges = [
+            (offset, length) for _, offset, length in byte_ranges if offset is not None and length is not None
+        ]
+        if len(known_ranges) == len(byte_ranges) and os.path.exists(book.file_path):
+            lines = read_byte_ranges(book.file_path, known_ranges)
+            return True, "\n".join(line.decode("utf-8") for line in lines)
+
+        # books added before the verse offsets were recorded
+        fetched_context = WordAppearanceModel.construct_context(book.book_id, chapter, verse)
         return True, fetched_context
 
     except Exception as e:
         print(traceback.format_exc())
         return False, str(e)
+
+
+# filters that are compared as ints / case insensitively by the queries
+_INT_FILTERS = {"chapter", "verse", "wordPosition"}
+_NAME_FILTERS = {"book", "groupName"}
+
+
+def _filters_cache_key(*args: str, filters: dict) -> tuple:
+    # filters that select the same rows ("03" / "3", "Genesis" / "genesis") get the same key
+    normalized_filters = {
+        key: int(value) if key in _INT_FILTERS else str(value).lower() if key in _NAME_FILTERS else value
+        for key, value in filters.items()
+    }
+    return (*args, *sorted(normalized_filters.items()))
+
+
+def count_filtered_words(filters: dict) -> int:
+    return words_count_cache.get_or_compute(
+        _filters_cache_key(filters=filters), lambda: WordAppearanceModel.count_filtered_words(filters)
+    )
+
+
+def get_filtered_words(
+    filters: dict, page_index: int, page_size: int, after_word: str | None = None, include_total: bool = True
+) -> Tuple[list[dict], int | None]:
+    words = WordAppearanceModel.get_filtered_words_page(filters, page_index, page_size, after_word)
+    total = count_filtered_words(filters) if include_total else None
+    return words, total
+
+
+def count_word_appearances(word: str, filters: dict) -> int:
+    # the in-memory index counts without querying word_appearance, when it's enabled and current
+    if word_index.is_current(corpus_version.value):
+        return word_index.count_filtered_word_appearances(word, filters)
+    return word_appearances_count_cache.get_or_compute(
+        _filters_cache_key(word, filters=filters),
+        lambda: WordAppearanceModel.count_filtered_word_appearances(word, filters),
+    )
+
+
+def get_word_appearances(
+    word: str,
+    filters: dict,
+    page_index: int,
+    page_size: int,
+    after: Tuple[str, int, int, int] | None = None,
+    include_total: bool = True,
+) -> Tuple[list[WordAppearance], int | None]:
+    # the in-memory index answers without querying word_appearance, when it's enabled and current
+    if word_index.is_current(corpus_version.value):
+        appearances = word_index.get_word_appearances_page(word, filters, page_index, page_size, after)
+    else:
+        appearances = WordAppearanceModel.get_word_appearances_page(
+            word, filters, page_index, page_size, after
+        )
+    total = count_word_appearances(word, filters) if include_total else None
+    return appearances, total
+
+
+def get_word_completions(prefix: str, limit: int = DEFAULT_NUM_COMPLETIONS) -> list[dict]:
+    # the vocabulary is loaded again on the first completion after a book was added or deleted
+    vocabulary.refresh(corpus_version.value)
+    return vocabulary.complete(prefix.lower(), min(limit, MAX_NUM_COMPLETIONS))
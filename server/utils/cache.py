@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+# every cache created, for reporting their hit/miss counters
+_all_caches: list["LRUCache"] = []
+
+
+class LRUCache:
+    """
+    A thread safe, size bounded, least recently used cache that counts its hits and misses.
+    It holds at most `max_size` items, and if `max_total_size` is given, values whose `get_size` (e.g. their
+    number of bytes) sums to at most that; a value bigger than it is never cached
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        max_total_size: int | None = None,
+        get_size: Callable[[Any], int] | None = None,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.max_total_size = max_total_size
+        self._get_size = get_size
+        self.total_size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        # the size of every value, when the cache is bounded by their total size
+        self._sizes: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        _all_caches.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._get_size(value) if self._get_size is not None else 0
+        with self._lock:
+            self._pop(key)
+            if self.max_total_size is not None and size > self.max_total_size:
+                return
+            self._items[key] = value
+            if self._get_size is not None:
+                self._sizes[key] = size
+                self.total_size += size
+            while len(self._items) > self.max_size or (
+                self.max_total_size is not None and self.total_size > self.max_total_size
+            ):
+                self._pop(next(iter(self._items)))
+
+    def _pop(self, key: Hashable) -> None:
+        # with the lock held
+        self._items.pop(key, None)
+        self.total_size -= self._sizes.pop(key, 0)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Get the cached value of the key, or compute it and cache it.
+        The value is computed outside the lock, so concurrent misses may compute it more than once.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.total_size = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SyncedVersion:
+    """
+    The version of some data as last seen by this process, the version itself is kept elsewhere (e.g. in the db).
+    It only moves forward, so a sync that read the version before a newer one was seen doesn't roll it back
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def advance(self, value: int) -> None:
+        """
+        Move to the given version if it's newer
+        """
+        with self._lock:
+            self._value = max(self._value, value)
+
+
+def get_caches_stats() -> dict[str, dict[str, int]]:
+    return {
+        cache.name: {
+            "size": len(cache),
+            "maxSize": cache.max_size,
+            "totalSize": cache.total_size,
+            "hits": cache.hits,
+            "misses": cache.misses,
+        }
+        for cache in _all_caches
+    }
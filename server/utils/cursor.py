@@ -0,0 +1,27 @@
+import base64
+import binascii
+import json
+
+
+def encode_cursor(sort_key: list) -> str:
+    """
+    Encode the sort key of the last row of a page to an opaque cursor, that the next page seeks past
+    """
+    return base64.urlsafe_b64encode(json.dumps(sort_key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, key_types: list[type]) -> list:
+    """
+    Decode a cursor made by encode_cursor, raises ValueError if it doesn't hold a sort key of the given types
+    """
+    try:
+        sort_key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if (
+        not isinstance(sort_key, list)
+        or len(sort_key) != len(key_types)
+        or not all(type(value) is key_type for value, key_type in zip(sort_key, key_types))
+    ):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return sort_key
@@ -0,0 +1,63 @@
+import functools
+from http import HTTPStatus
+from typing import Any, Callable
+
+from flask import Response, request
+
+from server.utils.cache import LRUCache, SyncedVersion
+
+ViewFunction = Callable[..., Response]
+
+# bigger bodies (whole books) are still given an ETag, but aren't kept in memory
+MAX_CACHED_BODY_SIZE = 1 << 20
+# the bodies kept by a process, the least recently used are dropped beyond it
+MAX_CACHED_BODIES_SIZE = 32 << 20
+
+# (body, mimetype) by the request and the versions, see cached_response
+response_cache = LRUCache(
+    "responses", max_size=256, max_total_size=MAX_CACHED_BODIES_SIZE, get_size=lambda cached: len(cached[0])
+)
+
+
+def cached_response(*versions: SyncedVersion) -> Callable[[ViewFunction], ViewFunction]:
+    """
+    Cache the successful responses of a read only GET view, until one of the versions it depends on is bumped.
+    The response carries an ETag of the versions, and a request that already has it gets 304 Not Modified.
+    The versions are kept in the db, so an ETag holds across the processes of the server
+    """
+
+    def decorator(view: ViewFunction) -> ViewFunction:
+        @functools.wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Response:
+            current_versions = tuple(version.value for version in versions)
+            etag = "-".join(map(str, current_versions))
+            if request.if_none_match.contains(etag):
+                return _with_cache_headers(Response(status=HTTPStatus.NOT_MODIFIED), etag)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())), request.query_string, current_versions)
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return _with_cache_headers(Response(body, status=HTTPStatus.OK, mimetype=mimetype), etag)
+
+            response = view(*args, **kwargs)
+            if response.status_code != HTTPStatus.OK:
+                return response
+            if response.is_streamed:
+                # reading the body here would defeat the streaming
+                return _with_cache_headers(response, etag)
+            body = response.get_data()
+            if len(body) <= MAX_CACHED_BODY_SIZE:
+                response_cache.set(key, (body, response.mimetype))
+            return _with_cache_headers(response, etag)
+
+        return wrapper
+
+    return decorator
+
+
+def _with_cache_headers(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    # the data may change at any moment, so clients should always revalidate their copy
+    response.cache_control.no_cache = True
+    return response
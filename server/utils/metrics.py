@@ -0,0 +1,81 @@
+import threading
+from bisect import bisect_left
+
+# every metric created, in the order they're rendered on /metrics
+_all_metrics: list["Histogram"] = []
+
+# upper bounds of the buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# upper bounds of the buckets of per request counts, e.g. SQL statements
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(label_names: tuple[str, ...], label_values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """
+    A thread safe distribution of observed values per combination of label values,
+    counted in cumulative buckets as Prometheus expects
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> (count per bucket, with a last +Inf bucket, sum of the values)
+        self._values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+        _all_metrics.append(self)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        bucket_index = bisect_left(self.buckets, value)
+        with self._lock:
+            bucket_counts, total = self._values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            bucket_counts[bucket_index] += 1
+            self._values[label_values] = (bucket_counts, total + value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total)) for labels, (counts, total) in self._values.items()
+            )
+        for label_values, (bucket_counts, total) in values:
+            cumulative = 0
+            upper_bounds = [*map(_format_value, self.buckets), "+Inf"]
+            for upper_bound, bucket_count in zip(upper_bounds, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, f'le="{upper_bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """
+    All the metrics in the Prometheus text exposition format
+    """
+    lines = [line for metric in _all_metrics for line in metric.render()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import sysconfig
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Self
+
+from flask import Blueprint, Response, current_app, g, request
+
+from server.utils.statement_hooks import on_statement
+
+# statements of the same shape repeated this many times in a profile are reported as a likely N+1
+DEFAULT_REPEATED_SHAPE_THRESHOLD = 3
+
+# the profiler of the current request / test, statements run outside of one aren't recorded
+_active_profiler: ContextVar["QueryProfiler | None"] = ContextVar("active_profiler", default=None)
+
+_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT_DIR = os.path.dirname(os.path.dirname(_UTILS_DIR))
+_LIBRARY_DIRS = tuple(
+    {sysconfig.get_path("stdlib"), sysconfig.get_path("purelib"), sysconfig.get_path("platlib")}
+)
+
+# bound parameter placeholders of the drivers (?, %s, %(name)s, :name), and literal numbers / strings
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\b\d+(?:\.\d+)?\b|'(?:[^']|'')*')"
+_VALUES_LIST_PATTERN = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_VALUE_PATTERN = re.compile(_PLACEHOLDER)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def get_statement_shape(statement: str) -> str:
+    """
+    The statement without its values, so `IN (?, ?)` and `IN (?, ?, ?)` or `LIMIT 10` and `LIMIT 20` are the same shape
+    """
+    shape = _VALUES_LIST_PATTERN.sub("(?)", statement)
+    shape = _VALUE_PATTERN.sub("?", shape)
+    return _WHITESPACE_PATTERN.sub(" ", shape).strip()
+
+
+def _get_statement_origin() -> str:
+    # the innermost frame of the application (or test) code, rather than of the libraries or this module
+    for frame in reversed(traceback.extract_stack()):
+        if not frame.filename.startswith(_LIBRARY_DIRS) and not frame.filename.startswith(_UTILS_DIR):
+            filename = frame.filename
+            if filename.startswith(_ROOT_DIR):
+                filename = os.path.relpath(filename, _ROOT_DIR)
+            return f"{filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+@dataclass
+class ProfiledStatement:
+    statement: str
+    shape: str
+    seconds: float
+    origin: str
+
+
+class QueryProfiler:
+    """
+    Record every SQL statement run in this thread / context while it's active, with its time and the code
+    that ran it. It's meant for development and tests, not production: finding the origin walks the stack.
+
+    # Usage in a test:
+    with QueryProfiler(max_statements=5) as profiler:
+        get_word_text_context("genesis", 1, 1)
+    profiler.assert_within_budget()
+    """
+
+    def __init__(
+        self,
+        max_statements: int | None = None,
+        max_seconds: float | None = None,
+        repeated_shape_threshold: int = DEFAULT_REPEATED_SHAPE_THRESHOLD,
+    ):
+        self.max_statements = max_statements
+        self.max_seconds = max_seconds
+        self.repeated_shape_threshold = repeated_shape_threshold
+        self.statements: list[ProfiledStatement] = []
+        self.seconds = 0.0
+        on_statement(_record_statement)
+
+    def __enter__(self) -> Self:
+        self._token = _active_profiler.set(self)
+        self._start_time = perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.seconds = perf_counter() - self._start_time
+        _active_profiler.reset(self._token)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements.append(
+            ProfiledStatement(
+                statement=statement,
+                shape=get_statement_shape(statement),
+                seconds=seconds,
+                origin=_get_statement_origin(),
+            )
+        )
+
+    @property
+    def statements_seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    def get_repeated_shapes(self) -> dict[str, int]:
+        """
+        Map each statement shape that was repeated at least `repeated_shape_threshold` times to its count
+        """
+        counts = Counter(statement.shape for statement in self.statements)
+        return {
+            shape: count for shape, count in counts.most_common() if count >= self.repeated_shape_threshold
+        }
+
+    def get_budget_violations(self) -> list[str]:
+        violations = []
+        if self.max_statements is not None and len(self.statements) > self.max_statements:
+            violations.append(f"ran {len(self.statements)} statements, the budget is {self.max_statements}")
+        if self.max_seconds is not None and self.seconds > self.max_seconds:
+            violations.append(f"took {round(self.seconds, 3)} seconds, the budget is {self.max_seconds}")
+        return violations
+
+    def assert_within_budget(self) -> None:
+        """
+        Fail (a test) if the budgets were exceeded or a statement shape was repeated
+        """
+        problems = self.get_budget_violations() + [
+            f"statement repeated {count} times: {shape}"
+            for shape, count in self.get_repeated_shapes().items()
+        ]
+        assert not problems, "\n".join([*problems, self.format_statements()])
+
+    def format_statements(self) -> str:
+        return "\n".join(
+            f"{round(statement.seconds * 1000, 3)}ms {statement.origin}: {statement.shape}"
+            for statement in self.statements
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "numStatements": len(self.statements),
+            "seconds": round(self.seconds, 6),
+            "statementsSeconds": round(self.statements_seconds, 6),
+            "repeatedShapes": self.get_repeated_shapes(),
+            "budgetViolations": self.get_budget_violations(),
+            "statements": [
+                {"shape": statement.shape, "seconds": round(statement.seconds, 6), "origin": statement.origin}
+                for statement in self.statements
+            ],
+        }
+
+
+def _record_statement(statement: str, seconds: float) -> None:
+    profiler = _active_profiler.get()
+    if profiler is not None:
+        profiler.record(statement, seconds)
+
+
+def profile_blueprint_requests(blueprint: Blueprint) -> None:
+    """
+    Profile every request of the app the blueprint is registered on, when QUERY_PROFILER_ENABLED is set.
+    A request that exceeds the budgets of the config or repeats a statement shape is logged with its statements,
+    and every profiled response tells its number of statements in the X-Query-Count header
+    """
+    blueprint.before_app_request(_start_profiling)
+    blueprint.after_app_request(_end_profiling)
+    # after_request is skipped when the view raises, the profiler must not stay active in the thread's next request
+    blueprint.teardown_app_request(_stop_profiling)
+
+
+def _start_profiling() -> None:
+    if not current_app.config.get("QUERY_PROFILER_ENABLED"):
+        return
+    g.query_profiler = QueryProfiler(
+        max_statements=current_app.config.get("QUERY_PROFILER_MAX_STATEMENTS"),
+        max_seconds=current_app.config.get("QUERY_PROFILER_MAX_SECONDS"),
+    ).__enter__()
+
+
+def _end_profiling(response: Response) -> Response:
+    profiler: QueryProfiler | None = g.pop("query_profiler", None)
+    if profiler is None:
+        return response
+    profiler.__exit__(None, None, None)
+    response.headers["X-Query-Count"] = str(len(profiler.statements))
+    if profiler.get_budget_violations() or profiler.get_repeated_shapes():
+        current_app.logger.warning(
+            json.dumps({"event": "query_profile", "path": request.full_path, **profiler.to_dict()})
+        )
+    return response
+
+
+def _stop_profiling(exc: BaseException | None) -> None:
+    profiler: QueryProfiler | None = g.pop("query_profiler", None)
+    if profiler is not None:
+        profiler.__exit__(None, None, None)
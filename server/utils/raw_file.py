@@ -0,0 +1,10 @@
+import mmap
+
+
+def read_byte_ranges(file_path: str, ranges: list[tuple[int, int]]) -> list[bytes]:
+    """
+    Read the (offset, length) ranges of a file through a memory map, so only the pages they're on are read.
+    The file is mapped for this call only, since a book's file is rewritten if the book is deleted and added again.
+    """
+    with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        return [mapped_file[offset : offset + length] for offset, length in ranges]
@@ -0,0 +1,70 @@
+from time import perf_counter
+
+from flask import Blueprint, Response, g, has_request_context, request
+
+from server.utils.metrics import COUNT_BUCKETS, Histogram
+from server.utils.statement_hooks import on_statement
+from server.utils.timer import get_current_operation
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, until its response is returned (a streamed body is sent after it)",
+    ("endpoint", "method", "status"),
+)
+request_sql_statements = Histogram(
+    "http_request_sql_statements",
+    "Number of SQL statements run while handling a request",
+    ("endpoint", "method"),
+    buckets=COUNT_BUCKETS,
+)
+sql_statement_duration = Histogram(
+    "sql_statement_duration_seconds",
+    "Time to run a SQL statement, by the operation that ran it (the innermost Timer, else the route of the request)"
+    " and its first keyword",
+    ("operation", "keyword"),
+)
+
+
+def instrument_blueprint(blueprint: Blueprint) -> None:
+    """
+    Measure every request of the app the blueprint is registered on, and every SQL statement it runs
+    """
+    blueprint.before_app_request(_start_request)
+    blueprint.after_app_request(_end_request)
+    on_statement(_observe_statement)
+
+
+def _get_endpoint() -> str:
+    # the rule rather than the path, so there's a single series per route
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _start_request() -> None:
+    g.request_start_time = perf_counter()
+    g.num_sql_statements = 0
+
+
+def _end_request(response: Response) -> Response:
+    if "request_start_time" in g:
+        endpoint = _get_endpoint()
+        request_duration.observe(
+            perf_counter() - g.request_start_time, endpoint, request.method, str(response.status_code)
+        )
+        request_sql_statements.observe(g.num_sql_statements, endpoint, request.method)
+    return response
+
+
+def _get_statement_operation() -> str:
+    # a bounded set of names, unlike the statements themselves
+    operation = get_current_operation()
+    if operation is not None:
+        return operation
+    return _get_endpoint() if has_request_context() else "none"
+
+
+def _observe_statement(statement: str, seconds: float) -> None:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    sql_statement_duration.observe(seconds, _get_statement_operation(), keyword)
+    # statements of other threads (e.g. the bulk insert workers) aren't counted to any request
+    if has_request_context() and "num_sql_statements" in g:
+        g.num_sql_statements += 1
@@ -0,0 +1,64 @@
+from time import perf_counter
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExceptionContext, ExecutionContext
+
+# called with a statement and its run time once it ended or failed, in the thread that ran it
+StatementConsumer = Callable[[str, float], None]
+
+_consumers: list[StatementConsumer] = []
+
+# the start time is kept on the execution context of the statement, which is dropped with it even if it fails
+_START_TIME_ATTRIBUTE = "_statement_start_time"
+
+
+def on_statement(consumer: StatementConsumer) -> None:
+    """
+    Call the consumer with every SQL statement run by any engine (e.g. the request metrics and the query profiler).
+    The statements are timed by a single set of listeners, whatever the number of consumers
+    """
+    if consumer not in _consumers:
+        _consumers.append(consumer)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    *args: Any,
+) -> None:
+    if context is not None:
+        setattr(context, _START_TIME_ATTRIBUTE, perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    *args: Any,
+) -> None:
+    _end_statement(statement, context)
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    # a failed statement is passed on too, it may well be a slow one (e.g. a lock wait timeout)
+    if exception_context.statement is not None:
+        _end_statement(exception_context.statement, exception_context.execution_context)
+
+
+def _end_statement(statement: str, context: ExecutionContext | None) -> None:
+    start_time = getattr(context, _START_TIME_ATTRIBUTE, None)
+    if start_time is None:
+        return
+    seconds = perf_counter() - start_time
+    for consumer in _consumers:
+        consumer(statement, seconds)
@@ -1,7 +1,30 @@
+import json
+import logging
 from contextlib import ContextDecorator
+from contextvars import ContextVar
 from time import perf_counter
 from typing import Self
 
+from server.utils.metrics import Histogram
+
+operation_duration = Histogram(
+    "operation_duration_seconds",
+    "Time of the operations measured by Timer (queries, ingestion phases, index loads), by their name",
+    ("operation",),
+)
+
+logger = logging.getLogger(__name__)
+
+# the source name of the innermost Timer running in this thread / context
+_current_operation: ContextVar[str | None] = ContextVar("current_operation", default=None)
+
+
+def get_current_operation() -> str | None:
+    """
+    The source name of the innermost Timer the caller runs in, e.g. to label the SQL statements of an operation
+    """
+    return _current_operation.get()
+
 
 class Timer(ContextDecorator):
     def __init__(
@@ -10,30 +33,33 @@ class Timer(ContextDecorator):
         log_params: dict | None = None,
     ):
         """
-        A context manager for measuring time and logging to logz.io
+        A context manager for measuring time, the run time is observed in the operation_duration_seconds
+        histogram (see /metrics) and logged as a JSON line at the debug level
 
         # Usage as context manager:
         with timer(SOURCE_NAME):
             pass
 
-        :param source_name: The identifier of the event, will be shown in the log.
-        :param log_params: A dictionary of extra data to pass to the logger.
+        :param source_name: The identifier of the event, the operation label of the histogram.
+        :param log_params: A dictionary of extra data to pass to the logger, not part of the metric.
         """
         self.source_name = source_name
         self.log_params = log_params
 
     def __enter__(self) -> Self:
+        self._token = _current_operation.set(self.source_name)
         self.start_time = perf_counter()
         return self
 
     def __exit__(self, *exc: Self) -> None:
         self.end_time = perf_counter()
+        _current_operation.reset(self._token)
         run_time = self.end_time - self.start_time
         self.log_run_time(run_time)
 
     def log_run_time(self, run_time: float) -> None:
-        run_time = round(run_time, 3)
-        msg = f"{self.source_name} took: {run_time} seconds"
+        operation_duration.observe(run_time, self.source_name)
+        record = {"event": self.source_name, "seconds": round(run_time, 6)}
         if self.log_params:
-            msg += f" with parameters: {self.log_params}"
-        print(msg)
+            record["params"] = self.log_params
+        logger.debug(json.dumps(record, default=str))
@@ -0,0 +1,136 @@
+"""
+The same ingest and queries give the same results on SQLite and on MySQL: every test checks the results of
+the app against the sample books parsed in the test, whatever backend the tests run on (see conftest.py)
+"""
+from collections import Counter
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from server.db_instance import db
+from server.db_model.model.book import BookModel
+from server.db_model.model.group import GroupModel
+from server.db_model.model.word import WordModel
+
+PAGE_SIZE = 500
+
+
+def _get_all_words(client, filters: dict) -> list[dict]:
+    words = []
+    cursor = None
+    while True:
+        response = client.post(
+            "/api/words/", json={"filters": filters, "pageSize": PAGE_SIZE, "cursor": cursor}
+        )
+        assert response.status_code == 200, response.text
+        words.extend(response.json["words"])
+        cursor = response.json["nextCursor"]
+        if cursor is None:
+            return words
+
+
+def test_book_names(client, corpus):
+    response = client.get("/api/book_names")
+    assert sorted(response.json) == corpus.book_names
+
+
+def test_words_of_book(client, corpus):
+    expected = Counter(word for word, book, *_ in corpus.iter_appearances() if book == "exodus")
+    words = _get_all_words(client, {"book": "Exodus"})
+    assert words == [{"word": word, "count": count} for word, count in sorted(expected.items())]
+
+
+def test_words_of_corpus(client, corpus):
+    expected = Counter(word for word, *_ in corpus.iter_appearances())
+    words = _get_all_words(client, {})
+    assert words == [{"word": word, "count": count} for word, count in sorted(expected.items())]
+    response = client.post("/api/words/count", json={"filters": {}})
+    assert response.json["total"] == len(expected)
+
+
+def test_words_of_verse(client, corpus):
+    verse = next(
+        verse for verse in corpus.verses if (verse.book, verse.chapter, verse.verse) == ("genesis", 3, 5)
+    )
+    words = _get_all_words(client, {"book": "GENESIS", "chapter": "3", "verse": "5"})
+    assert words == [{"word": word, "count": count} for word, count in sorted(Counter(verse.words).items())]
+
+
+def test_words_starting_with(client, corpus):
+    expected = Counter(word for word, *_ in corpus.iter_appearances() if word.startswith("lo"))
+    words = _get_all_words(client, {"wordStartsWith": "Lo"})
+    assert words == [{"word": word, "count": count} for word, count in sorted(expected.items())]
+
+
+@pytest.mark.parametrize("word", ["light", "Light", "LIGHT"])
+def test_word_appearances(client, corpus, word):
+    response = client.post(f"/api/word/{word}", json={"filters": {}, "pageSize": 1000})
+    appearances = [
+        (appearance["book"], appearance["chapter"], appearance["verse"], appearance["word_position"])
+        for appearance in response.json["wordAppearances"]
+    ]
+    assert appearances == corpus.get_appearances("light")
+    assert response.json["total"] == len(appearances)
+
+
+def test_word_appearances_of_book(client, corpus):
+    response = client.post("/api/word/moses/count", json={"filters": {"book": "Joshua", "chapter": "1"}})
+    expected = [
+        appearance for appearance in corpus.get_appearances("moses") if appearance[:2] == ("joshua", 1)
+    ]
+    assert response.json["total"] == len(expected)
+
+
+def test_book_stats(client, corpus):
+    verses = [verse for verse in corpus.verses if verse.book == "genesis"]
+    words = [word for verse in verses for word in verse.words]
+    response = client.get("/api/books/Genesis/stats")
+    assert response.json["numChapters"] == verses[-1].chapter
+    assert response.json["numVerses"] == len(verses)
+    assert response.json["totalWords"] == len(words)
+    assert response.json["totalUniqueWords"] == len(set(words))
+
+
+def test_phrase_reference(client, corpus):
+    response = client.get("/api/phrase/In the BEGINNING/reference")
+    assert response.json == [{"title": "genesis", "chapter_num": 1, "verse_num": 1, "word_position": 1}]
+
+
+def test_group_words(client, corpus):
+    response = client.post("/api/add_group", json={"groupName": "Patriarchs"})
+    assert response.status_code == 200, response.text
+    try:
+        response = client.post(
+            "/api/groups/add_words", json={"groupName": "PATRIARCHS", "words": ["Abraham", "isaac", "JACOB"]}
+        )
+        assert all(result["success"] for result in response.json["words"]), response.json
+
+        expected = Counter(
+            word for word, *_ in corpus.iter_appearances() if word in ("abraham", "isaac", "jacob")
+        )
+        words = _get_all_words(client, {"groupName": "patriarchs"})
+        assert words == [{"word": word, "count": count} for word, count in sorted(expected.items())]
+    finally:
+        client.delete("/api/group-to-delete/patriarchs")
+
+
+def test_text_columns_ignore_case(app, corpus):
+    """
+    The text columns compare regardless of case on both backends, as the utf8 collation of MySQL does
+    (see case_insensitive_string)
+    """
+    assert db.session.query(WordModel.value).filter(WordModel.value == "LIGHT").scalar() == "light"
+    assert db.session.query(BookModel.title).filter(BookModel.title == "Genesis").scalar() == "genesis"
+    assert [
+        title for (title,) in db.session.query(BookModel.title).filter(BookModel.title.in_(["EXODUS"]))
+    ] == ["exodus"]
+
+    db.session.add(GroupModel(name="colors"))
+    db.session.commit()
+    try:
+        db.session.add(GroupModel(name="Colors"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+    finally:
+        GroupModel.delete_group_by_name("colors")
@@ -0,0 +1,41 @@
+"""
+A book is parsed to the same verses, at the same byte offsets, whether it's streamed (an upload) or read as a whole
+(the bulk load), whatever its line endings
+"""
+import io
+
+import pytest
+
+from server.logic import bible_book_parser
+from server.logic.bible_book_parser import iter_book_verses, iter_raw_lines
+
+BOOK_LINES = ["Tst.1", "[1] In the beginning", "", "[2] And the earth", "Tst.2", "[1] Let there be light"]
+
+
+@pytest.mark.parametrize("line_ending", ["\n", "\r\n", "\r"])
+@pytest.mark.parametrize("read_size", [1, 2, 3, 7, 1 << 16])
+def test_streamed_lines_match_splitlines(monkeypatch, line_ending, read_size):
+    monkeypatch.setattr(bible_book_parser, "RAW_READ_SIZE", read_size)
+    raw_text = line_ending.join(BOOK_LINES).encode() + b"\r\n\r"
+    raw_copy = io.BytesIO()
+    lines = list(iter_raw_lines(io.BytesIO(raw_text), raw_copy))
+    assert lines == raw_text.splitlines(keepends=True)
+    assert raw_copy.getvalue() == raw_text
+
+
+@pytest.mark.parametrize("line_ending", ["\n", "\r\n", "\r"])
+def test_verse_offsets(line_ending):
+    raw_text = line_ending.join(BOOK_LINES).encode()
+    streamed = list(iter_book_verses(iter_raw_lines(io.BytesIO(raw_text))))
+    assert streamed == list(iter_book_verses(raw_text.splitlines(keepends=True)))
+    assert [(verse.chapter_num, verse.verse_num) for verse in streamed] == [(1, 1), (1, 2), (2, 1)]
+    for verse, line in zip(streamed, ["[1] In the beginning", "[2] And the earth", "[1] Let there be light"]):
+        assert raw_text[verse.byte_offset : verse.byte_offset + verse.byte_length] == line.encode()
+
+
+def test_verse_offsets_of_unicode_whitespace():
+    # no-break spaces and an ideographic space around the verses, which bytes.strip() would keep
+    raw_text = "Tst.1\n\u00a0[1] In the beginning\u00a0\n\u3000 [2] And the earth \u00a0\r\n".encode()
+    verses = list(iter_book_verses(iter_raw_lines(io.BytesIO(raw_text))))
+    texts = [raw_text[verse.byte_offset : verse.byte_offset + verse.byte_length].decode() for verse in verses]
+    assert texts == ["[1] In the beginning", "[2] And the earth"]
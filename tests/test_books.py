@@ -0,0 +1,107 @@
+"""
+Adding and deleting books, through the upload and the bulk load paths
+"""
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from server.db_instance import db
+from server.db_model import db_functions
+from server.db_model.model.book import BookModel
+from server.db_model.model.word import WordModel
+from server.logic.structures import RawBook
+from server.service.books_services import add_book, add_books
+
+BOOK_TEXT = "Tst.1\n[1] A verse of a test book\n"
+
+
+@pytest.mark.parametrize(
+    "book_name", ["../evil", "../../evil", "sub/evil", "sub\\evil", ".hidden", "", "a\0b"]
+)
+def test_book_name_is_a_plain_file_name(ext_disk, book_name):
+    parent_dir = os.path.dirname(ext_disk)
+    files_before = set(os.listdir(parent_dir)), set(os.listdir(ext_disk))
+
+    success, message = add_book(book_name, FileStorage(stream=io.BytesIO(BOOK_TEXT.encode())), "test")
+    assert not success
+    success, results = add_books([RawBook(book_name, "test", BOOK_TEXT.encode())])
+    assert success and results == [
+        {"book": book_name, "success": False, "message": f"invalid book name {book_name}"}
+    ]
+
+    assert (set(os.listdir(parent_dir)), set(os.listdir(ext_disk))) == files_before
+    assert BookModel.get_book(book_name, include_deleted=True) is None
+
+
+def test_add_books_file_name_is_the_book_name(client, ext_disk):
+    response = client.post(
+        "/api/add_books",
+        data={"division": "test", "textFiles": [(io.BytesIO(BOOK_TEXT.encode()), "../../evil.txt")]},
+    )
+    assert response.status_code == 200, response.text
+    assert [result["success"] for result in response.json["books"]] == [False]
+    assert not os.path.exists(os.path.join(ext_disk, "..", "..", "evil.txt"))
+
+
+def test_raw_file_deleted_while_book_holds_title(ext_disk, add_test_book, delete_book_and_wait, monkeypatch):
+    add_test_book("doomed", BOOK_TEXT)
+    file_path = os.path.join(ext_disk, "doomed.txt")
+    assert os.path.exists(file_path)
+
+    # a book of the same title can be added once the title is free, the file must be gone by then
+    title_taken_on_remove = []
+    remove = os.remove
+
+    def record_remove(path: str) -> None:
+        if path == file_path:
+            title_taken_on_remove.append(BookModel.does_book_exist("doomed"))
+        remove(path)
+
+    monkeypatch.setattr(os, "remove", record_remove)
+    delete_book_and_wait("doomed")
+    assert title_taken_on_remove == [True]
+    assert not os.path.exists(file_path)
+
+
+def test_raw_files_removed_when_insert_fails(ext_disk, monkeypatch):
+    from server.service import books_services
+
+    def fail_insert(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(books_services, "insert_parsed_books_to_tables", fail_insert)
+    success, message = add_books(
+        [RawBook("unsettled1", "test", BOOK_TEXT.encode()), RawBook("unsettled2", "test", BOOK_TEXT.encode())]
+    )
+    assert not success and message == "insert failed"
+    assert not os.path.exists(os.path.join(ext_disk, "unsettled1.txt"))
+    assert not os.path.exists(os.path.join(ext_disk, "unsettled2.txt"))
+
+
+def _word_exists(word: str) -> bool:
+    return db.session.query(WordModel.word_id).filter(WordModel.value == word).scalar() is not None
+
+
+def test_failed_upload_leaves_no_words(corpus, monkeypatch):
+    # the first verse is written (and its words merged) before the malformed line is read
+    monkeypatch.setattr(db_functions, "WORD_APPEARANCE_INSERT_CHUNK_SIZE", 1)
+    text = "Tst.1\n[1] Zorphanone light\nnot a verse line\n"
+    success, message = add_book("malformed", FileStorage(stream=io.BytesIO(text.encode())), "test")
+    assert not success
+    assert not _word_exists("zorphanone")
+    assert _word_exists("light")
+    assert BookModel.get_book("malformed", include_deleted=True) is None
+
+
+def test_failed_bulk_load_leaves_no_words(corpus, monkeypatch):
+    def fail_insert(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(db_functions, "_insert_verse_rows", fail_insert)
+    success, results = add_books([RawBook("failing", "test", "Tst.1\n[1] Zorphantwo light\n".encode())])
+    assert success and [result["success"] for result in results] == [False]
+    assert not _word_exists("zorphantwo")
+    assert _word_exists("light")
+    assert BookModel.get_book("failing", include_deleted=True) is None
@@ -0,0 +1,44 @@
+"""
+The caches are bounded by their number of items, and optionally by the total size of their values
+"""
+from server.utils.cache import LRUCache
+from server.utils.http_cache import MAX_CACHED_BODIES_SIZE, response_cache
+
+
+def test_least_recently_used_dropped():
+    cache = LRUCache("test_items", max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_bounded_by_total_size():
+    cache = LRUCache("test_bytes", max_size=100, max_total_size=10, get_size=len)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.set("c", b"1234")
+    # "b" was the least recently used
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (b"1234", None, b"1234")
+    assert cache.total_size == 8
+
+    # replacing a value counts its new size only
+    cache.set("a", b"12")
+    assert cache.total_size == 6 and len(cache) == 2
+
+    # a value bigger than the whole cache isn't cached, and doesn't drop the others
+    cache.set("d", b"12345678901")
+    assert cache.get("d") is None and cache.total_size == 6 and len(cache) == 2
+
+    cache.clear()
+    assert cache.total_size == 0 and len(cache) == 0
+
+
+def test_response_cache_bounded_by_bytes(client, corpus):
+    assert response_cache.max_total_size == MAX_CACHED_BODIES_SIZE
+    response_cache.clear()
+    response = client.get("/api/book_names")
+    assert response.status_code == 200
+    assert response_cache.total_size == len(response.get_data())
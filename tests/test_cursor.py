@@ -0,0 +1,141 @@
+"""
+Paging by cursor reads every row once, also when the page ends at the last row and when the books of the
+cursor are deleted between the pages
+"""
+import pytest
+
+from server.utils.cursor import decode_cursor, encode_cursor
+
+WORD_KEY_TYPES = [str]
+APPEARANCE_KEY_TYPES = [str, int, int, int]
+
+
+@pytest.mark.parametrize(
+    "sort_key, key_types",
+    [
+        (["light"], WORD_KEY_TYPES),
+        (["ἀρχῇ"], WORD_KEY_TYPES),
+        (["genesis", 1, 1, 4], APPEARANCE_KEY_TYPES),
+        (["1 kings", 22, 53, 1], APPEARANCE_KEY_TYPES),
+    ],
+)
+def test_round_trip(sort_key, key_types):
+    cursor = encode_cursor(sort_key)
+    assert decode_cursor(cursor, key_types) == sort_key
+
+
+@pytest.mark.parametrize(
+    "cursor, key_types",
+    [
+        ("not a cursor", WORD_KEY_TYPES),
+        (encode_cursor(["light"])[:-3], WORD_KEY_TYPES),
+        (encode_cursor({"word": "light"}), WORD_KEY_TYPES),
+        (encode_cursor(["light"]), APPEARANCE_KEY_TYPES),
+        (encode_cursor(["genesis", "1", 1, 4]), APPEARANCE_KEY_TYPES),
+        # a bool is an int to isinstance
+        (encode_cursor(["genesis", True, 1, 4]), APPEARANCE_KEY_TYPES),
+    ],
+)
+def test_invalid_cursor(cursor, key_types):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, key_types)
+
+
+def test_invalid_cursor_is_bad_request(client, corpus):
+    response = client.post("/api/words/", json={"filters": {}, "pageSize": 10, "cursor": "not a cursor"})
+    assert response.status_code == 400
+    response = client.post(
+        "/api/word/light", json={"filters": {}, "pageSize": 10, "cursor": encode_cursor(["light"])}
+    )
+    assert response.status_code == 400
+
+
+def _get_words_page(client, filters: dict, page_size: int, cursor: str | None = None) -> dict:
+    response = client.post("/api/words/", json={"filters": filters, "pageSize": page_size, "cursor": cursor})
+    assert response.status_code == 200, response.text
+    return response.json
+
+
+def _get_appearances_page(client, word: str, page_size: int, cursor: str | None = None) -> dict:
+    response = client.post(f"/api/word/{word}", json={"filters": {}, "pageSize": page_size, "cursor": cursor})
+    assert response.status_code == 200, response.text
+    return response.json
+
+
+def _to_tuples(appearances: list[dict]) -> list[tuple[str, int, int, int]]:
+    return [
+        (appearance["book"], appearance["chapter"], appearance["verse"], appearance["word_position"])
+        for appearance in appearances
+    ]
+
+
+@pytest.mark.parametrize("page_size", [1, 7, 100])
+def test_word_pages(client, corpus, page_size):
+    filters = {"book": "genesis", "chapter": "1"}
+    expected = sorted(
+        {word for word, book, chapter, *_ in corpus.iter_appearances() if (book, chapter) == ("genesis", 1)}
+    )
+    words = []
+    cursor = None
+    while True:
+        page = _get_words_page(client, filters, page_size, cursor)
+        words.extend(word["word"] for word in page["words"])
+        if (cursor := page["nextCursor"]) is None:
+            break
+    assert words == expected
+
+
+@pytest.mark.parametrize("page_size", [1, 10, 250])
+def test_appearance_pages(client, corpus, page_size):
+    appearances = []
+    cursor = None
+    while True:
+        page = _get_appearances_page(client, "light", page_size, cursor)
+        appearances.extend(_to_tuples(page["wordAppearances"]))
+        if (cursor := page["nextCursor"]) is None:
+            break
+    assert appearances == corpus.get_appearances("light")
+
+
+def test_page_ending_at_last_row(client, corpus):
+    # a full last page still has a cursor, the page after it is empty and has none
+    expected = corpus.get_appearances("light")
+    page = _get_appearances_page(client, "light", len(expected))
+    assert _to_tuples(page["wordAppearances"]) == expected
+    assert page["nextCursor"] is not None
+    page = _get_appearances_page(client, "light", len(expected), page["nextCursor"])
+    assert page == {"wordAppearances": [], "total": len(expected), "nextCursor": None}
+
+    verse = next(
+        verse for verse in corpus.verses if (verse.book, verse.chapter, verse.verse) == ("genesis", 1, 1)
+    )
+    filters = {"book": "genesis", "chapter": "1", "verse": "1"}
+    page = _get_words_page(client, filters, len(set(verse.words)))
+    assert page["nextCursor"] is not None
+    assert _get_words_page(client, filters, 10, page["nextCursor"])["words"] == []
+
+
+def test_cursor_of_deleted_book(client, corpus, add_test_book, delete_book_and_wait):
+    # "aardvark" is sorted before the sample books, the cursor is left in it
+    add_test_book("aardvark", "Aard.1\n[1] Let there be light, light and light\n[2] Zzyzx light\n")
+    page = _get_appearances_page(client, "light", 2)
+    assert _to_tuples(page["wordAppearances"]) == [("aardvark", 1, 1, 4), ("aardvark", 1, 1, 5)]
+    # past every word of the sample books, "zzyzx" itself is deleted with the book as it's left unused
+    words_page = _get_words_page(client, {"wordStartsWith": "zz"}, 1)
+    assert words_page["words"] == [{"word": "zzyzx", "count": 1}]
+
+    delete_book_and_wait("aardvark")
+
+    appearances = _to_tuples(page["wordAppearances"])
+    cursor = page["nextCursor"]
+    while cursor is not None:
+        page = _get_appearances_page(client, "light", 100, cursor)
+        appearances.extend(_to_tuples(page["wordAppearances"]))
+        cursor = page["nextCursor"]
+    assert appearances[2:] == corpus.get_appearances("light")
+
+    assert _get_words_page(client, {}, 10, words_page["nextCursor"]) == {
+        "words": [],
+        "total": len({word for word, *_ in corpus.iter_appearances()}),
+        "nextCursor": None,
+    }
@@ -0,0 +1,44 @@
+"""
+The data versions are read from the db by the requests that read the books or groups, at most once per
+DATA_VERSION_SYNC_INTERVAL, so a change of another process is seen within it
+"""
+import pytest
+
+from server.db_model.model.data_version import CORPUS_VERSION, DataVersionModel
+from server.service import cache_invalidation
+
+
+@pytest.fixture
+def versions_reads(app, monkeypatch) -> list[None]:
+    reads = []
+    get_versions = DataVersionModel.get_versions
+
+    def count_get_versions() -> dict[str, int]:
+        reads.append(None)
+        return get_versions()
+
+    monkeypatch.setattr(DataVersionModel, "get_versions", count_get_versions)
+    monkeypatch.setattr(cache_invalidation, "_last_sync_time", None)
+    return reads
+
+
+@pytest.mark.parametrize("path", ["/ping", "/metrics", "/api/cache_stats"])
+def test_unversioned_endpoints_dont_sync(client, versions_reads, path):
+    assert client.get(path).status_code == 200
+    assert versions_reads == []
+
+
+def test_sync_is_rate_limited(app, client, corpus, versions_reads, monkeypatch):
+    monkeypatch.setitem(app.config, "DATA_VERSION_SYNC_INTERVAL", 60)
+    for _ in range(3):
+        assert client.get("/api/book_names").status_code == 200
+    assert len(versions_reads) == 1
+
+
+def test_version_of_another_process(app, client, corpus, versions_reads, monkeypatch):
+    monkeypatch.setitem(app.config, "DATA_VERSION_SYNC_INTERVAL", 0)
+    # as another process would after adding a book, without clearing the caches of this one
+    version = DataVersionModel.bump(CORPUS_VERSION)
+    assert cache_invalidation.corpus_version.value < version
+    assert client.get("/api/book_names").status_code == 200
+    assert cache_invalidation.corpus_version.value == version
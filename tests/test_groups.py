@@ -0,0 +1,51 @@
+"""
+Adding words to a group at once
+"""
+import pytest
+
+from server.service.group_services import add_group, add_words_to_group, delete_group, get_words_in_group
+from server.utils.query_profiler import QueryProfiler
+
+
+@pytest.fixture
+def group(corpus):
+    success, message = add_group("test group")
+    assert success, message
+    yield "test group"
+    delete_group("test group")
+
+
+def test_add_words_results(group):
+    success, message = add_words_to_group(group, ["light"])
+    assert success, message
+
+    success, results = add_words_to_group(
+        group, ["Darkness", "light", "notaword", "darkness", "LIGHT", "earth"]
+    )
+    assert success, results
+    assert results == [
+        {
+            "word": "darkness",
+            "success": True,
+            "message": f"word darkness was added to group {group} successfully",
+        },
+        {"word": "light", "success": False, "message": f"Group '{group}' already has word 'light'"},
+        {"word": "notaword", "success": False, "message": "word notaword doesn't exist in any book"},
+        {"word": "earth", "success": True, "message": f"word earth was added to group {group} successfully"},
+    ]
+    assert sorted(get_words_in_group(group)[1]) == ["darkness", "earth", "light"]
+
+
+def test_add_words_to_missing_group(corpus):
+    assert add_words_to_group("not a group", ["light"]) == (False, "group not a group doesn't exist")
+
+
+def test_number_of_statements(group, corpus):
+    # the statements don't depend on the number of words
+    words = sorted({word for word, *_ in corpus.iter_appearances()})
+    with QueryProfiler() as few_words_profiler:
+        add_words_to_group(group, words[:3])
+    with QueryProfiler() as many_words_profiler:
+        add_words_to_group(group, words[3:500])
+    assert len(many_words_profiler.statements) == len(few_words_profiler.statements) > 0
+    assert len(get_words_in_group(group)[1]) == 500
@@ -0,0 +1,69 @@
+"""
+The positional intersection of the postings finds the same places as a scan of every verse
+"""
+import pytest
+
+from server.logic import phrase_search
+from server.logic.phrase_search import find_all_references_of_phrase
+from server.logic.word_index import WordIndex
+
+PHRASES = [
+    "in the beginning",
+    "and the lord said unto moses",
+    "the children of israel",
+    "of the",
+    "light",
+    # a word repeated in the phrase
+    "the lord the",
+    "holiness to the lord",
+    "good and the evening",
+    # the last word of genesis 1:2 and the first words of 1:3, a phrase doesn't span verses
+    "waters and god",
+    # every word is in the corpus, never in this order
+    "moses the beginning",
+    "notaword of the",
+]
+
+
+def _scan_verses(corpus, phrase: str) -> list[dict]:
+    phrase_words = phrase.split()
+    references = [
+        (verse.book, verse.chapter, verse.verse, start + 1)
+        for verse in corpus.verses
+        for start in range(len(verse.words) - len(phrase_words) + 1)
+        if verse.words[start : start + len(phrase_words)] == phrase_words
+    ]
+    return [
+        {"book": book, "chapter": chapter, "verse": verse, "word_position": word_position}
+        for book, chapter, verse, word_position in sorted(references)
+    ]
+
+
+@pytest.fixture(scope="module")
+def indexed(corpus):
+    """
+    Read the postings from an index of this module, rather than the one of the app
+    """
+    index = WordIndex()
+    index.load()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(phrase_search, "word_index", index)
+        yield
+
+
+@pytest.mark.parametrize("phrase", PHRASES)
+def test_db_postings_match_scan(corpus, phrase):
+    assert find_all_references_of_phrase(phrase) == _scan_verses(corpus, phrase)
+
+
+@pytest.mark.parametrize("phrase", PHRASES)
+def test_index_postings_match_scan(corpus, indexed, phrase):
+    assert find_all_references_of_phrase(phrase, use_index=True) == _scan_verses(corpus, phrase)
+
+
+def test_phrase_is_tokenized(corpus):
+    assert find_all_references_of_phrase("In the BEGINNING,") == _scan_verses(corpus, "in the beginning")
+
+
+def test_empty_phrase(corpus):
+    assert find_all_references_of_phrase(" ,. ") == []
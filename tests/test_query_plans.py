@@ -0,0 +1,26 @@
+"""
+The hot word_appearance queries are answered from the indexes, see `flask --app app check-query-plans`.
+The plans are read with EXPLAIN on MySQL and with EXPLAIN QUERY PLAN on SQLite, whichever the tests run on
+(see conftest.py)
+"""
+import pytest
+
+from server.db_instance import db
+from server.db_model.model.word_appearance import WordAppearanceModel
+from server.db_model.query_plans import find_full_scans, get_hot_queries
+
+
+@pytest.fixture(scope="module")
+def hot_queries(corpus):
+    return get_hot_queries()
+
+
+def test_no_full_scans(hot_queries):
+    full_scans = {name: scans for name, query in hot_queries.items() if (scans := find_full_scans(query))}
+    assert full_scans == {}
+
+
+def test_full_scan_is_found(corpus):
+    # no index starts with word_position, so this query reads the whole table: the check must report it
+    query = db.session.query(WordAppearanceModel.book_id).filter(WordAppearanceModel.word_position > 1)
+    assert find_full_scans(query) != []
@@ -0,0 +1,71 @@
+"""
+The query profiler records the statements of its context by their shape, and reports the shapes that repeat
+(a likely N+1) or a profile over its budgets
+"""
+import pytest
+
+from server.db_instance import db
+from server.db_model.model.word import WordModel
+from server.utils.query_profiler import QueryProfiler, get_statement_shape
+from server.utils.request_metrics import sql_statement_duration
+
+
+@pytest.mark.parametrize(
+    "statement, shape",
+    [
+        ("SELECT * FROM word WHERE word_id IN (?, ?)", "SELECT * FROM word WHERE word_id IN (?)"),
+        ("SELECT * FROM word WHERE word_id IN (%s, %s, %s)", "SELECT * FROM word WHERE word_id IN (?)"),
+        ("SELECT * FROM word WHERE word_id IN (1, 2, 3)", "SELECT * FROM word WHERE word_id IN (?)"),
+        ("SELECT * FROM word LIMIT 10 OFFSET 20", "SELECT * FROM word LIMIT ? OFFSET ?"),
+        ("SELECT * FROM word WHERE value = 'it''s'", "SELECT * FROM word WHERE value = ?"),
+        ("SELECT * FROM word WHERE value = %(value_1)s", "SELECT * FROM word WHERE value = ?"),
+        ("SELECT * FROM word WHERE value = :value", "SELECT * FROM word WHERE value = ?"),
+        ("SELECT *\n  FROM   word\n WHERE word_id = ?", "SELECT * FROM word WHERE word_id = ?"),
+        # a number that is part of a name is kept
+        ("SELECT word_1.value FROM word AS word_1", "SELECT word_1.value FROM word AS word_1"),
+    ],
+)
+def test_statement_shape(statement, shape):
+    assert get_statement_shape(statement) == shape
+
+
+def test_repeated_shapes(app, corpus):
+    with QueryProfiler(repeated_shape_threshold=3) as profiler:
+        for word in ("light", "darkness", "moses"):
+            db.session.query(WordModel.word_id).filter(WordModel.value == word).scalar()
+        db.session.query(WordModel.word_id).filter(WordModel.value.in_(["light", "moses"])).all()
+        db.session.query(WordModel.word_id).filter(WordModel.value.in_(["darkness"])).all()
+
+    assert len(profiler.statements) == 5
+    assert list(profiler.get_repeated_shapes().values()) == [3]
+    with pytest.raises(AssertionError, match="statement repeated 3 times"):
+        profiler.assert_within_budget()
+
+    with QueryProfiler(repeated_shape_threshold=3) as profiler:
+        db.session.query(WordModel.word_id).filter(WordModel.value.in_(["light", "moses", "darkness"])).all()
+    assert profiler.get_repeated_shapes() == {}
+    profiler.assert_within_budget()
+    # the statement was run by this module
+    assert profiler.statements[0].origin.startswith("tests/test_query_profiler.py:")
+
+
+def test_statements_budget(app, corpus):
+    with QueryProfiler(max_statements=1) as profiler:
+        db.session.query(WordModel.word_id).filter(WordModel.value == "light").scalar()
+        db.session.query(WordModel.word_id).filter(WordModel.value.in_(["light", "moses"])).all()
+    assert profiler.get_budget_violations() == ["ran 2 statements, the budget is 1"]
+
+
+def test_statements_outside_of_profile(app, corpus):
+    with QueryProfiler() as profiler:
+        pass
+    db.session.query(WordModel.word_id).filter(WordModel.value == "light").scalar()
+    assert profiler.statements == []
+
+
+def test_metrics_and_profiler_share_the_statements(app, corpus, monkeypatch):
+    observed = []
+    monkeypatch.setattr(sql_statement_duration, "observe", lambda seconds, *labels: observed.append(seconds))
+    with QueryProfiler() as profiler:
+        db.session.query(WordModel.word_id).filter(WordModel.value == "light").scalar()
+    assert [statement.seconds for statement in profiler.statements] == observed
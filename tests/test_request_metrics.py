@@ -0,0 +1,42 @@
+"""
+The SQL statements are measured by a bounded identity: the operation that ran them, and their first keyword
+"""
+import pytest
+
+from server.db_instance import db
+from server.db_model.model.word import WordModel
+from server.utils.request_metrics import sql_statement_duration
+from server.utils.timer import Timer
+
+
+@pytest.fixture
+def statement_labels(app, monkeypatch) -> list[tuple[str, ...]]:
+    labels = []
+    monkeypatch.setattr(
+        sql_statement_duration, "observe", lambda seconds, *label_values: labels.append(label_values)
+    )
+    return labels
+
+
+def test_statement_of_timer(corpus, statement_labels):
+    with Timer("outer_operation"):
+        with Timer("inner_operation"):
+            db.session.query(WordModel.word_id).filter(WordModel.value == "light").scalar()
+        db.session.query(WordModel.word_id).filter(WordModel.value == "moses").scalar()
+    db.session.query(WordModel.word_id).filter(WordModel.value == "jordan").scalar()
+    assert statement_labels == [
+        ("inner_operation", "SELECT"),
+        ("outer_operation", "SELECT"),
+        ("none", "SELECT"),
+    ]
+
+
+def test_statement_of_request(client, corpus, statement_labels):
+    response = client.post(
+        "/api/words/", json={"filters": {"book": "exodus"}, "pageSize": 5, "includeTotal": False}
+    )
+    assert response.status_code == 200, response.text
+    operations = {operation for operation, _ in statement_labels}
+    # the page query is timed, the other statements of the request are labelled by its route
+    assert "get_filtered_words_paginate_query" in operations
+    assert operations <= {"get_filtered_words_paginate_query", "/api/words/"}
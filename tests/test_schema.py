@@ -0,0 +1,30 @@
+"""
+A SQLite db is created from the models (see app.py) and a MySQL db by the migrations, so a change made to only
+one of them would make the backends drift apart
+"""
+import os
+
+import pytest
+
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config as AlembicConfig
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from consts import ROOT_PATH
+
+
+def test_single_migration_head():
+    script = ScriptDirectory.from_config(AlembicConfig(os.path.join(ROOT_PATH, "alembic.ini")))
+    assert len(script.get_heads()) == 1
+
+
+def test_migrations_match_models(app):
+    from server.db_instance import db
+
+    if db.engine.dialect.name != "mysql":
+        pytest.skip("the migrations are written for MySQL, set TEST_MYSQL_URI to run them")
+    script = ScriptDirectory.from_config(AlembicConfig(os.path.join(ROOT_PATH, "alembic.ini")))
+    with db.engine.connect() as connection:
+        migration_context = MigrationContext.configure(connection, opts={"compare_type": True})
+        assert migration_context.get_current_revision() == script.get_current_head()
+        assert compare_metadata(migration_context, db.metadata) == []
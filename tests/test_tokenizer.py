@@ -0,0 +1,63 @@
+import re
+
+import pytest
+
+from benchmarks.parser_benchmark import load_sample_lines
+from server.logic.tokenizer import is_chapter_header, tokenize_verse_line, tokenize_verse_text
+
+
+def test_sample_lines_tokenized_as_by_regex():
+    for line in load_sample_lines():
+        if is_chapter_header(line):
+            continue
+        match = re.match(r"\[(\d+)\] (.+)", line)
+        assert match is not None, line
+        words = [word.lower() for word in re.sub(r"[^\w\s']", " ", match.group(2)).split()]
+        assert tokenize_verse_line(line) == (int(match.group(1)), words)
+
+
+@pytest.mark.parametrize(
+    "verse_text, words",
+    [
+        ("And God said, Let there be light:", ["and", "god", "said", "let", "there", "be", "light"]),
+        ("eleven days' journey", ["eleven", "days'", "journey"]),
+        ("Kadesh-barnea.)", ["kadesh", "barnea"]),
+        ("(There are 11 days;", ["there", "are", "11", "days"]),
+        ("snake_case\tand  spaces ", ["snake_case", "and", "spaces"]),
+        ("בראשית ברא אלהים", ["בראשית", "ברא", "אלהים"]),
+        # a capital sigma is lower cased to a final sigma at the end of a word only
+        ("ΚΑΙ ΕΙΠΕΝ Ο ΘΕΟΣ", ["και", "ειπεν", "ο", "θεος"]),
+        ("ΟΔΟΣ, ΣΟΦΙΑ. ΦΩΣ'", ["οδος", "σοφια", "φως'"]),
+        ("Σ", ["σ"]),
+        ("", []),
+        ("... !", []),
+    ],
+)
+def test_tokenize_verse_text(verse_text, words):
+    assert tokenize_verse_text(verse_text) == words
+
+
+@pytest.mark.parametrize("line", ["Gen.1", "Deut.34", "1Kgs.22", "2Sam.1", "Gen.1 "])
+def test_chapter_header(line):
+    assert is_chapter_header(line)
+    assert tokenize_verse_line(line) is None
+
+
+@pytest.mark.parametrize("line", ["[1] In the beginning", "Gen 1", "Gen.", ".1", "12Kgs.1", "Gen1"])
+def test_not_chapter_header(line):
+    assert not is_chapter_header(line)
+
+
+@pytest.mark.parametrize(
+    "line, verse",
+    [
+        ("[1] In the beginning", (1, ["in", "the", "beginning"])),
+        ("[176] Selah.", (176, ["selah"])),
+        ("[3] ...", (3, [])),
+        ("[1]", None),
+        ("[x] In the beginning", None),
+        ("1 In the beginning", None),
+    ],
+)
+def test_tokenize_verse_line(line, verse):
+    assert tokenize_verse_line(line) == verse
@@ -0,0 +1,119 @@
+"""
+The word index answers the word appearance pages and totals as the word_appearance queries do
+"""
+import threading
+
+import pytest
+
+from server.db_model.model.book import BookModel
+from server.db_model.model.data_version import CORPUS_VERSION, DataVersionModel
+from server.db_model.model.word_appearance import WordAppearanceModel
+from server.logic.word_index import WordIndex, pack_posting, unpack_posting
+
+WORDS = ["the", "light", "moses", "beginning", "jordan", "notaword"]
+FILTERS = [
+    {},
+    {"book": "Exodus"},
+    {"book": "genesis", "chapter": "1"},
+    {"chapter": "2", "verse": "3"},
+    {"wordPosition": "1"},
+    {"book": "joshua", "chapter": "3", "verse": "1", "wordPosition": "2"},
+]
+PAGE_SIZE = 7
+
+
+@pytest.fixture(scope="module")
+def word_index(corpus) -> WordIndex:
+    # a new index rather than the one of the app, so the other tests keep querying the db.
+    # it's loaded once, a test that adds a book to it removes it as well
+    index = WordIndex()
+    index.load()
+    return index
+
+
+@pytest.mark.parametrize(
+    "chapter_num, verse_num, word_position", [(1, 1, 1), (0, 0, 0), (150, 176, 119), ((1 << 21) - 1, 5, 7)]
+)
+def test_pack_posting_round_trip(chapter_num, verse_num, word_position):
+    assert unpack_posting(pack_posting(chapter_num, verse_num, word_position)) == (
+        chapter_num,
+        verse_num,
+        word_position,
+    )
+
+
+def test_packed_postings_sort_as_positions():
+    positions = [(2, 1, 1), (1, 10, 3), (1, 2, 40), (1, 2, 5), (10, 1, 1), (1, 1, 1)]
+    packed = sorted(pack_posting(*position) for position in positions)
+    assert [unpack_posting(posting) for posting in packed] == sorted(positions)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("word", WORDS)
+def test_counts_match_db(word_index, word, filters):
+    assert word_index.count_filtered_word_appearances(
+        word, filters
+    ) == WordAppearanceModel.count_filtered_word_appearances(word, filters)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("word", WORDS)
+def test_pages_match_db(word_index, word, filters):
+    for page_index in (0, 1, 5):
+        assert word_index.get_word_appearances_page(
+            word, filters, page_index, PAGE_SIZE
+        ) == WordAppearanceModel.get_word_appearances_page(word, filters, page_index, PAGE_SIZE)
+
+
+@pytest.mark.parametrize("filters", FILTERS[:3])
+def test_cursor_pages_match_db(word_index, filters):
+    after = None
+    for _ in range(20):
+        page = word_index.get_word_appearances_page("the", filters, 0, PAGE_SIZE, after)
+        assert page == WordAppearanceModel.get_word_appearances_page("the", filters, 0, PAGE_SIZE, after)
+        if len(page) < PAGE_SIZE:
+            break
+        last = page[-1]
+        after = (last["book"], last["chapter"], last["verse"], last["word_position"])
+
+
+def test_added_and_removed_book(word_index, add_test_book):
+    count = word_index.count_filtered_word_appearances("light", {})
+    add_test_book("lights", "Lig.1\n[1] Light upon light.\n[2] And the light was good\n")
+    book_id = BookModel.get_book_id("lights")
+    word_index.add_book(book_id)
+    assert word_index.count_filtered_word_appearances("light", {}) == count + 3
+    assert word_index.get_word_appearances_page(
+        "light", {"book": "lights"}, 0, PAGE_SIZE
+    ) == WordAppearanceModel.get_word_appearances_page("light", {"book": "lights"}, 0, PAGE_SIZE)
+
+    word_index.remove_book(book_id)
+    assert word_index.count_filtered_word_appearances("light", {}) == count
+    assert word_index.get_word_appearances_page("light", {"book": "lights"}, 0, PAGE_SIZE) == []
+
+
+def test_loaded_again_in_background(corpus, monkeypatch):
+    index = WordIndex()
+    index.load()
+    # as another process would after adding a book
+    version = DataVersionModel.bump(CORPUS_VERSION)
+
+    loading = threading.Event()
+    may_load = threading.Event()
+    load = index._load
+
+    def blocked_load() -> None:
+        loading.set()
+        assert may_load.wait(10)
+        load()
+
+    monkeypatch.setattr(index, "_load", blocked_load)
+    # the request isn't held up by the load, it queries the db meanwhile
+    assert not index.is_current(version)
+    assert loading.wait(10)
+    assert not index.is_current(version)
+
+    may_load.set()
+    with index._lock:
+        assert index.is_current(version)
+    assert index.count_filtered_word_appearances("light", {}) == len(corpus.get_appearances("light"))